@@ -1,6 +1,9 @@
-import ollama
-import json
+import os
+import threading
 from pathlib import Path
+from data_export import load_manifest, find_resident_record, load_resident_history
+from llm_interviews import BatchInterviewer, ResponseCache
+from conversation_store import ConversationStore, conversations_file_name
 
 class AgentLLMHandler:
     def __init__(self, model_name, chosen_config):
@@ -12,8 +15,9 @@ class AgentLLMHandler:
         self.file_name = self._get_json_file_name()
         self.current_agent_id = 0
         self.current_agent_conversation = []
-        self._cached_data = None
-        self._data_dirty = False
+        self._store = None
+        self._store_lock = threading.Lock()
+        self._interviewer = None
 
     def set_current_agent_id(self, agent_id):
         """
@@ -32,61 +36,37 @@ class AgentLLMHandler:
         run_number = len(existing_files) + 1
         return save_folder / f"simulation_data_{run_number:03d}.json"
 
-    def _load_json(self):
+    def _get_store(self):
         """
-        Loads and caches JSON content.
-        """
-        if self._cached_data is not None:
-            return self._cached_data
-
-        if not self.file_name.exists():
-            self._cached_data = {}
-            return self._cached_data
-
-        try:
-            with self.file_name.open('r') as file:
-                self._cached_data = json.load(file)
-        except json.JSONDecodeError:
-            self._cached_data = {}
+        Returns the conversation store that belongs to the current data file.
 
-        return self._cached_data
-
-    def _save_json(self):
-        """
-        Writes cached data to disk if marked dirty.
+        The store is opened on first use (and reopened when `file_name` changes).
+        Conversations of older data files, stored inline in the JSON file (new
+        manifests no longer have a `conversation_history` section), are
+        imported when the store is created.
         """
-        if self._data_dirty:
-            with self.file_name.open('w') as file:
-                json.dump(self._cached_data, file, indent=4)
-            self._data_dirty = False
+        path = conversations_file_name(self.file_name)
+        with self._store_lock:
+            if self._store is None or self._store.path != path:
+                is_new = not os.path.exists(path)
+                self._store = ConversationStore(path)
+                if is_new:
+                    self._store.import_history(load_manifest(self.file_name).get("conversation_history", {}))
+            return self._store
 
     def get_agent_conversation(self):
         """
         Retrieves the conversation for the current agent.
         """
-        data = self._load_json()
-        self.current_agent_conversation = (
-            data.get("conversation_history", {})
-                .get("residents", {})
-                .get(str(self.current_agent_id), [])
-        )
+        self.current_agent_conversation = self._get_store().get(self.current_agent_id)
 
     def update_agent_conversation(self):
         """
-        Updates the agent's conversation in memory and writes if changed.
+        Stores the messages of the current agent's conversation that are not stored yet.
         """
-        data = self._load_json()
-        agent_key = str(self.current_agent_id)
-
-        if "conversation_history" not in data:
-            data["conversation_history"] = {}
-        if "residents" not in data["conversation_history"]:
-            data["conversation_history"]["residents"] = {}
-
-        if data["conversation_history"]["residents"].get(agent_key) != self.current_agent_conversation:
-            data["conversation_history"]["residents"][agent_key] = self.current_agent_conversation
-            self._data_dirty = True
-            self._save_json()
+        store = self._get_store()
+        stored = store.get(self.current_agent_id)
+        store.append(self.current_agent_id, self.current_agent_conversation[len(stored):])
 
     def _get_system_prompt(self):
         """
@@ -102,20 +82,51 @@ class AgentLLMHandler:
             )
         }
 
-    def _get_system_prompt_second_version(self, max_years=5):
-        """
-        System prompt using historical behavior data for the agent.
+    def _get_resident_history(self, max_years, agent_id=None):
         """
-        data = self._load_json()
-        if "simulation_years" not in data:
-            return self._get_system_prompt()
+        Reads the last `max_years` exported snapshots of an agent (the current agent if `agent_id` is None).
+
+        Exports with a history index are read as one slice of the resident's row.
+        Older streaming exports are read year by year through the manifest, and
+        legacy files with all years inline are still supported.
 
+        Returns:
+            list[tuple]: (year, attitude, subj_norm, behavioral_control) tuples.
+        """
+        if agent_id is None:
+            agent_id = self.current_agent_id
+        manifest = load_manifest(self.file_name)
         year_data_list = []
 
-        for year_key, year_info in data["simulation_years"].items():
+        history = load_resident_history(self.file_name, manifest, agent_id, max_years)
+        if history is not None:
+            for i, year_number in enumerate(history["year"].tolist()):
+                year_data_list.append((
+                    year_number,
+                    history["attitude"][i].item(),
+                    {name: values[i].item() for name, values in history["subj_norm"].items()},
+                    {name: values[i].item() for name, values in history["behavioral_control"].items()},
+                ))
+            return year_data_list
+
+        if "years" in manifest:
+            years = sorted(int(year_key.split()[-1]) for year_key in manifest["years"])
+            for year_number in years[-max_years:]:
+                resident_data = find_resident_record(self.file_name, manifest, year_number, agent_id)
+                if not resident_data:
+                    continue
+                year_data_list.append((
+                    year_number,
+                    resident_data.get("attitude", 0.0),
+                    resident_data.get("subj_norm", {}),
+                    resident_data.get("behavioral_control", {})
+                ))
+            return year_data_list
+
+        for year_key, year_info in manifest.get("simulation_years", {}).items():
             try:
                 year_number = int(year_key.split()[-1])
-                resident_data = year_info["residents_data"].get(str(self.current_agent_id), {})
+                resident_data = year_info["residents_data"].get(str(agent_id), {})
                 if not resident_data:
                     continue
 
@@ -125,6 +136,13 @@ class AgentLLMHandler:
                 year_data_list.append((year_number, attitude, subj_norm, behavioral_control))
             except (KeyError, ValueError):
                 continue
+        return year_data_list
+
+    def _get_system_prompt_second_version(self, max_years=5, agent_id=None):
+        """
+        System prompt using historical behavior data for the agent (the current agent if `agent_id` is None).
+        """
+        year_data_list = self._get_resident_history(max_years, agent_id)
 
         year_data_list = sorted(year_data_list, key=lambda x: x[0], reverse=True)[:max_years]
         year_data_list = sorted(year_data_list, key=lambda x: x[0])  # Oldest first
@@ -158,34 +176,77 @@ class AgentLLMHandler:
 
     def _init_conversation(self, agent_id):
         """
-        Initializes the conversation by loading previous history or inserting system prompt.
-        """
-        self.set_current_agent_id(agent_id)
-        self.get_agent_conversation()
+        Loads the conversation of an agent, starting it with a system prompt if it has none.
 
-        if not self.current_agent_conversation:
-            self.current_agent_conversation = [self._get_system_prompt_second_version()]
-            self._data_dirty = True
-            self._save_json()
+        Returns:
+            list[dict]: The conversation of the agent.
+        """
+        store = self._get_store()
+        conversation = store.get(agent_id)
+        if not conversation:
+            conversation = store.start(agent_id, [self._get_system_prompt_second_version(agent_id=agent_id)])
+        return conversation
 
     def chat(self, agent_id, prompt):
         """
         Sends a prompt to the LLM and returns the response.
+
+        Only the new user and assistant messages are appended to the agent's stored
+        conversation, so several threads can chat at the same time.
         """
         if not prompt.strip():
             raise ValueError("Prompt is empty.")
 
-        self._init_conversation(agent_id)
-
-        self.current_agent_conversation.append({'role': 'user', 'content': prompt})
+        conversation = self._init_conversation(agent_id)
+        user_message = {'role': 'user', 'content': prompt}
 
-        response = ollama.chat(
+        response = self._get_interviewer().client.chat(
             model=self.model_name,
-            messages=self.current_agent_conversation
+            messages=conversation + [user_message]
         )
 
         model_reply = response.message.content
-        self.current_agent_conversation.append({'role': 'assistant', 'content': model_reply})
+        new_messages = [user_message, {'role': 'assistant', 'content': model_reply}]
+        self._get_store().append(agent_id, new_messages)
 
-        self.update_agent_conversation()
+        self.current_agent_id = agent_id
+        self.current_agent_conversation = conversation + new_messages
         return model_reply
+
+    def _get_interviewer(self):
+        """
+        Creates the batch interviewer on first use, configured with the `llm_*` config values.
+        """
+        if self._interviewer is None:
+            cache_folder = self.chosen_config.get('llm_cache_folder')
+            self._interviewer = BatchInterviewer(
+                self.model_name,
+                host=self.chosen_config.get('llm_host'),
+                cache=ResponseCache(cache_folder) if cache_folder else None,
+                max_workers=self.chosen_config.get('llm_max_workers', 8),
+            )
+        return self._interviewer
+
+    def interview_residents(self, agent_ids, prompt):
+        """
+        Asks many residents the same question concurrently.
+
+        Every resident gets a fresh conversation with its own system prompt and
+        the question; the stored conversation histories are not changed.
+        Responses are cached on disk, so repeating a question is free.
+
+        Args:
+            agent_ids (list[int]): The residents to interview.
+            prompt (str): The question.
+
+        Returns:
+            tuple[dict, dict]: ({agent_id: response}, {agent_id: error message}).
+        """
+        if not prompt.strip():
+            raise ValueError("Prompt is empty.")
+
+        conversations = {
+            agent_id: [self._get_system_prompt_second_version(agent_id=agent_id), {'role': 'user', 'content': prompt}]
+            for agent_id in agent_ids
+        }
+        return self._get_interviewer().interview(conversations)
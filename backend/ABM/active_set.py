@@ -0,0 +1,106 @@
+"""
+Active-set scheduling of the object model.
+
+A resident that decided for a package, or a household that installed it,
+never changes its mind again. Instead of stepping every agent every year, the
+Environment keeps per package the residents that are still undecided and the
+households that have not installed it yet, and only evaluates those pairs.
+The yearly work therefore shrinks as adoption grows. Only the income raise
+still touches every resident, because every resident draws one every year.
+
+With `prune_never_adopters` enabled, (resident, package) pairs whose decision
+score can provably never exceed the resident's decision threshold are left
+out of the active set as well (see `never_adopter_mask`).
+"""
+from array import array
+import numpy as np
+
+
+def never_adopter_mask(attitude, attitude_mod, subj_norm_mod, behavioral_mod, decision_threshold, package, config):
+    """
+    Finds the residents that can never decide for a package.
+
+    The decision score of `Resident.calc_decision` is linear in the subjective
+    norm and the behavioral control. The subjective norm stays between
+    min(0, subjective_norm) and max(1, subjective_norm) at every norm level and
+    the behavioral control is clipped between 0 and the package's
+    `max_behavioral_influence`. The score with both at their most favourable
+    bound is an upper bound, whatever happens to the norms, the incomes or the
+    prices; it is computed in the same order as the score itself, so rounding
+    cannot push the real score above it. A resident whose upper bound does not
+    exceed its decision threshold will never decide for the package.
+
+    Args:
+        attitude, attitude_mod, subj_norm_mod, behavioral_mod, decision_threshold (np.ndarray):
+            Static TPB attributes per resident.
+        package (SustainabilityPackage): The package.
+        config (dict): The configuration of the model.
+
+    Returns:
+        np.ndarray: Boolean mask of the residents that can never decide for the package.
+    """
+    base_norm = config.get('subjective_norm', 0.0)
+    norm_term = np.maximum(min(0.0, base_norm) * package.subj_norm_mod * subj_norm_mod,
+                           max(1.0, base_norm) * package.subj_norm_mod * subj_norm_mod)
+    control_term = np.maximum(0.0 * behavioral_mod, package.max_behavioral_influence * behavioral_mod)
+    upper_bound = (attitude * attitude_mod + norm_term + control_term) / 6
+    return ~(upper_bound > decision_threshold)
+
+
+class ActiveSet:
+    """
+    Positions of the residents and households that still have work, per package.
+
+    The positions are kept in ascending order, i.e. in the order of
+    `model.residents` and `model.households`, so stepping the active set gives
+    the same results as stepping every agent. They are stored as integer
+    arrays (8 bytes per entry) instead of lists of int objects.
+
+    Attributes:
+        undecided_residents (list[array]): Per package position, the positions in
+            `model.residents` of the residents that have not decided for the package
+            (and are not pruned).
+        open_households (list[array]): Per package position, the positions in
+            `model.households` of the households with residents that have not installed the package.
+        pruned (np.ndarray | None): Boolean mask (residents x packages) of the pruned
+            never-adopter pairs, None if pruning is off.
+    """
+    def __init__(self, model):
+        """
+        Args:
+            model (Environment): The simulation environment.
+        """
+        self.model = model
+        self.pruned = None
+        self.rebuild()
+
+    def rebuild(self, pruned=None):
+        """
+        Rebuilds the active set from the state of the agents, e.g. after agents
+        were changed outside of a step.
+
+        Args:
+            pruned (np.ndarray | None): Boolean mask (residents x packages) of the
+                pairs to leave out, e.g. from `never_adopter_mask`. None keeps all pairs.
+        """
+        residents = self.model.residents
+        households = self.model.households
+        nr_packages = len(self.model.sustainability_packages)
+        self.pruned = pruned
+        self.undecided_residents = [
+            array("q", (i for i, resident in enumerate(residents)
+                        if not resident.has_decided(p) and (pruned is None or not pruned[i, p])))
+            for p in range(nr_packages)
+        ]
+        self.open_households = [
+            array("q", (h for h, household in enumerate(households)
+                        if household.residents and not household.is_installed(p)))
+            for p in range(nr_packages)
+        ]
+
+    def size(self):
+        """
+        Returns:
+            int: Number of (resident, package) and (household, package) pairs that are still active.
+        """
+        return sum(map(len, self.undecided_residents)) + sum(map(len, self.open_households))
@@ -1,8 +1,13 @@
 from mesa import Agent
 import random
+import numpy as np
 from agents.resident_agent import Resident
-import utilities
 from sustainability_packages.solar_panel import SolarPanel
+from agents.package_state import package_block
+
+# Blocks of the household's package state list, see agents/package_state.py
+INSTALLED, SKIP_PREV, SKIP_NEXT = range(3)
+
 
 class Household(Agent):
     """
@@ -32,27 +37,141 @@ class Household(Agent):
         energy_generation (int): Estimated energy generation per solar panel per year (kWh).
         gas_usage (int): Annual gas usage of the household (kWh).
         heatpump_usage (int): Annual electricity usage by a heat pump if installed (kWh).
+        street_index (int | None): Index of the street in `environment.streets` this
+                                   household belongs to, None if it is not on a street.
+        roi_cache (dict): Memoized ROI per package, shared by all residents of the household.
+                          {package_name: ((price, energy_price), roi)}. Cleared when the
+                          household installs a package (see `SustainabilityPackage.get_roi`).
+
+    The per-package attributes are dict-like views (PackageValues) over one
+    compact list per household, indexed by package position.
     """
-    def __init__(self, id, model):
+    __slots__ = ("residents", "solarpanel_amount", "energy_generation", "gas_usage", "energy_usage",
+                 "heatpump_usage", "co2_saved_yearly", "street_index", "roi_cache", "_package_state")
+
+    package_installations = package_block(INSTALLED)
+    skip_prev_flags = package_block(SKIP_PREV)
+    skip_next_flags = package_block(SKIP_NEXT)
+
+    def __init__(self, id, model, attributes=None):
+        """
+        Args:
+            id (int): Unique id of the household.
+            model (Model): The simulation model.
+            attributes (dict | None): Pre-drawn "solarpanel_amount", "energy_generation",
+                "gas_usage", "energy_usage" and "heatpump_usage" (see `sample_attributes`).
+                Drawn one by one if None, from the household's own stream if the
+                model uses `random_streams`.
+        """
         super().__init__(model)
-        self.config_id, self.config = utilities.choose_config()
         self.unique_id = id
         self.residents = []
-        self.environment = model
-        self.package_installations = {}
-
-        # Flags for "Direct" subjective norm, per package
-        self.skip_prev_flags = {} # {package_name: False/True}
-        self.skip_next_flags = {} # {package_name: False/True}
-
-        self.solarpanel_amount = random.choice(self.config['solar_panel_amount_options'])
-        self.energy_generation = random.randint(*self.config['energy_generation_range'])
-        self.gas_usage = random.randint(*self.config['yearly_gas_usage'])
-        self.energy_usage = random.randint(*self.config['yearly_energy_usage'])
-        self.heatpump_usage = random.randint(*self.config['yearly_heatpump_usage'])
+
+        # Installations and the flags for "Direct" subjective norm, per package
+        self._package_state = [False] * (3 * len(model.sustainability_packages))
+
+        if attributes is None and model.random_streams is not None:
+            drawn = Household.sample_attributes(self.config, 1, model.random_streams.generator("households", id))
+            attributes = {name: values[0] for name, values in drawn.items()}
+
+        if attributes is None:
+            self.solarpanel_amount = random.choice(self.config['solar_panel_amount_options'])
+            self.energy_generation = random.randint(*self.config['energy_generation_range'])
+            self.gas_usage = random.randint(*self.config['yearly_gas_usage'])
+            self.energy_usage = random.randint(*self.config['yearly_energy_usage'])
+            self.heatpump_usage = random.randint(*self.config['yearly_heatpump_usage'])
+        else:
+            self.solarpanel_amount = attributes["solarpanel_amount"]
+            self.energy_generation = attributes["energy_generation"]
+            self.gas_usage = attributes["gas_usage"]
+            self.energy_usage = attributes["energy_usage"]
+            self.heatpump_usage = attributes["heatpump_usage"]
         self.co2_saved_yearly = 0
+        self.street_index = None
+        self.roi_cache = {}
+
+    @property
+    def environment(self):
+        return self.model
+
+    @property
+    def config(self):
+        return self.model.config
+
+    @property
+    def config_id(self):
+        return self.model.config_id
+
+    def is_installed(self, package_position):
+        """
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+
+        Returns:
+            bool: Whether the household installed the package.
+        """
+        return self._package_state[INSTALLED * len(self.model.package_index) + package_position]
+
+    def set_installed(self, package_position):
+        """
+        Marks a package as installed, without registering the installation with the environment.
+
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+        """
+        self._package_state[INSTALLED * len(self.model.package_index) + package_position] = True
+
+    def vote(self, package_position):
+        """
+        Returns whether enough residents decided for a package to install it,
+        i.e. whether their average decision meets `household_decision_threshold`.
+
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+
+        Returns:
+            bool: The outcome of the vote, False for a household without residents.
+        """
+        if not self.residents:
+            return False
+        num_positive_decisions = sum(1 for res in self.residents if res.has_decided(package_position))
+        return num_positive_decisions / len(self.residents) >= self.config['household_decision_threshold']
+
+    def reset_skip_flags(self):
+        """
+        Resets the "Direct" subjective norm flags of all packages.
+        """
+        nr_packages = len(self.model.package_index)
+        self._package_state[SKIP_PREV * nr_packages:] = [False] * (2 * nr_packages)
 
-    def create_residents(self, nr_residents: int, id_counter: int) -> int:
+    @staticmethod
+    def sample_attributes(config, n, rng=None):
+        """
+        Draws the random attributes of many households at once, with the same
+        (inclusive) ranges as the constructor.
+
+        Args:
+            config (dict): The configuration dictionary.
+            n (int): Number of households.
+            rng (np.random.Generator | None): Generator to draw from, `np.random` if None.
+
+        Returns:
+            dict[str, list[int]]: One list per attribute, one entry per household.
+        """
+        def randint(value_range):
+            if rng is None:
+                return np.random.randint(value_range[0], value_range[1] + 1, n).tolist()
+            return rng.integers(value_range[0], value_range[1], n, endpoint=True).tolist()
+
+        return {
+            "solarpanel_amount": (np.random if rng is None else rng).choice(config['solar_panel_amount_options'], n).tolist(),
+            "energy_generation": randint(config['energy_generation_range']),
+            "gas_usage": randint(config['yearly_gas_usage']),
+            "energy_usage": randint(config['yearly_energy_usage']),
+            "heatpump_usage": randint(config['yearly_heatpump_usage']),
+        }
+
+    def create_residents(self, nr_residents: int, id_counter: int, resident_attributes=None) -> int:
         """
         Create and add Resident agents to the household.
 
@@ -61,12 +180,15 @@ class Household(Agent):
 
         Args:
             nr_residents (int): Number of residents to create for this household.
+            resident_attributes (list[dict] | None): Pre-drawn attributes per resident
+                (see `Resident.__init__`), drawn by each resident if None.
         """
-        for _ in range(nr_residents):
+        for i in range(nr_residents):
             resident = Resident(
                 id_counter,
                 self.model,
-                self  # link naar household
+                self,  # link naar household
+                None if resident_attributes is None else resident_attributes[i]
             )
             id_counter += 1
 
@@ -90,19 +212,13 @@ class Household(Agent):
         Args:
             package (SustainabilityPackage): The sustainability package being considered.
         """
-        if not self.residents:
+        p = self.model.package_index[package.name]
+        if self.is_installed(p):
             return
 
-        if self.package_installations.get(package.name, False):
-            return
-
-        num_positive_decisions = sum(
-            1 for res in self.residents if res.package_decisions.get(package.name, False)
-        )
-        avg_score = num_positive_decisions / len(self.residents)
-
-        if avg_score >= self.config['household_decision_threshold']:
-            self.package_installations[package.name] = True
+        if self.vote(p):
+            self.set_installed(p)
+            self.environment.register_installation(self, package)
 
             self.environment.current_co2 -= package.calc_co2_savings(self)
 
@@ -0,0 +1,94 @@
+"""
+Compact per-package state of the agents.
+
+Residents and households used to keep one dict per per-package attribute,
+keyed by package name. Instead, every agent now keeps a single flat list with
+one block of entries per attribute, in the order of
+`environment.sustainability_packages`. PackageValues exposes one block as a
+dict-like view, so `resident.package_decisions["Solar Panel"]`,
+`.get(...)`, assignment and comparison with a dict keep working.
+"""
+from collections.abc import MutableMapping
+
+
+class PackageValues(MutableMapping):
+    """
+    Dict-like view of one attribute block in an agent's package state list.
+
+    Reads and writes go straight to the underlying list. Only the names of
+    the packages in the simulation are valid keys.
+
+    Attributes:
+        package_index (dict): Package name to position, shared by all agents.
+    """
+    __slots__ = ("package_index", "_values", "_offset")
+
+    def __init__(self, package_index, values, offset):
+        """
+        Args:
+            package_index (dict): Package name to position.
+            values (list): The agent's package state list.
+            offset (int): Position of the first entry of this block in `values`.
+        """
+        self.package_index = package_index
+        self._values = values
+        self._offset = offset
+
+    def __getitem__(self, package_name):
+        return self._values[self._offset + self.package_index[package_name]]
+
+    def __setitem__(self, package_name, value):
+        self._values[self._offset + self.package_index[package_name]] = value
+
+    def __delitem__(self, package_name):
+        raise TypeError("Package values cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.package_index)
+
+    def __len__(self):
+        return len(self.package_index)
+
+    def __contains__(self, package_name):
+        return package_name in self.package_index
+
+    def get(self, package_name, default=None):
+        p = self.package_index.get(package_name)
+        return default if p is None else self._values[self._offset + p]
+
+    def values(self):
+        """
+        Returns:
+            list: The values of all packages, in package order.
+        """
+        return self._values[self._offset:self._offset + len(self.package_index)]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def package_block(block):
+    """
+    Creates a property that exposes one block of the `_package_state` list as a
+    PackageValues view. Assigning a mapping to the property copies its values
+    for the packages in the simulation.
+
+    Args:
+        block (int): Index of the block, the view covers
+                     `_package_state[block * nr_packages:(block + 1) * nr_packages]`.
+
+    Returns:
+        property: The accessor.
+    """
+    def getter(agent):
+        index = agent.model.package_index
+        return PackageValues(index, agent._package_state, block * len(index))
+
+    def setter(agent, mapping):
+        index = agent.model.package_index
+        offset = block * len(index)
+        for package_name, p in index.items():
+            if package_name in mapping:
+                agent._package_state[offset + p] = mapping[package_name]
+
+    return property(getter, setter)
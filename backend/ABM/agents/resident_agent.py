@@ -3,6 +3,12 @@ import numpy as np
 import random
 import utilities
 from sustainability_packages.solar_panel import SolarPanel
+from sustainability_packages.heat_pump import HeatPump
+from agents.package_state import package_block
+
+# Blocks of the resident's package state list, see agents/package_state.py
+SUBJ_NORM, BEHAVIORAL_CONTROL, PACKAGE_SUBJECTIVE_NORMS, DECISIONS = range(4)
+
 
 class Resident(Agent):
     """
@@ -12,28 +18,66 @@ class Resident(Agent):
     influenced by their income, attitude, subjective norms, and perceived
     behavioral control.
 
+    The per-package attributes are dict-like views (PackageValues) over one
+    compact list per resident, indexed by package position.
+
+    Attributes:
+        household (Household): The household the resident belongs to.
+        environment (Model): The simulation model (same as model).
+        config_id (int), config (dict): The configuration of the model.
+        income, attitude, attitude_mod, subj_norm_mod, behavioral_mod, decision_threshold (float):
+            TPB attributes of the resident.
+        subj_norm (PackageValues): Subjective norm used in decisions, per package.
+        behavioral_control (PackageValues): Behavioral control per package.
+        package_subjective_norms (PackageValues): Latest norm from the environment, per package.
+        package_decisions (PackageValues): Whether the resident decided for a package.
     """
-    def __init__(self, id, model, household):
+    __slots__ = ("household", "income", "attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod",
+                 "decision_threshold", "_package_state")
+
+    subj_norm = package_block(SUBJ_NORM)
+    behavioral_control = package_block(BEHAVIORAL_CONTROL)
+    package_subjective_norms = package_block(PACKAGE_SUBJECTIVE_NORMS)
+    package_decisions = package_block(DECISIONS)
+
+    def __init__(self, id, model, household, attributes=None):
         """
         Initializes a Resident agent.
 
         Args:
             model (Model): The simulation model object this agent belongs to.
             household (Household): The household object this resident belongs to.
+            attributes (dict | None): Pre-drawn "income", "attitude", "attitude_mod",
+                "subj_norm_mod", "behavioral_mod" and optionally "behavioral_control" (see
+                `Environment.sample_population`). Drawn one by one if None, from the
+                resident's own stream if the model uses `random_streams`.
         """
         super().__init__(model)
-        self.config_id, self.config = utilities.choose_config()
 
         self.unique_id = id
         self.household = household
-        self.environment = model
-
-        salary = self.calc_salary()
-        self.income = max(round(salary, -2), 0)
-        self.subj_norm = {package.name: None for package in self.environment.sustainability_packages}
-        self.behavioral_control = {package.name: None for package in self.environment.sustainability_packages}
-        
-        if self.config_id == 0 or self.config_id == 1:
+        nr_packages = len(model.sustainability_packages)
+        self._package_state = ([None] * (2 * nr_packages) +
+                               [self.config.get('subjective_norm', 0.0)] * nr_packages +
+                               [False] * nr_packages)
+
+        if attributes is None and model.random_streams is not None:
+            drawn = Resident.sample_attributes(self.config_id, self.config, 1,
+                                               model.random_streams.generator("residents", id))
+            attributes = {name: values[0] for name, values in drawn.items()}
+
+        if attributes is None:
+            salary = self.calc_salary()
+            self.income = max(round(salary, -2), 0)
+        else:
+            self.income = attributes["income"]
+
+        if attributes is not None:
+            self.attitude = attributes["attitude"]
+            self.attitude_mod = attributes["attitude_mod"]
+            self.subj_norm_mod = attributes["subj_norm_mod"]
+            self.behavioral_mod = attributes["behavioral_mod"]
+        elif self.config_id == 0 or self.config_id == 1:
             self.attitude = utilities.gen_random_value(0, 1)
             self.attitude_mod = utilities.gen_random_value(0, 2)
             self.subj_norm_mod = utilities.gen_random_value(0, 2)
@@ -44,22 +88,97 @@ class Resident(Agent):
             self.subj_norm_mod = self.config['subj_norm_mod']
             self.behavioral_mod = self.config['behavioral_mod']
 
-        self.package_decisions = {} # Stores True/False for each package.name
-        self.package_subjective_norms = {}
-
-        for package in self.environment.sustainability_packages:
-            self.package_decisions[package.name] = False
-            self.package_subjective_norms[package.name] = self.config.get('subjective_norm', 0.0)
-
         self.decision_threshold = self.config['decision_threshold']
         self.calc_subjective_norm()
-        self.calc_behavioral_control()
+        if attributes is None or "behavioral_control" not in attributes:
+            self.calc_behavioral_control()
+        else:
+            self.behavioral_control.update(attributes["behavioral_control"])
+
+    @property
+    def environment(self):
+        return self.model
+
+    @property
+    def config(self):
+        return self.model.config
+
+    @property
+    def config_id(self):
+        return self.model.config_id
+
+    def get_package_state(self):
+        """
+        Returns all per-package values at once, cheaper than reading the views one by one.
+
+        Returns:
+            tuple[list, list, list, list]: subj_norm, behavioral_control,
+                package_subjective_norms and decisions, each in package order.
+        """
+        state = self._package_state
+        n = len(state) // 4
+        return state[:n], state[n:2 * n], state[2 * n:3 * n], state[3 * n:]
+
+    def has_decided(self, package_position):
+        """
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+
+        Returns:
+            bool: Whether the resident decided for the package.
+        """
+        return self._package_state[DECISIONS * len(self.model.package_index) + package_position]
+
+    def set_package_state(self, subj_norm, behavioral_control, package_subjective_norms, decisions):
+        """
+        Replaces all per-package values at once, e.g. after the vectorized engine ran.
+
+        Args:
+            subj_norm, behavioral_control, package_subjective_norms, decisions (list):
+                One value per package, in package order.
+        """
+        self._package_state = subj_norm + behavioral_control + package_subjective_norms + decisions
+
+    @staticmethod
+    def sample_attributes(config_id, config, n, rng=None):
+        """
+        Draws the random attributes of many residents at once, with the same
+        distributions as the constructor.
 
-    def calc_salary(self):
+        Args:
+            config_id (int): Identifier of the configuration.
+            config (dict): The configuration dictionary.
+            n (int): Number of residents.
+            rng (np.random.Generator | None): Generator to draw from, `np.random` if None.
+
+        Returns:
+            dict[str, np.ndarray]: "income", "attitude", "attitude_mod", "subj_norm_mod"
+                                   and "behavioral_mod", one entry per resident.
+        """
+        median = config['median_income']
+        sigma_normal = config['sigma_normal']
+        mu = np.log(median)
+        sigma_lognormaal = np.sqrt(np.log(1 + (sigma_normal / median) ** 2))
+        rng = np.random if rng is None else rng
+        attributes = {"income": np.maximum(np.round(rng.lognormal(mu, sigma_lognormaal, n), -2), 0)}
+
+        if config_id == 0 or config_id == 1:
+            attributes["attitude"] = rng.uniform(0, 1, n)
+            for name in ("attitude_mod", "subj_norm_mod", "behavioral_mod"):
+                attributes[name] = rng.uniform(0, 2, n)
+        else:
+            for name in ("attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod"):
+                attributes[name] = np.full(n, config[name], dtype=object)
+        return attributes
+
+    def calc_salary(self, rng=None):
         """
         Calculates a resident's salary based on a log-normal distribution
         approximating Dutch income distribution from the configuration.
 
+        Args:
+            rng (np.random.Generator | None): Generator to draw from, `np.random` if None.
+
         Returns:
             float: A randomly generated salary value.
         """
@@ -67,7 +186,7 @@ class Resident(Agent):
         sigma_normal = self.config['sigma_normal']
         mu = np.log(median)
         sigma_lognormaal = np.sqrt(np.log(1 + (sigma_normal / median) ** 2))
-        return np.random.lognormal(mu, sigma_lognormaal)
+        return (np.random if rng is None else rng).lognormal(mu, sigma_lognormaal)
     
     def calc_behavioral_control(self):
         """
@@ -77,11 +196,14 @@ class Resident(Agent):
         Returns:
             None: Updates the `behavioral_control` attribute in place.
         """
-        for package in self.environment.sustainability_packages:
-            if self.package_decisions.get(package.name, False):
+        state = self._package_state
+        packages = self.model.sustainability_packages
+        nr_packages = len(packages)
+        for p, package in enumerate(packages):
+            if state[DECISIONS * nr_packages + p]:
                 continue
 
-            self.behavioral_control[package.name] = package.calculate_behavioral_influence(self.income, self.household)
+            state[BEHAVIORAL_CONTROL * nr_packages + p] = package.calculate_behavioral_influence(self.income, self.household)
 
     def calc_subjective_norm(self):
         """
@@ -91,11 +213,13 @@ class Resident(Agent):
         Returns:
             None: Updates the `subj_norm` attribute in place.
         """
-        for package in self.environment.sustainability_packages:
-            if self.package_decisions.get(package.name, False):
+        state = self._package_state
+        nr_packages = len(self.model.sustainability_packages)
+        for p in range(nr_packages):
+            if state[DECISIONS * nr_packages + p]:
                 continue
-            
-            self.subj_norm[package.name] = self.package_subjective_norms.get(package.name, 0.0)
+
+            state[SUBJ_NORM * nr_packages + p] = state[PACKAGE_SUBJECTIVE_NORMS * nr_packages + p]
 
     def calc_decision(self):
         """
@@ -107,19 +231,74 @@ class Resident(Agent):
         decision for that package is set to True. This method iterates through
         all sustainability packages not yet adopted by the resident.
         """
-        for package in self.environment.sustainability_packages:
-            if self.package_decisions.get(package.name, False):
-                continue
-            
-            decision_stat = (self.attitude * self.attitude_mod +
-                             self.subj_norm[package.name] * package.subj_norm_mod * self.subj_norm_mod +
-                             self.behavioral_control[package.name] * self.behavioral_mod) / 6 # Normalize (sum of max mods if all are 2)
-
-            if decision_stat > self.decision_threshold:
-                self.package_decisions[package.name] = True
-                self.environment.decided_residents_this_step_per_package[package.name] = \
-                    self.environment.decided_residents_this_step_per_package.get(package.name, 0) + 1
-                
+        for p, package in enumerate(self.model.sustainability_packages):
+            self.calc_package_decision(p, package)
+
+    def calc_package_decision(self, package_position, package):
+        """
+        Calculates the decision on one sustainability package, see `calc_decision`.
+
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+            package (SustainabilityPackage): The package.
+
+        Returns:
+            bool: Whether the resident has decided for the package after the call.
+        """
+        state = self._package_state
+        nr_packages = len(state) // 4
+        p = package_position
+        if state[DECISIONS * nr_packages + p]:
+            return True
+
+        decision_stat = (self.attitude * self.attitude_mod +
+                         state[SUBJ_NORM * nr_packages + p] * package.subj_norm_mod * self.subj_norm_mod +
+                         state[BEHAVIORAL_CONTROL * nr_packages + p] * self.behavioral_mod) / 6 # Normalize (sum of max mods if all are 2)
+
+        if decision_stat > self.decision_threshold:
+            state[DECISIONS * nr_packages + p] = True
+            self.environment.decided_residents_this_step_per_package[package.name] = \
+                self.environment.decided_residents_this_step_per_package.get(package.name, 0) + 1
+            return True
+        return False
+
+    def update_package_factors(self, package_position, package):
+        """
+        Refreshes the subjective norm and behavioral control of one package the
+        resident has not decided for yet, see `calc_subjective_norm` and
+        `calc_behavioral_control`.
+
+        Args:
+            package_position (int): Position of the package (see `Environment.package_index`).
+            package (SustainabilityPackage): The package.
+        """
+        state = self._package_state
+        nr_packages = len(state) // 4
+        p = package_position
+        if state[DECISIONS * nr_packages + p]:
+            return
+        state[SUBJ_NORM * nr_packages + p] = state[PACKAGE_SUBJECTIVE_NORMS * nr_packages + p]
+        state[BEHAVIORAL_CONTROL * nr_packages + p] = package.calculate_behavioral_influence(self.income, self.household)
+
+    def raise_income(self, factor=None):
+        """
+        Raises the resident's income by a random factor from `raise_income`.
+
+        Args:
+            factor (float | None): Pre-drawn raise factor (see `Environment.step_residents`).
+                Drawn if None: from `random`, or with `random_streams` from this year's
+                "income_raise" stream at the resident's unique_id (its position in
+                `model.residents`), the same factor a batched draw gives it.
+        """
+        if factor is None:
+            streams = self.model.random_streams
+            if streams is None:
+                factor = random.choice(self.config['raise_income'])
+            else:
+                factor = streams.choices("income_raise", self.model.steps, self.config['raise_income'], 1,
+                                         start=self.unique_id).tolist()[0]
+        self.income = int(round(self.income * factor, -1))
+
     def collect_resident_data(self):
         agent_data = {
             "id": self.unique_id,
@@ -127,12 +306,12 @@ class Resident(Agent):
             "income": self.income,
             "attitude": self.attitude,
             "attitude_mod": self.attitude_mod,
-            "subj_norm": self.subj_norm,
+            "subj_norm": dict(self.subj_norm),
             "subj_norm_mod": self.subj_norm_mod,
-            "behavioral_control": self.behavioral_control,
+            "behavioral_control": dict(self.behavioral_control),
             "behavioral_mod": self.behavioral_mod,
-            "solar_panels": self.package_decisions.get("Solar Panels", False),
-            "heat_pump": self.package_decisions.get("Heat Pump", False),
+            "solar_panels": self.package_decisions.get(SolarPanel.name, False),
+            "heat_pump": self.package_decisions.get(HeatPump.name, False),
         }
 
         return agent_data
@@ -145,9 +324,10 @@ class Resident(Agent):
         they haven't already decided on. After decision-making, their income is
         updated with a random raise.
         """
-        if not all(self.package_decisions.get(p.name, False) for p in self.environment.sustainability_packages):
+        nr_packages = len(self.model.sustainability_packages)
+        if not all(self._package_state[DECISIONS * nr_packages:]):
             self.calc_decision()
-        self.income = int(round(self.income * random.choice(self.config['raise_income']), -1))
+        self.raise_income()
 
         # If all decisions are made, recalculate subjective norm and behavioral control
         self.calc_subjective_norm()
@@ -2,16 +2,19 @@
 Flask application for serving the agent-based model simulation API.
 
 This application provides endpoints to:
-- Start a new simulation with specified parameters.
+- Start a new simulation with specified parameters as a background job.
+- Follow the progress of simulation jobs and cancel them.
+- Stream the yearly results of a simulation job as server-sent events.
+- Expose per-phase timings and work counters of the simulation for Prometheus.
 - Retrieve aggregated data for graphical representation.
 - Fetch detailed data about individual households from the last simulation.
 """
 
 from __future__ import annotations
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from main import run_simulation, graphics_data, households_data
 import utilities
+from simulation_jobs import JobManager
 
 from AgentLLMHandler import AgentLLMHandler
 
@@ -23,12 +26,23 @@ import config
 app = Flask(__name__)
 config_id, chosen_config = utilities.choose_config()
 llm_handler = AgentLLMHandler("llama3.1:8b", chosen_config)
+job_manager = JobManager()
 # Configure CORS to allow connections from the frontend
 CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}}, supports_credentials=True)
 
 
 @app.route('/simulation', methods=['POST'])
 def start_simulation():
+    """
+    Start a new simulation as a background job.
+
+    The request returns immediately with the id of the job; use the /jobs
+    endpoints to follow its progress and fetch its results.
+
+    Returns:
+        JSON response with the job id and status (HTTP 202).
+        Returns a 400 error if the parameters are invalid.
+    """
     data = request.get_json()
 
     try:
@@ -36,23 +50,233 @@ def start_simulation():
         nr_residents = int(data.get("nr_residents", chosen_config["nr_residents"]))
         simulation_years = int(data.get("simulation_years", chosen_config["simulation_years"]))
         seed = int(data.get("seed", config.configs[config_id].get("seed", None)))
+        headless = bool(data.get("headless", config.configs[config_id].get("headless", False)))
     except (ValueError, TypeError) as e:
         return jsonify({"status": "error", "message": "Invalid input: " + str(e)}), 400
 
-    config.configs[config_id]["nr_households"] = nr_households
-    config.configs[config_id]["nr_residents"] = nr_residents
-    config.configs[config_id]["simulation_years"] = simulation_years
-    config.configs[config_id]["seed"] = seed
+    job = job_manager.submit({
+        "nr_households": nr_households,
+        "nr_residents": nr_residents,
+        "simulation_years": simulation_years,
+        "seed": seed,
+        "headless": headless,
+    })
+
+    return jsonify({"status": "ok", "job_id": job.job_id, "job": job.to_dict()}), 202
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List all known simulation jobs with their status and progress.
+    """
+    return jsonify({"status": "ok", "jobs": [job.to_dict() for job in job_manager.list_jobs()]})
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Retrieve the status and progress of a simulation job.
+
+    Returns:
+        JSON response with the job status. Returns a 404 error for unknown jobs.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    return jsonify({"status": "ok", "job": job.to_dict()})
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancel a simulation job. A running job stops after the current year.
+
+    Returns:
+        JSON response with the job status. Returns a 404 error for unknown jobs.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    return jsonify({"status": "ok", "job": job.to_dict()})
+
+
+@app.route('/jobs/<job_id>/graphics_data', methods=['GET'])
+def get_job_graphics_data(job_id):
+    """
+    Retrieve the yearly aggregated data collected so far by a simulation job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    return jsonify(job.results.get_graphics_data())
+
+
+@app.route('/jobs/<job_id>/metrics', methods=['GET'])
+def get_job_metrics(job_id):
+    """
+    Retrieve the phase timings and work counters of a simulation job as JSON,
+    including the per-year records (see metrics.py).
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    if job.results.metrics is None:
+        return jsonify({"status": "error", "message": "No metrics available yet"}), 400
+    return jsonify({"status": "ok", "metrics": job.results.metrics.to_dict()})
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Expose the metrics of the most recently started simulation job in the
+    Prometheus text format, labelled with the job id.
+
+    Returns:
+        Text response with the metrics, empty when no job has run yet.
+    """
+    job = job_manager.latest()
+    metrics = job.results.metrics if job is not None else None
+    text = metrics.to_prometheus({"job_id": job.job_id}) if metrics is not None else ""
+    return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
 
-    result = run_simulation(nr_households, nr_residents, simulation_years, seed=seed)
+@app.route('/jobs/<job_id>/households', methods=['GET'])
+def get_job_households(job_id):
+    """
+    Retrieve the latest household details of a simulation job.
+
+    Supports the same query parameters as /households.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    return households_response(job)
+
+
+def households_response(job):
+    """
+    Builds the (filtered) household details response of a job.
 
-    return jsonify({"status": "ok", "result": result})
+    Query parameters:
+        since_year (int): Only households whose installations or resident decisions changed after this year.
+        street (int): Only households in this street.
+        id_from, id_to (int): Only households in this (inclusive) id range.
+        offset, limit (int): Page through the matching households.
+        fields (str): Comma separated household keys to return, e.g. "Solar Panel_installed,residents".
+
+    The response carries an ETag of the job and data version, so a request with a
+    matching If-None-Match header gets a 304 without a body. The number of matching
+    households is sent in the X-Total-Count header and the simulation year of the
+    data in X-Simulation-Year.
+
+    Args:
+        job (SimulationJob | None): The job to return the households of.
+
+    Returns:
+        The JSON response, a 304 response, or a 400 error if no household data is
+        available or the parameters are invalid.
+    """
+    if job is None or not job.results.households_data:
+        return jsonify({"error": "No household data available"}), 400
+
+    results = job.results
+    etag = f"{job.job_id}-{results.households_version}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    int_params = {}
+    for name in ("since_year", "street", "id_from", "id_to", "offset", "limit"):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            int_params[name] = int(value)
+        except ValueError:
+            return jsonify({"status": "error", "message": f"Invalid input: {name} must be an integer"}), 400
+    if int_params.get("offset", 0) < 0 or int_params.get("limit", 0) < 0:
+        return jsonify({"status": "error", "message": "Invalid input: offset and limit must be positive"}), 400
+
+    fields = request.args.get("fields")
+    households, total = results.query_households(
+        fields=[field.strip() for field in fields.split(",")] if fields else None, **int_params
+    )
+
+    response = jsonify(households)
+    response.set_etag(etag)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Simulation-Year"] = str(results.households_year)
+    return response
+
+
+def format_server_sent_events(job, start):
+    """
+    Formats the events of a job as a server-sent events stream.
+
+    Args:
+        job (SimulationJob): The job to stream.
+        start (int): Index of the first event to send.
+
+    Yields:
+        str: The messages of the stream.
+    """
+    for event in job.events(start):
+        if event is None:
+            yield ": keepalive\n\n"
+            continue
+        yield f"id: {event['id']}\nevent: {event['type']}\ndata: {app.json.dumps(event)}\n\n"
+
+
+def stream_job_events(job):
+    """
+    Returns a server-sent events response for a job, resuming after the
+    `Last-Event-ID` header when the browser reconnects.
+    """
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    start = last_event_id + 1 if last_event_id is not None else 0
+    return Response(format_server_sent_events(job, start), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """
+    Stream the results of a simulation job as server-sent events.
+
+    A "year" event is sent as soon as a simulation year finishes. It contains the
+    year record (as in /graphics_data) and only the households whose package
+    installations changed that year (as in /households). An "end" event with
+    the final job status closes the stream.
+
+    Returns:
+        An event stream. Returns a 404 error for unknown jobs.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} niet gevonden."}), 404
+    return stream_job_events(job)
+
+
+@app.route('/simulation/events', methods=['GET'])
+def get_simulation_events():
+    """
+    Stream the results of the most recently started simulation job as server-sent events.
+
+    Returns:
+        An event stream. Returns a 400 error if no simulation was started.
+    """
+    job = job_manager.latest()
+    if job is None:
+        return jsonify({"status": "error", "message": "Geen simulatie gestart."}), 400
+    return stream_job_events(job)
 
 
 @app.route("/graphics_data", methods=["GET"])
 def get_graphics_data():
     """
-    Retrieve the graphical data from the most recently run simulation.
+    Retrieve the graphical data from the most recently started simulation job.
 
     This data is typically aggregated per year and suitable for plotting.
 
@@ -60,6 +284,8 @@ def get_graphics_data():
         JSON response with the graphical data.
         Returns a 400 error if no simulation data is available.
     """
+    job = job_manager.latest()
+    graphics_data = job.results.get_graphics_data() if job is not None else []
     if not graphics_data:
         return jsonify({"error": "No simulation data available"}), 400
     return jsonify(graphics_data)
@@ -68,17 +294,17 @@ def get_graphics_data():
 @app.route('/households', methods=['GET'])
 def fetch_households():
     """
-    Retrieve detailed household data from the most recently run simulation.
+    Retrieve detailed household data from the most recently started simulation job.
 
-    This includes information about each household and its residents.
+    This includes information about each household and its residents. Supports
+    pagination, field selection, a `since_year` delta mode and ETags (see
+    `households_response`).
 
     Returns:
         JSON response with the household data.
         Returns a 400 error if no household data is available.
     """
-    if not households_data:
-        return jsonify({"error": "No household data available"}), 400
-    return jsonify(households_data)
+    return households_response(job_manager.latest())
 
 
 @app.route('/AI_response', methods=['POST'])
@@ -102,6 +328,32 @@ def ai_test_response():
         return jsonify({"error": str(e)}), 400
 
 
+@app.route('/AI_interviews', methods=['POST'])
+def ai_interviews():
+    """
+    Ask many residents the same question at once.
+
+    Example body:
+        {"resident_ids": [1, 2, 3], "prompt": "Why didn't you install a heat pump?"}
+
+    Returns:
+        JSON response with the answer per resident id and the error per resident
+        id for failed requests. Returns a 400 error if the input is invalid.
+    """
+    data = request.get_json()
+    resident_ids = data.get("resident_ids")
+    prompt = data.get("prompt", "")
+
+    if not isinstance(resident_ids, list) or not all(isinstance(resident_id, int) for resident_id in resident_ids):
+        return jsonify({"error": "resident_ids must be a list of integers"}), 400
+
+    try:
+        responses, errors = llm_handler.interview_residents(resident_ids, prompt)
+        return jsonify({"responses": responses, "errors": errors})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 @app.route('/toggle_pause', methods=['POST'])
 def toggle_pause():
     new_state = toggle_simulation_pause()
@@ -0,0 +1,212 @@
+"""
+Monte Carlo batch runner for the agent-based model.
+
+Runs many independent simulations (seeds x parameter combinations) across a
+process pool and streams aggregated yearly statistics back as the workers
+finish. Every replication runs in its own Environment, seeded with its own
+seed, so results are reproducible per seed regardless of the number of
+workers or the order in which replications finish.
+
+Example:
+    python batch_runner.py --seeds 1 2 3 4 --grid energy_price=0.25,0.32 --workers 4
+"""
+import argparse
+import itertools
+import json
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+from environment import Environment
+
+Z_95 = 1.96  # z-value for a 95% confidence interval (normal approximation)
+
+
+def expand_param_grid(param_grid):
+    """
+    Expands a parameter grid into a list of parameter combinations.
+
+    Args:
+        param_grid (dict | None): Config key to list of values, e.g. {"energy_price": [0.25, 0.32]}.
+
+    Returns:
+        list[dict]: One dict per combination. A single empty dict if no grid is given.
+
+    Raises:
+        KeyError: If a key does not exist in the chosen configuration.
+    """
+    if not param_grid:
+        return [{}]
+
+    conf = config.configs[config.CHOSEN_CONFIG]
+    for key in param_grid:
+        if key not in conf:
+            raise KeyError(f"Parameter '{key}' does not exist in config {config.CHOSEN_CONFIG}.")
+
+    keys = list(param_grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[key] for key in keys))]
+
+
+def run_replication(seed, params, simulation_years=None):
+    """
+    Runs one headless simulation with the given seed and config overrides.
+
+    Executed inside a worker process. The chosen configuration is overridden
+    for the duration of the run and restored afterwards, because a worker
+    process runs several replications one after another.
+
+    Args:
+        seed (int): Seed for `random`, `np.random` and the random streams.
+        params (dict): Config overrides for this replication.
+        simulation_years (int | None): Number of years, defaults to the config value.
+
+    Returns:
+        tuple: (seed, params, yearly_stats) with the collected data of every year.
+    """
+    conf = config.configs[config.CHOSEN_CONFIG]
+    original_conf = dict(conf)
+    conf.update(params)
+    try:
+        random.seed(seed)
+        np.random.seed(seed)
+        years = simulation_years if simulation_years is not None else conf['simulation_years']
+
+        model = Environment(nr_households=conf['nr_households'], nr_residents=conf['nr_residents'], seed=seed)
+        for year in range(years):
+            data = model.collect_start_of_year_data(year + 1)
+            model.step()
+            model.collect_end_of_year_data(data)
+        return seed, params, model.yearly_stats
+    finally:
+        conf.clear()
+        conf.update(original_conf)
+
+
+def mean_ci(values):
+    """
+    Calculates the mean and the 95% confidence interval of a sample.
+
+    Args:
+        values (list[float]): The sample.
+
+    Returns:
+        dict: {"mean", "ci_low", "ci_high"}. The interval collapses to the mean for a single value.
+    """
+    sample = np.asarray(values, dtype=np.float64)
+    mean = float(sample.mean())
+    if len(sample) < 2:
+        return {"mean": mean, "ci_low": mean, "ci_high": mean}
+    half_width = Z_95 * float(sample.std(ddof=1)) / np.sqrt(len(sample))
+    return {"mean": mean, "ci_low": mean - half_width, "ci_high": mean + half_width}
+
+
+def summarize_replications(results):
+    """
+    Aggregates the yearly statistics of several replications.
+
+    Args:
+        results (dict[int, list[dict]]): Seed to the yearly stats of that replication.
+
+    Returns:
+        list[dict]: Per year the mean and confidence interval of `households_with_package`
+                    (per package, end of year) and `total_co2_saved_yearly`.
+    """
+    # Sorted by seed so the floating point result does not depend on completion order
+    runs = [results[seed] for seed in sorted(results)]
+    nr_years = min(len(run) for run in runs)
+    package_names = list(runs[0][0]["end_state_per_package"]) if nr_years else []
+
+    summary = []
+    for y in range(nr_years):
+        summary.append({
+            "year": runs[0][y]["year"],
+            "households_with_package": {
+                name: mean_ci([run[y]["end_state_per_package"][name]["households_with_package"] for run in runs])
+                for name in package_names
+            },
+            "total_co2_saved_yearly": mean_ci([run[y]["total_co2_saved_yearly"] for run in runs]),
+        })
+    return summary
+
+
+def run_batch(seeds, param_grid=None, simulation_years=None, max_workers=None):
+    """
+    Runs every combination of seed and parameters across a process pool.
+
+    Yields an updated summary for a parameter combination every time one of its
+    replications finishes, so callers can show progress while the batch runs.
+
+    Args:
+        seeds (list[int]): Seeds to run for every parameter combination.
+        param_grid (dict | None): Config key to list of values to sweep.
+        simulation_years (int | None): Number of years per run, defaults to the config value.
+        max_workers (int | None): Number of worker processes, defaults to the number of CPUs.
+
+    Yields:
+        dict: {"params", "seeds", "completed", "total", "summary"} for the combination
+              whose replication just finished.
+    """
+    combinations = expand_param_grid(param_grid)
+    results = [dict() for _ in combinations]
+    total = len(seeds) * len(combinations)
+    completed = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_replication, seed, params, simulation_years): index
+            for index, params in enumerate(combinations)
+            for seed in seeds
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            seed, params, yearly_stats = future.result()
+            results[index][seed] = yearly_stats
+            completed += 1
+
+            yield {
+                "params": params,
+                "seeds": sorted(results[index]),
+                "completed": completed,
+                "total": total,
+                "summary": summarize_replications(results[index]),
+            }
+
+
+def parse_grid(grid_args):
+    """
+    Parses command line grid arguments of the form key=value1,value2.
+
+    Values are parsed as JSON where possible (numbers, lists), otherwise kept as strings.
+    """
+    param_grid = {}
+    for arg in grid_args or []:
+        key, _, values = arg.partition("=")
+        parsed = []
+        for value in values.split(","):
+            try:
+                parsed.append(json.loads(value))
+            except json.JSONDecodeError:
+                parsed.append(value)
+        param_grid[key] = parsed
+    return param_grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Monte Carlo batches of the simulation.")
+    parser.add_argument("--seeds", type=int, nargs="+", required=True, help="Seeds to run.")
+    parser.add_argument("--grid", nargs="*", help="Parameter sweeps as key=value1,value2.")
+    parser.add_argument("--years", type=int, default=None, help="Simulation years per run.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    final_summaries = {}
+    for update in run_batch(args.seeds, parse_grid(args.grid), args.years, args.workers):
+        print(f"[{update['completed']}/{update['total']}] params={update['params']} seeds={update['seeds']}")
+        final_summaries[json.dumps(update["params"], sort_keys=True)] = update
+
+    for update in final_summaries.values():
+        last_year = update["summary"][-1]
+        print(f"params={update['params']} year {last_year['year']}: "
+              f"co2 saved {last_year['total_co2_saved_yearly']['mean'] / 1000:.1f} tons, "
+              f"households with package { {k: round(v['mean'], 1) for k, v in last_year['households_with_package'].items()} }")
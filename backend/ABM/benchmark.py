@@ -0,0 +1,357 @@
+"""
+Scaling benchmark of the simulation.
+
+Runs headless simulations (through `main.run_simulation`) for every
+combination of population size, subjective norm level, `collect_data` setting
+and package set, and writes a machine-readable JSON report with the wall time
+of every year (and of its phases, see metrics.py), the peak memory and the
+throughput in agent-years per second of every case.
+
+Every case runs in a fresh worker process, one at a time, so the peak memory
+of a case is not inflated by the cases before it and cases do not compete for
+the CPU. The report also holds a scaling exponent per group of cases: the
+slope of log(seconds per year) against log(households), 1.0 meaning linear
+scaling.
+
+A comparison mode matches the cases of two reports and shows the speedup and
+memory change per case and the change of the scaling exponents, so an
+optimization can be checked at every size instead of only the default one.
+
+Example:
+    python benchmark.py --sizes 1000 10000 100000 1000000 --years 5 --output before.json
+    python benchmark.py --sizes 1000 10000 100000 1000000 --years 5 --output after.json --compare before.json
+    python benchmark.py --compare before.json --current after.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+NORM_LEVELS = ("District", "Street", "Direct")
+RUN_LOOP_PHASES = ("collect_start", "step", "collect_end", "events", "export", "checkpoint")
+REPORT_VERSION = 1
+
+
+def benchmark_cases(sizes, norm_levels=NORM_LEVELS, collect_data_options=(False, True), package_sets=None):
+    """
+    Lists the benchmark cases.
+
+    Args:
+        sizes (list[int]): Numbers of households.
+        norm_levels (list[str]): Values of `subj_norm_level`.
+        collect_data_options (list[bool]): Values of `collect_data`.
+        package_sets (list[list[str]] | None): Values of `sustainability_packages`,
+            defaults to the configured packages.
+
+    Returns:
+        list[dict]: One dict per case with "nr_households", "subj_norm_level",
+                    "collect_data" and "packages".
+    """
+    if package_sets is None:
+        package_sets = [config.configs[config.CHOSEN_CONFIG]['sustainability_packages']]
+    return [
+        {"nr_households": size, "subj_norm_level": level, "collect_data": collect_data, "packages": list(packages)}
+        for packages, level, collect_data, size in itertools.product(
+            package_sets, norm_levels, collect_data_options, sorted(sizes))
+    ]
+
+
+def case_key(case):
+    """
+    Returns:
+        str: Identifier of a case, used to match cases between reports.
+    """
+    return (f"households={case['nr_households']} norm={case['subj_norm_level']} "
+            f"collect_data={case['collect_data']} packages={'+'.join(case['packages'])}")
+
+
+def peak_memory_mb():
+    """
+    Returns:
+        float | None: Peak resident memory of this process in MB, None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 2 ** 10
+
+
+def run_case(case, simulation_years, seed, engine=None):
+    """
+    Runs one benchmark case. Executed inside a worker process.
+
+    The chosen configuration is overridden for the duration of the run and
+    restored afterwards. The number of residents per household is taken from
+    the configuration. Exported data goes to a temporary folder.
+
+    Args:
+        case (dict): The case, see `benchmark_cases`.
+        simulation_years (int): Number of years to simulate.
+        seed (int): Seed of the run.
+        engine (str | None): "object" or "vectorized", defaults to the configured engine.
+
+    Returns:
+        dict: The case with "nr_residents", "years" (per year "year", "seconds" and
+              "phases"), "seconds_per_year", "total_seconds", "agent_years_per_second",
+              "baseline_memory_mb" and "peak_memory_mb".
+    """
+    import main
+
+    conf = config.configs[config.CHOSEN_CONFIG]
+    original_conf = dict(conf)
+    nr_residents = round(case["nr_households"] * conf['nr_residents'] / conf['nr_households'])
+    baseline_memory = peak_memory_mb()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            conf.update({
+                "subj_norm_level": case["subj_norm_level"],
+                "collect_data": case["collect_data"],
+                "sustainability_packages": list(case["packages"]),
+                "engine": engine or conf['engine'],
+                "headless": True,
+                "checkpoint_every": 0,
+                "data_save_folder": folder + os.sep,
+            })
+            results = main.SimulationResults()
+            outcome = main.run_simulation(case["nr_households"], nr_residents, simulation_years, seed,
+                                          headless=True, results=results)
+            metrics = results.metrics.to_dict()
+    finally:
+        conf.clear()
+        conf.update(original_conf)
+
+    years = [
+        {
+            "year": record["year"],
+            "seconds": sum(record["phases"].get(phase, 0.0) for phase in RUN_LOOP_PHASES),
+            "phases": record["phases"],
+        }
+        for record in metrics["years"]
+    ]
+    simulated_seconds = sum(year["seconds"] for year in years)
+    agent_years = (case["nr_households"] + nr_residents) * len(years)
+    return {
+        **case,
+        "nr_residents": nr_residents,
+        "engine": engine or original_conf['engine'],
+        "years": years,
+        "seconds_per_year": simulated_seconds / len(years) if years else None,
+        "total_seconds": outcome["elapsed_seconds"],
+        "agent_years_per_second": agent_years / simulated_seconds if simulated_seconds > 0 else None,
+        "counters": metrics["counters"],
+        "baseline_memory_mb": baseline_memory,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+
+def scaling_exponents(case_results):
+    """
+    Fits how the time per year grows with the number of households.
+
+    Args:
+        case_results (list[dict]): Output of `run_case` for several cases.
+
+    Returns:
+        dict: Group key (norm level, collect_data and packages) to the slope of
+              log(seconds per year) against log(households). Groups with fewer
+              than two sizes are left out.
+    """
+    groups = {}
+    for result in case_results:
+        if result.get("seconds_per_year"):
+            group = case_key({**result, "nr_households": "*"})
+            groups.setdefault(group, []).append((result["nr_households"], result["seconds_per_year"]))
+
+    exponents = {}
+    for group, points in groups.items():
+        if len({size for size, _ in points}) < 2:
+            continue
+        sizes, seconds = zip(*points)
+        slope, _ = np.polyfit(np.log(sizes), np.log(seconds), 1)
+        exponents[group] = float(slope)
+    return exponents
+
+
+def run_benchmark(cases, simulation_years, seed=0, engine=None):
+    """
+    Runs every case in its own worker process and builds the report.
+
+    Args:
+        cases (list[dict]): Output of `benchmark_cases`.
+        simulation_years (int): Number of years per case.
+        seed (int): Seed of every case.
+        engine (str | None): "object" or "vectorized", defaults to the configured engine.
+
+    Returns:
+        dict: The report with the machine details, "cases" and "scaling".
+    """
+    case_results = []
+    for case in cases:
+        # A fresh process per case keeps the peak memory measurements independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            result = executor.submit(run_case, case, simulation_years, seed, engine).result()
+        print(f"{case_key(case)}: {result['seconds_per_year']:.3f} s/year, "
+              f"{result['agent_years_per_second']:,.0f} agent-years/s, peak memory {result['peak_memory_mb']} MB")
+        case_results.append(result)
+
+    return {
+        "version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config_id": config.CHOSEN_CONFIG,
+        "simulation_years": simulation_years,
+        "seed": seed,
+        "cases": case_results,
+        "scaling": scaling_exponents(case_results),
+    }
+
+
+def compare_reports(baseline, current, tolerance=0.1):
+    """
+    Compares two benchmark reports case by case.
+
+    Args:
+        baseline (dict): The earlier report.
+        current (dict): The new report.
+        tolerance (float): Relative slowdown (seconds per year) or memory growth
+            that still counts as unchanged.
+
+    Returns:
+        dict: "cases" with per matching case the baseline and current seconds per
+              year, "speedup" (baseline / current), the peak memory of both and
+              "regression"; "scaling" with the exponents of both reports per group;
+              and "regressions", the keys of the regressed cases.
+    """
+    baseline_cases = {case_key(case): case for case in baseline["cases"]}
+    cases = {}
+    for case in current["cases"]:
+        key = case_key(case)
+        if key not in baseline_cases:
+            continue
+        old = baseline_cases[key]
+        speedup = (old["seconds_per_year"] / case["seconds_per_year"]
+                   if old.get("seconds_per_year") and case.get("seconds_per_year") else None)
+        memory_ratio = (case["peak_memory_mb"] / old["peak_memory_mb"]
+                        if old.get("peak_memory_mb") and case.get("peak_memory_mb") else None)
+        cases[key] = {
+            "baseline_seconds_per_year": old.get("seconds_per_year"),
+            "current_seconds_per_year": case.get("seconds_per_year"),
+            "speedup": speedup,
+            "baseline_peak_memory_mb": old.get("peak_memory_mb"),
+            "current_peak_memory_mb": case.get("peak_memory_mb"),
+            "regression": bool(
+                (speedup is not None and speedup < 1 / (1 + tolerance)) or
+                (memory_ratio is not None and memory_ratio > 1 + tolerance)
+            ),
+        }
+
+    scaling = {
+        group: {"baseline": baseline.get("scaling", {}).get(group), "current": exponent}
+        for group, exponent in current.get("scaling", {}).items()
+    }
+    return {
+        "cases": cases,
+        "scaling": scaling,
+        "regressions": [key for key, comparison in cases.items() if comparison["regression"]],
+    }
+
+
+def print_comparison(comparison):
+    """
+    Prints the output of `compare_reports` as a table.
+    """
+    for key, case in comparison["cases"].items():
+        speedup = f"{case['speedup']:.2f}x" if case["speedup"] is not None else "n/a"
+        flag = "  REGRESSION" if case["regression"] else ""
+        print(f"{key}: {case['baseline_seconds_per_year']:.3f} -> {case['current_seconds_per_year']:.3f} s/year "
+              f"({speedup}), peak memory {case['baseline_peak_memory_mb']} -> {case['current_peak_memory_mb']} MB{flag}")
+    for group, exponents in comparison["scaling"].items():
+        old = exponents["baseline"]
+        print(f"scaling {group}: exponent {'n/a' if old is None else f'{old:.2f}'} -> {exponents['current']:.2f}")
+
+
+def parse_package_sets(package_set_args):
+    """
+    Parses command line package sets of the form "Solar Panel,Heat Pump".
+
+    Returns:
+        list[list[str]] | None: The package sets, None to use the configured packages.
+    """
+    if not package_set_args:
+        return None
+    return [[name.strip() for name in package_set.split(",") if name.strip()] for package_set in package_set_args]
+
+
+def load_report(path):
+    """
+    Reads a benchmark report.
+
+    Raises:
+        ValueError: If the report was written by an incompatible version.
+    """
+    with open(path) as file:
+        report = json.load(file)
+    if report.get("version") != REPORT_VERSION:
+        raise ValueError(f"Unsupported benchmark report version {report.get('version')} in {path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark how the simulation scales.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Numbers of households.")
+    parser.add_argument("--norm-levels", nargs="+", default=list(NORM_LEVELS), help="Subjective norm levels.")
+    parser.add_argument("--collect-data", choices=["on", "off", "both"], default="both",
+                        help="Run with data collection on, off or both.")
+    parser.add_argument("--packages", nargs="+", default=None,
+                        help='Package sets as comma separated names, e.g. "Solar Panel,Heat Pump".')
+    parser.add_argument("--years", type=int, default=5, help="Simulation years per case.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of every case.")
+    parser.add_argument("--engine", choices=["object", "vectorized"], default=None, help="Simulation engine.")
+    parser.add_argument("--output", default=None, help="Path of the JSON report to write.")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare with.")
+    parser.add_argument("--current", default=None,
+                        help="Compare this existing report with --compare instead of running the benchmark.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Relative slowdown or memory growth reported as a regression.")
+    args = parser.parse_args()
+
+    if args.current is not None:
+        if args.compare is None:
+            parser.error("--current requires --compare")
+        report = load_report(args.current)
+    else:
+        collect_data_options = {"on": (True,), "off": (False,), "both": (False, True)}[args.collect_data]
+        report = run_benchmark(
+            benchmark_cases(args.sizes, args.norm_levels, collect_data_options, parse_package_sets(args.packages)),
+            args.years, args.seed, args.engine,
+        )
+        output = args.output or f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Report written to {output}")
+
+    for group, exponent in report["scaling"].items():
+        print(f"scaling {group}: time per year ~ households^{exponent:.2f}")
+
+    if args.compare is not None:
+        comparison = compare_reports(load_report(args.compare), report, args.tolerance)
+        print_comparison(comparison)
+        if comparison["regressions"]:
+            raise SystemExit(f"{len(comparison['regressions'])} case(s) regressed")
@@ -0,0 +1,163 @@
+"""
+Checkpointing of a running simulation.
+
+A checkpoint stores the complete state of an Environment after a simulation
+year: all agents, the streets, the package prices, the CO2 totals, the
+collected yearly data, the vectorized engine (if any) and the states of the
+global `random` and `np.random` generators. With `random_streams` the draws
+only depend on the seed and the year, both part of the model. Resuming from
+a checkpoint therefore continues exactly like the uninterrupted run would have.
+The data exporter is stored as well, with the length of its records file, so
+a resumed run first drops whatever the interrupted run exported after the
+checkpoint (`rewind`) and the export files end up as if it never stopped.
+
+The model is pickled and gzip compressed. The configuration the model was
+created with is part of the pickled state, so a resumed run keeps using it.
+Checkpoints are pickles: only load checkpoints you created yourself.
+"""
+import gzip
+import os
+import pickle
+import random
+import tempfile
+import numpy as np
+
+CHECKPOINT_VERSION = 6
+
+
+def checkpoint_path(folder, seed, year):
+    """
+    Returns the path of the checkpoint of a run after a given year.
+
+    Args:
+        folder (str): Folder the checkpoints are stored in.
+        seed (int): Seed of the run.
+        year (int): The simulation year after which the checkpoint is taken.
+
+    Returns:
+        str: Path like `<folder>/checkpoint_<seed>_year_005.pkl.gz`.
+    """
+    return os.path.join(folder, f"checkpoint_{seed}_year_{year:03d}.pkl.gz")
+
+
+def capture_state(model, year, seed=None, exporter=None):
+    """
+    Captures the state of a simulation after a year, including the global RNG states.
+
+    Args:
+        model (Environment): The simulation environment.
+        year (int): The number of completed simulation years.
+        seed (int | None): Seed of the run.
+        exporter (JsonLinesExporter | ColumnarExporter | None): The data exporter of the run.
+
+    Returns:
+        dict: The checkpoint state.
+    """
+    model.statistics.invalidate()
+    return {
+        "version": CHECKPOINT_VERSION,
+        "year": year,
+        "seed": seed,
+        "model": model,
+        "exporter": exporter,
+        "random_state": random.getstate(),
+        "np_random_state": np.random.get_state(),
+    }
+
+
+def restore_rng_states(state):
+    """
+    Restores the global `random` and `np.random` states of a checkpoint.
+
+    Args:
+        state (dict): The checkpoint state.
+    """
+    random.setstate(state["random_state"])
+    np.random.set_state(state["np_random_state"])
+
+
+def save_checkpoint(path, model, year, seed=None, exporter=None):
+    """
+    Writes a checkpoint of a simulation after a year.
+
+    The file is written atomically, so an interrupted save never leaves a
+    broken checkpoint behind.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        model (Environment): The simulation environment.
+        year (int): The number of completed simulation years.
+        seed (int | None): Seed of the run.
+        exporter (JsonLinesExporter | ColumnarExporter | None): The data exporter of the run.
+
+    Returns:
+        str: The path of the checkpoint.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    state = capture_state(model, year, seed, exporter)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def snapshot(model, year, seed=None):
+    """
+    Captures the state of a simulation in memory, e.g. to fork scenarios from it.
+
+    Args:
+        model (Environment): The simulation environment.
+        year (int): The number of completed simulation years.
+        seed (int | None): Seed of the run.
+
+    Returns:
+        bytes: The pickled checkpoint state.
+    """
+    return pickle.dumps(capture_state(model, year, seed), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore_snapshot(data):
+    """
+    Creates an independent copy of the simulation from a snapshot and restores
+    the global RNG states, so the copy continues exactly like the original.
+
+    Args:
+        data (bytes): Output of `snapshot`.
+
+    Returns:
+        dict: The checkpoint state (see `load_checkpoint`).
+    """
+    state = pickle.loads(data)
+    restore_rng_states(state)
+    return state
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint.
+
+    The global RNG states are not touched; call `restore_rng_states` before
+    continuing the simulation.
+
+    Args:
+        path (str): Path of the checkpoint file.
+
+    Returns:
+        dict: The checkpoint state with "year", "seed", "model", "exporter",
+              "random_state" and "np_random_state".
+
+    Raises:
+        ValueError: If the file was written by an incompatible version.
+    """
+    with gzip.open(path, "rb") as file:
+        state = pickle.load(file)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {path}")
+    return state
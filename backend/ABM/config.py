@@ -11,6 +11,11 @@ configs = {
         "nr_households": 840, # https://www.cbs.nl/nl-nl/visualisaties/dashboard-bevolking/woonsituatie/huishoudens-nu#:~:text=Begin%202024%20waren%20er%208,gemiddelde%20huishoudensgrootte%20nog%203%2C49.
         "nr_residents": 1772,
         "simulation_years": 30,
+        "engine": "object", # object (agent per resident) or vectorized (NumPy arrays, same results)
+        "headless": False, # Run without delays, pause polling and per-year printing (benchmarks, batch runs)
+        "agent_init": "sequential", # sequential (agent by agent) or bulk (vectorized draws, faster for large populations, different random stream)
+        "prune_never_adopters": False, # Stop evaluating residents that can provably never adopt a package (same adoption, their norm/behavioral control averages freeze)
+        "random_streams": False, # Draw from seeded per-subsystem streams instead of the global random generators (order independent, different random stream)
 
         # Environment parameters
         "subjective_norm": 0.0, # Initial environmental influence (0-1)
@@ -27,9 +32,19 @@ configs = {
         "initial_heatpump_chance": 0.07, # https://longreads.cbs.nl/klimaatverandering-en-energietransitie-2023/duurzaam-wonen/#:~:text=Ruim%201%20op%20de%2014%20huishoudens%20heeft%20een%20warmtepomp&text=Het%20gaat%20in%20totaal%20om,Ligthart%20en%20Blijie%2C%202022).
         "solarpanel_price_increase": (0, 20), # Random increase in solar panel price per year (in euros)
         "heatpump_price_increase": (0, 300),
+        "insulation_price": 3500, # Average price of cavity wall insulation (in euros)
+        "insulation_price_increase": (0, 100),
+        "insulation_gas_saving": 0.25, # Fraction of the gas usage saved by insulation
+        "initial_insulation_chance": 0.0,
         "min_nr_houses": 20,
         "max_nr_houses": 60,
-        "subj_norm_level": "Street", # District, Street, Direct
+        "subj_norm_level": "Street", # District, Street, Direct, Network
+        "sustainability_packages": ["Solar Panel", "Heat Pump"], # Registered packages in the simulation, e.g. add "Insulation"
+        "network_topology": "street", # Neighbour graph of the Network norm level: street, grid, small_world or geo
+        "network_neighbours": 4, # Neighbours per household in the small_world topology
+        "network_rewire_chance": 0.1, # Chance to rewire each edge in the small_world topology
+        "network_coordinates_file": None, # CSV file with x,y columns, one row per household (geo topology)
+        "network_radius": 50.0, # Households within this distance are neighbours (geo topology)
 
         # Household Agent parameters
         "solar_panel_amount_options": [6, 8, 10], # Number of solar panels a household can choose to install
@@ -48,7 +63,17 @@ configs = {
 
         # Data collection parameters
         'collect_data': True, # Whether to collect data for analysis
-        'data_save_folder': 'data/' # Folder to save collected data
+        'data_save_folder': 'data/', # Folder to save collected data
+        'data_format': 'jsonl', # jsonl (one JSON line per resident per year) or npy (typed, memory-mappable columns)
+
+        # Checkpoint parameters
+        'checkpoint_every': 0, # Write a checkpoint after every N simulation years, 0 to disable
+        'checkpoint_folder': 'data/checkpoints/', # Folder for checkpoints (see checkpoint.py)
+
+        # LLM interview parameters
+        'llm_host': None, # URL of the Ollama compatible endpoint, None for the default (http://localhost:11434)
+        'llm_max_workers': 8, # Number of concurrent requests for batch interviews
+        'llm_cache_folder': 'data/llm_cache/', # Folder for cached LLM responses, None to disable caching
     },
 
     1: {
@@ -59,6 +84,11 @@ configs = {
         "nr_households": 840, # https://www.cbs.nl/nl-nl/visualisaties/dashboard-bevolking/woonsituatie/huishoudens-nu#:~:text=Begin%202024%20waren%20er%208,gemiddelde%20huishoudensgrootte%20nog%203%2C49.
         "nr_residents": 1772,
         "simulation_years": 30,
+        "engine": "object", # object (agent per resident) or vectorized (NumPy arrays, same results)
+        "headless": False, # Run without delays, pause polling and per-year printing (benchmarks, batch runs)
+        "agent_init": "sequential", # sequential (agent by agent) or bulk (vectorized draws, faster for large populations, different random stream)
+        "prune_never_adopters": False, # Stop evaluating residents that can provably never adopt a package (same adoption, their norm/behavioral control averages freeze)
+        "random_streams": False, # Draw from seeded per-subsystem streams instead of the global random generators (order independent, different random stream)
 
         # Environment parameters
         "subjective_norm": 0.0, # Initial environmental influence (0-1)
@@ -75,9 +105,19 @@ configs = {
         "initial_heatpump_chance": 0.07, # https://longreads.cbs.nl/klimaatverandering-en-energietransitie-2023/duurzaam-wonen/#:~:text=Ruim%201%20op%20de%2014%20huishoudens%20heeft%20een%20warmtepomp&text=Het%20gaat%20in%20totaal%20om,Ligthart%20en%20Blijie%2C%202022).
         "solarpanel_price_increase": (0, 20), # Random increase in solar panel price per year (in euros)
         "heatpump_price_increase": (0, 300),
+        "insulation_price": 3500, # Average price of cavity wall insulation (in euros)
+        "insulation_price_increase": (0, 100),
+        "insulation_gas_saving": 0.25, # Fraction of the gas usage saved by insulation
+        "initial_insulation_chance": 0.0,
         "min_nr_houses": 20,
         "max_nr_houses": 60,
-        "subj_norm_level": "Street", # District, Street, Direct
+        "subj_norm_level": "Street", # District, Street, Direct, Network
+        "sustainability_packages": ["Solar Panel", "Heat Pump"], # Registered packages in the simulation, e.g. add "Insulation"
+        "network_topology": "street", # Neighbour graph of the Network norm level: street, grid, small_world or geo
+        "network_neighbours": 4, # Neighbours per household in the small_world topology
+        "network_rewire_chance": 0.1, # Chance to rewire each edge in the small_world topology
+        "network_coordinates_file": None, # CSV file with x,y columns, one row per household (geo topology)
+        "network_radius": 50.0, # Households within this distance are neighbours (geo topology)
 
         # Household Agent parameters
         "solar_panel_amount_options": [6, 8, 10], # Number of solar panels a household can choose to install
@@ -96,7 +136,17 @@ configs = {
 
         # Data collection parameters
         'collect_data': True, # Whether to collect data for analysis
-        'data_save_folder': 'data/' # Folder to save collected data
+        'data_save_folder': 'data/', # Folder to save collected data
+        'data_format': 'jsonl', # jsonl (one JSON line per resident per year) or npy (typed, memory-mappable columns)
+
+        # Checkpoint parameters
+        'checkpoint_every': 0, # Write a checkpoint after every N simulation years, 0 to disable
+        'checkpoint_folder': 'data/checkpoints/', # Folder for checkpoints (see checkpoint.py)
+
+        # LLM interview parameters
+        'llm_host': None, # URL of the Ollama compatible endpoint, None for the default (http://localhost:11434)
+        'llm_max_workers': 8, # Number of concurrent requests for batch interviews
+        'llm_cache_folder': 'data/llm_cache/', # Folder for cached LLM responses, None to disable caching
     },
 
     2: {
@@ -0,0 +1,38 @@
+"""
+Shared fixtures of the ABM tests.
+"""
+import pytest
+import config
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "config(**values): configuration values set by the small_config fixture"
+    )
+
+
+@pytest.fixture
+def small_config(request, monkeypatch):
+    """
+    The chosen configuration with a small population and data collection off.
+
+    Modules and tests set other values with the `config` marker, e.g.
+    `pytestmark = pytest.mark.config(nr_households=120, nr_residents=250)`;
+    a marker on the test overrides one on the module. The whole configuration
+    is restored after the test, including values the code under test changed.
+
+    Returns:
+        dict: The chosen configuration.
+    """
+    conf = config.configs[config.CHOSEN_CONFIG]
+    original = dict(conf)
+    values = {"nr_households": 60, "nr_residents": 130, "collect_data": False}
+    for marker in reversed(list(request.node.iter_markers("config"))):
+        values.update(marker.kwargs)
+    for key, value in values.items():
+        monkeypatch.setitem(conf, key, value)
+
+    yield conf
+
+    conf.clear()
+    conf.update(original)
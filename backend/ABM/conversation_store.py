@@ -0,0 +1,153 @@
+"""
+Indexed storage of the LLM conversations of residents.
+
+Conversations are stored in a small SQLite database next to the simulation
+manifest (`simulation_data_NNN_conversations.sqlite`), one row per message,
+indexed on (resident id, message number). Loading the conversation of one
+resident or appending a chat turn only touches the rows of that resident,
+instead of loading and rewriting the whole simulation file.
+
+All access goes through one connection guarded by a lock and every append is
+a single transaction, so concurrent Flask threads can chat at the same time.
+"""
+import os
+import sqlite3
+import threading
+
+
+def conversations_file_name(manifest_file_name):
+    """
+    Returns the path of the conversation store that belongs to a manifest.
+
+    Args:
+        manifest_file_name (str | Path): Path of the `simulation_data_NNN.json` manifest.
+
+    Returns:
+        str: Path of the matching `simulation_data_NNN_conversations.sqlite` file.
+    """
+    return os.path.splitext(str(manifest_file_name))[0] + "_conversations.sqlite"
+
+
+class ConversationStore:
+    """
+    Per-resident conversation history in an SQLite database.
+
+    Attributes:
+        path (str): Path of the database file.
+    """
+    def __init__(self, path):
+        """
+        Opens (and if needed creates) the database.
+
+        Args:
+            path (str | Path): Path of the database file.
+        """
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " resident_id INTEGER NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " PRIMARY KEY (resident_id, position))"
+            )
+
+    def get(self, resident_id):
+        """
+        Returns the conversation of a resident.
+
+        Args:
+            resident_id (int): The unique id of the resident.
+
+        Returns:
+            list[dict]: The messages ({"role": ..., "content": ...}), oldest first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT role, content FROM messages WHERE resident_id = ? ORDER BY position",
+                (int(resident_id),),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def append(self, resident_id, messages):
+        """
+        Appends messages to the conversation of a resident in one transaction.
+
+        Args:
+            resident_id (int): The unique id of the resident.
+            messages (list[dict]): The messages to append, oldest first.
+        """
+        if not messages:
+            return
+        with self._lock, self._connection:
+            next_position = self._connection.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM messages WHERE resident_id = ?",
+                (int(resident_id),),
+            ).fetchone()[0]
+            self._connection.executemany(
+                "INSERT INTO messages (resident_id, position, role, content) VALUES (?, ?, ?, ?)",
+                [
+                    (int(resident_id), next_position + i, message["role"], message["content"])
+                    for i, message in enumerate(messages)
+                ],
+            )
+
+    def start(self, resident_id, messages):
+        """
+        Stores the first messages of a conversation, unless the resident already has one.
+
+        Args:
+            resident_id (int): The unique id of the resident.
+            messages (list[dict]): The opening messages (e.g. the system prompt).
+
+        Returns:
+            list[dict]: The conversation of the resident after the call.
+        """
+        with self._lock, self._connection:
+            exists = self._connection.execute(
+                "SELECT 1 FROM messages WHERE resident_id = ? LIMIT 1", (int(resident_id),)
+            ).fetchone()
+            if not exists:
+                self._connection.executemany(
+                    "INSERT INTO messages (resident_id, position, role, content) VALUES (?, ?, ?, ?)",
+                    [(int(resident_id), i, message["role"], message["content"]) for i, message in enumerate(messages)],
+                )
+        return self.get(resident_id)
+
+    def resident_ids(self):
+        """
+        Returns:
+            list[int]: The ids of all residents with a conversation.
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT DISTINCT resident_id FROM messages ORDER BY resident_id").fetchall()
+        return [resident_id for (resident_id,) in rows]
+
+    def is_empty(self):
+        """
+        Returns:
+            bool: True if no conversation has been stored yet.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM messages LIMIT 1").fetchone() is None
+
+    def import_history(self, conversation_history):
+        """
+        Imports conversations in the legacy manifest format.
+
+        Args:
+            conversation_history (dict): {"residents": {resident_id: [messages]}}.
+        """
+        for resident_id, messages in conversation_history.get("residents", {}).items():
+            self.append(int(resident_id), messages)
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        with self._lock:
+            self._connection.close()
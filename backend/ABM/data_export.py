@@ -0,0 +1,628 @@
+"""
+Streaming export of simulation data.
+
+Every simulation run is stored as a small manifest, `simulation_data_NNN.json`,
+with the metadata and the per-year environment data, next to the per-resident
+records in one of two formats (chosen with the `data_format` config key):
+
+- "jsonl": `simulation_data_NNN.jsonl`, one JSON object per resident per
+  line, appended year by year. The manifest stores the byte range of every
+  year so readers can read a single year without loading the whole file.
+- "npy": `simulation_data_NNN_columns/year_NNN/<column>.npy`, one typed NumPy
+  column per resident attribute and year. Columns can be memory-mapped, so a
+  single year or a single resident is read without parsing anything else.
+
+Appending a year costs only the size of that year, instead of loading and
+rewriting everything that was exported before.
+
+Both formats also maintain a resident-major history index,
+`simulation_data_NNN_history/`, with one (resident x year) array per TPB
+factor. The history of one resident (used for the LLM system prompts) is
+then a single row slice instead of a scan over all exported years.
+"""
+import json
+import os
+import shutil
+import numpy as np
+from sustainability_packages.solar_panel import SolarPanel
+from sustainability_packages.heat_pump import HeatPump
+
+
+def records_file_name(manifest_file_name):
+    """
+    Returns the path of the records file that belongs to a manifest.
+
+    Args:
+        manifest_file_name (str | Path): Path of the `simulation_data_NNN.json` manifest.
+
+    Returns:
+        str: Path of the matching `simulation_data_NNN.jsonl` file.
+    """
+    return os.path.splitext(str(manifest_file_name))[0] + ".jsonl"
+
+
+def columns_dir_name(manifest_file_name):
+    """
+    Returns the path of the column directory that belongs to a manifest.
+
+    Args:
+        manifest_file_name (str | Path): Path of the `simulation_data_NNN.json` manifest.
+
+    Returns:
+        str: Path of the matching `simulation_data_NNN_columns` directory.
+    """
+    return os.path.splitext(str(manifest_file_name))[0] + "_columns"
+
+
+def history_dir_name(manifest_file_name):
+    """
+    Returns the path of the history index directory that belongs to a manifest.
+
+    Args:
+        manifest_file_name (str | Path): Path of the `simulation_data_NNN.json` manifest.
+
+    Returns:
+        str: Path of the matching `simulation_data_NNN_history` directory.
+    """
+    return os.path.splitext(str(manifest_file_name))[0] + "_history"
+
+
+def load_manifest(manifest_file_name):
+    """
+    Loads a manifest file.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+
+    Returns:
+        dict: The manifest, or an empty dict if it does not exist or cannot be parsed.
+    """
+    if not os.path.exists(manifest_file_name):
+        return {}
+    try:
+        with open(manifest_file_name, 'r') as file:
+            return json.load(file)
+    except json.JSONDecodeError:
+        return {}
+
+
+def write_manifest(manifest_file_name, manifest):
+    """
+    Atomically replaces a manifest file, so readers never see a half written file.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        manifest (dict): The manifest content.
+    """
+    tmp_file_name = f"{manifest_file_name}.tmp"
+    with open(tmp_file_name, 'w') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(tmp_file_name, manifest_file_name)
+
+
+def read_year_records(manifest_file_name, manifest, year):
+    """
+    Yields the resident records of a single year.
+
+    Only the byte range of the requested year is read from the records file.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        manifest (dict): The loaded manifest.
+        year (int): The simulation year.
+
+    Yields:
+        dict: One resident record per resident.
+    """
+    year_info = manifest.get("years", {}).get(f"year {year}")
+    if not year_info:
+        return
+
+    with open(records_file_name(manifest_file_name), 'rb') as file:
+        file.seek(year_info["offset"])
+        chunk = file.read(year_info["length"])
+
+    for line in chunk.splitlines():
+        if line:
+            yield json.loads(line)
+
+
+def find_resident_record(manifest_file_name, manifest, year, resident_id):
+    """
+    Finds the record of one resident in a single year.
+
+    For "jsonl" exports only the lines that contain the digits of the resident
+    id are parsed, and the record whose "id" matches is returned; this does
+    not depend on the key order or the separators of the records. For "npy"
+    exports the row is read from the memory-mapped columns.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        manifest (dict): The loaded manifest.
+        year (int): The simulation year.
+        resident_id (int | str): The unique id of the resident.
+
+    Returns:
+        dict | None: The resident record, or None if it was not exported.
+    """
+    year_info = manifest.get("years", {}).get(f"year {year}")
+    if not year_info:
+        return None
+
+    if manifest.get("format") == "npy":
+        return _columns_to_record(manifest, load_year_columns(manifest_file_name, year), resident_id)
+
+    resident_id = int(resident_id)
+    digits = str(resident_id).encode()
+    with open(records_file_name(manifest_file_name), 'rb') as file:
+        file.seek(year_info["offset"])
+        chunk = file.read(year_info["length"])
+
+    for line in chunk.splitlines():
+        if digits in line:
+            record = json.loads(line)
+            if record.get("id") == resident_id:
+                return record
+    return None
+
+
+def load_year_columns(manifest_file_name, year):
+    """
+    Memory-maps the columns of a single year of an "npy" export.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        year (int): The simulation year.
+
+    Returns:
+        dict[str, np.ndarray]: Column name to read-only memory-mapped array, one row per resident.
+    """
+    year_dir = os.path.join(columns_dir_name(manifest_file_name), f"year_{year:03d}")
+    return {
+        os.path.splitext(file_name)[0]: np.load(os.path.join(year_dir, file_name), mmap_mode='r')
+        for file_name in sorted(os.listdir(year_dir))
+        if file_name.endswith(".npy")
+    }
+
+
+def load_resident_columns(manifest_file_name, resident_id):
+    """
+    Collects the history of one resident from an "npy" export.
+
+    Only the row of the resident is read from each memory-mapped year.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        resident_id (int): The unique id of the resident.
+
+    Returns:
+        dict[str, np.ndarray]: Column name to array with one entry per exported year,
+                               including a "year" column. Empty if the resident was not found.
+    """
+    manifest = load_manifest(manifest_file_name)
+    years = sorted(int(year_key.split()[-1]) for year_key in manifest.get("years", {}))
+    rows = {"year": []}
+
+    for year in years:
+        columns = load_year_columns(manifest_file_name, year)
+        positions = np.flatnonzero(columns["id"] == resident_id)
+        if len(positions) == 0:
+            continue
+        rows["year"].append(year)
+        for name, column in columns.items():
+            rows.setdefault(name, []).append(column[positions[0]])
+
+    if not rows["year"]:
+        return {}
+    return {name: np.array(values) for name, values in rows.items()}
+
+
+def load_resident_history(manifest_file_name, manifest, resident_id, max_years=None):
+    """
+    Reads the TPB history of one resident from the history index.
+
+    Args:
+        manifest_file_name (str | Path): Path of the manifest.
+        manifest (dict): The loaded manifest.
+        resident_id (int): The unique id of the resident.
+        max_years (int | None): Only the last `max_years` exported years, all if None.
+
+    Returns:
+        dict | None: {"year": array, "attitude": array, "subj_norm": {package: array},
+                      "behavioral_control": {package: array}}, oldest year first.
+                      None if the manifest has no history index or the resident is unknown.
+    """
+    index_info = manifest.get("history_index")
+    if index_info is None:
+        return None
+
+    history_dir = os.path.join(os.path.dirname(str(manifest_file_name)), index_info["dir"])
+    sorted_ids = np.load(os.path.join(history_dir, "sorted_ids.npy"), mmap_mode='r')
+    position = np.searchsorted(sorted_ids, resident_id)
+    if position == len(sorted_ids) or sorted_ids[position] != resident_id:
+        return None
+    row = int(np.load(os.path.join(history_dir, "sorted_rows.npy"), mmap_mode='r')[position])
+
+    years = np.load(os.path.join(history_dir, "years.npy"), mmap_mode='r')
+    written = int(np.count_nonzero(years))
+    start = 0 if max_years is None else max(0, written - max_years)
+
+    def read(name):
+        return np.array(np.load(os.path.join(history_dir, f"{name}.npy"), mmap_mode='r')[row, start:written])
+
+    return {
+        "year": np.array(years[start:written]),
+        "attitude": read("attitude"),
+        "subj_norm": {package["name"]: read(f"subj_norm_{package['slug']}") for package in index_info["packages"]},
+        "behavioral_control": {
+            package["name"]: read(f"behavioral_control_{package['slug']}") for package in index_info["packages"]
+        },
+    }
+
+
+def _columns_to_record(manifest, columns, resident_id):
+    """
+    Converts one row of an "npy" year back into the dict of `Resident.collect_resident_data`.
+
+    The decisions are returned under the same "solar_panels" and "heat_pump"
+    keys, read from the decision columns the same way.
+    """
+    positions = np.flatnonzero(columns["id"] == int(resident_id))
+    if len(positions) == 0:
+        return None
+    row = positions[0]
+
+    record = {name: columns[name][row].item() for name in
+              ("id", "household_id", "income", "attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod")}
+    record["subj_norm"] = {}
+    record["behavioral_control"] = {}
+    package_decisions = {}
+    for package in manifest.get("packages", []):
+        slug = package["slug"]
+        record["subj_norm"][package["name"]] = columns[f"subj_norm_{slug}"][row].item()
+        record["behavioral_control"][package["name"]] = columns[f"behavioral_control_{slug}"][row].item()
+        package_decisions[package["name"]] = columns[f"decision_{slug}"][row].item()
+    record["solar_panels"] = package_decisions.get(SolarPanel.name, False)
+    record["heat_pump"] = package_decisions.get(HeatPump.name, False)
+    return record
+
+
+def create_exporter(file_name, data_format):
+    """
+    Creates the exporter for the configured data format.
+
+    Args:
+        file_name (str): Path of the manifest to create.
+        data_format (str): "jsonl" or "npy".
+
+    Returns:
+        JsonLinesExporter | ColumnarExporter: The exporter for the run.
+
+    Raises:
+        ValueError: If the data format is unknown.
+    """
+    if data_format == "jsonl":
+        return JsonLinesExporter(file_name)
+    if data_format == "npy":
+        return ColumnarExporter(file_name)
+    raise ValueError(f"Unknown data format '{data_format}', expected 'jsonl' or 'npy'.")
+
+
+def _package_slugs(model):
+    """
+    Returns the name and file name friendly slug of every package.
+    """
+    return [
+        {"name": package.name, "slug": package.slug}
+        for package in model.sustainability_packages
+    ]
+
+
+def _new_manifest(model, data_format):
+    """
+    Builds the manifest of a new run, without any exported years.
+
+    Conversations are not part of the manifest, they are kept in the
+    conversation store (see conversation_store.py).
+    """
+    return {
+        "format": data_format,
+        "metadata": model.collect_metadata(),
+        "years": {},
+    }
+
+
+def _register_year(manifest_file_name, year, year_info):
+    """
+    Adds an exported year to the manifest on disk.
+
+    The manifest is re-read, so sections other writers added are kept.
+    """
+    manifest = load_manifest(manifest_file_name)
+    manifest.setdefault("years", {})[f"year {year}"] = year_info
+    write_manifest(manifest_file_name, manifest)
+
+
+def _unregister_years_after(manifest_file_name, year):
+    """
+    Removes the exported years after `year` from the manifest on disk.
+    """
+    manifest = load_manifest(manifest_file_name)
+    manifest["years"] = {
+        key: info for key, info in manifest.get("years", {}).items() if int(key.split()[-1]) <= year
+    }
+    write_manifest(manifest_file_name, manifest)
+
+
+class JsonLinesExporter:
+    """
+    Appends the per-resident data of every simulation year to a JSON Lines file.
+
+    Attributes:
+        file_name (str): Path of the manifest (`simulation_data_NNN.json`).
+        records_file_name (str): Path of the records file (`simulation_data_NNN.jsonl`).
+        records_length (int): Length in bytes of the records file after the last exported
+            year. Part of a checkpoint, so a resumed run can cut off what came after it.
+        history (HistoryIndexWriter): Resident-major history index of the run.
+    """
+    def __init__(self, file_name):
+        """
+        Args:
+            file_name (str): Path of the manifest to create.
+        """
+        self.file_name = file_name
+        self.records_file_name = records_file_name(file_name)
+        self.records_length = 0
+        self.history = HistoryIndexWriter(file_name)
+
+    def setup(self, model):
+        """
+        Creates the manifest and an empty records file for a new run.
+
+        Args:
+            model (Environment): The simulation environment.
+        """
+        manifest = _new_manifest(model, "jsonl")
+        manifest["records_file"] = os.path.basename(self.records_file_name)
+        self.history.setup(model, manifest)
+        open(self.records_file_name, 'wb').close()
+        self.records_length = 0
+        write_manifest(self.file_name, manifest)
+
+    def rewind(self, year):
+        """
+        Drops everything exported after `year`, e.g. before resuming from a
+        checkpoint taken after that year: truncates the records file to
+        `records_length` and removes the later years from the manifest and the
+        history index.
+
+        Args:
+            year (int): The last simulation year to keep.
+        """
+        with open(self.records_file_name, 'r+b') as file:
+            file.truncate(self.records_length)
+        self.history.rewind()
+        _unregister_years_after(self.file_name, year)
+
+    def export_year(self, model, year):
+        """
+        Appends the resident records of one year and registers them in the manifest.
+
+        Args:
+            model (Environment): The simulation environment.
+            year (int): The simulation year that was just completed.
+
+        Returns:
+            int: Number of bytes written to the records file and the history index.
+        """
+        if not os.path.exists(self.file_name):
+            raise FileNotFoundError(f"Data file {self.file_name} not found.")
+
+        model.sync_agents()
+        lines = []
+        for resident in model.residents:
+            resident_data = resident.collect_resident_data()
+            resident_data["year"] = year
+            lines.append(json.dumps(resident_data))
+        chunk = ("\n".join(lines) + "\n").encode() if lines else b""
+
+        with open(self.records_file_name, 'ab') as file:
+            offset = file.tell()
+            file.write(chunk)
+        self.records_length = offset + len(chunk)
+        history_bytes = self.history.write_year(model.collect_resident_columns(), year)
+
+        _register_year(self.file_name, year, {
+            "offset": offset,
+            "length": len(chunk),
+            "environment_data": model.collect_environment_data(),
+        })
+        return len(chunk) + history_bytes
+
+
+class ColumnarExporter:
+    """
+    Writes the per-resident data of every simulation year as typed NumPy columns.
+
+    Attributes:
+        file_name (str): Path of the manifest (`simulation_data_NNN.json`).
+        columns_dir (str): Directory holding one sub directory of `.npy` columns per year.
+        history (HistoryIndexWriter): Resident-major history index of the run.
+    """
+    def __init__(self, file_name):
+        """
+        Args:
+            file_name (str): Path of the manifest to create.
+        """
+        self.file_name = file_name
+        self.columns_dir = columns_dir_name(file_name)
+        self.history = HistoryIndexWriter(file_name)
+
+    def setup(self, model):
+        """
+        Creates the manifest and the column directory for a new run.
+
+        Args:
+            model (Environment): The simulation environment.
+        """
+        os.makedirs(self.columns_dir, exist_ok=True)
+        manifest = _new_manifest(model, "npy")
+        manifest["columns_dir"] = os.path.basename(self.columns_dir)
+        manifest["packages"] = _package_slugs(model)
+        self.history.setup(model, manifest)
+        write_manifest(self.file_name, manifest)
+
+    def rewind(self, year):
+        """
+        Drops everything exported after `year`, e.g. before resuming from a
+        checkpoint taken after that year: removes the later year directories and
+        removes the later years from the manifest and the history index.
+
+        Args:
+            year (int): The last simulation year to keep.
+        """
+        for name in os.listdir(self.columns_dir):
+            if name.startswith("year_") and int(name[len("year_"):]) > year:
+                shutil.rmtree(os.path.join(self.columns_dir, name))
+        self.history.rewind()
+        _unregister_years_after(self.file_name, year)
+
+    def export_year(self, model, year):
+        """
+        Writes the resident columns of one year and registers them in the manifest.
+
+        Args:
+            model (Environment): The simulation environment.
+            year (int): The simulation year that was just completed.
+
+        Returns:
+            int: Number of bytes written to the column files and the history index.
+        """
+        if not os.path.exists(self.file_name):
+            raise FileNotFoundError(f"Data file {self.file_name} not found.")
+
+        columns = model.collect_resident_columns()
+        year_dir = os.path.join(self.columns_dir, f"year_{year:03d}")
+        os.makedirs(year_dir, exist_ok=True)
+        nr_bytes = 0
+        for name, column in columns.items():
+            path = os.path.join(year_dir, f"{name}.npy")
+            np.save(path, column)
+            nr_bytes += os.path.getsize(path)
+        nr_bytes += self.history.write_year(columns, year)
+
+        _register_year(self.file_name, year, {
+            "rows": len(columns["id"]),
+            "environment_data": model.collect_environment_data(),
+        })
+        return nr_bytes
+
+
+class HistoryIndexWriter:
+    """
+    Maintains the resident-major history index of a run.
+
+    Every TPB factor is stored as a memory-mapped (resident x year) `.npy`
+    array, so the row of one resident holds its values of all years. Rows are
+    in the order of `model.residents`; `sorted_ids.npy` and `sorted_rows.npy`
+    map a resident id to its row. `years.npy` holds the exported year of
+    every column (0 for columns not written yet). The arrays are allocated for
+    `simulation_years` columns and grown when more years are exported.
+
+    Attributes:
+        history_dir (str): Directory of the index.
+        capacity (int): Number of year columns allocated.
+        years_written (int): Number of year columns written.
+    """
+    def __init__(self, file_name):
+        """
+        Args:
+            file_name (str): Path of the manifest.
+        """
+        self.history_dir = history_dir_name(file_name)
+        self.capacity = 0
+        self.years_written = 0
+        self.nr_residents = 0
+        self._names = []
+
+    def setup(self, model, manifest):
+        """
+        Allocates the index for a new run and registers it in the manifest.
+
+        Args:
+            model (Environment): The simulation environment.
+            manifest (dict): The manifest of the new run, updated in place.
+        """
+        os.makedirs(self.history_dir, exist_ok=True)
+        packages = _package_slugs(model)
+        self._names = ["attitude"] + [
+            f"{factor}_{package['slug']}" for factor in ("subj_norm", "behavioral_control") for package in packages
+        ]
+
+        ids = np.array([res.unique_id for res in model.residents], dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        np.save(os.path.join(self.history_dir, "sorted_ids.npy"), ids[order])
+        np.save(os.path.join(self.history_dir, "sorted_rows.npy"), order)
+
+        self.nr_residents = len(ids)
+        self.years_written = 0
+        self._allocate(max(1, model.config.get('simulation_years', 1)))
+        manifest["history_index"] = {"dir": os.path.basename(self.history_dir), "packages": packages}
+
+    def _allocate(self, capacity):
+        """
+        Creates (or grows) the memory-mapped arrays to `capacity` year columns.
+        """
+        arrays = {"years": ((capacity,), np.int64, 0)}
+        arrays.update({name: ((self.nr_residents, capacity), np.float64, np.nan) for name in self._names})
+        for name, (shape, dtype, fill) in arrays.items():
+            path = os.path.join(self.history_dir, f"{name}.npy")
+            old = np.load(path) if self.capacity else None
+            array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            array[...] = fill
+            if old is not None:
+                array[..., :old.shape[-1]] = old
+            array.flush()
+            del array
+        self.capacity = capacity
+
+    def rewind(self):
+        """
+        Clears the columns written after the first `years_written`, e.g. when a
+        run resumes from a checkpoint taken before they were written.
+        """
+        years = np.load(os.path.join(self.history_dir, "years.npy"), mmap_mode='r+')
+        self.capacity = len(years)
+        years[self.years_written:] = 0
+        years.flush()
+        for name in self._names:
+            array = np.load(os.path.join(self.history_dir, f"{name}.npy"), mmap_mode='r+')
+            array[:, self.years_written:] = np.nan
+            array.flush()
+
+    def write_year(self, columns, year):
+        """
+        Writes the TPB factors of one year into the next column of the index.
+
+        Args:
+            columns (dict[str, np.ndarray]): Output of `Environment.collect_resident_columns`.
+            year (int): The simulation year that was just completed.
+
+        Returns:
+            int: Number of bytes written into the index.
+        """
+        if self.years_written == self.capacity:
+            self._allocate(self.capacity * 2)
+
+        column = self.years_written
+        nr_bytes = 0
+        for name in self._names:
+            array = np.load(os.path.join(self.history_dir, f"{name}.npy"), mmap_mode='r+')
+            array[:, column] = columns[name]
+            array.flush()
+            nr_bytes += array[:, column].nbytes
+        years = np.load(os.path.join(self.history_dir, "years.npy"), mmap_mode='r+')
+        years[column] = year
+        years.flush()
+        self.years_written += 1
+        return nr_bytes + years.itemsize
@@ -1,12 +1,17 @@
 import random
+from array import array
 from mesa import Model
 import numpy as np
 from agents.household_agent import Household
+from agents.resident_agent import Resident
 import utilities
-from sustainability_packages.solar_panel import SolarPanel
-from sustainability_packages.heat_pump import HeatPump
-import json
-import os
+from sustainability_packages.registry import create_packages
+from vectorized_engine import VectorizedEngine, HouseholdArrays
+from yearly_statistics import StatisticsCollector
+from neighbourhood_graph import build_neighbourhood_graph
+from metrics import SimulationMetrics
+from active_set import ActiveSet, never_adopter_mask
+from random_streams import RandomStreams
 
 class Environment(Model):
     """
@@ -18,9 +23,12 @@ class Environment(Model):
     Attributes:
         config_id (int): Identifier for the chosen configuration.
         config (dict): The configuration dictionary.
-        solar_panel (SolarPanel): Instance of the SolarPanel package.
-        heat_pump (HeatPump): Instance of the HeatPump package.
-        sustainability_packages (list): List of all available sustainability packages.
+        sustainability_packages (list): The configured sustainability packages
+            (`sustainability_packages` config value, see sustainability_packages/registry.py).
+        packages_by_name (dict): The sustainability packages by name.
+        package_index (dict): Position of every package, used by the compact agent state.
+        solar_panel (SolarPanel | None): The solar panel package, None if not configured.
+        heat_pump (HeatPump | None): The heat pump package, None if not configured.
         decided_residents_this_step_per_package (dict): Tracks the number of residents
             who made a positive decision for each package in the current step.
         energy_price (float): Current price of energy (e.g., electricity).
@@ -28,9 +36,34 @@ class Environment(Model):
         residents (list[list[Resident]]): List of lists, where each inner list contains
             residents of a particular household.
         streets (list[list[Household]]): Households grouped into streets.
+        street_installed_counts (dict): Number of households with each package installed,
+            per street. {package_name: [count_street_0, count_street_1, ...]}.
+        district_installed_counts (dict): Number of households with each package installed
+            in the whole district. {package_name: count}.
+        changed_streets (dict): Street indices whose installed counts changed since the last
+            subjective norm update, None for households outside any street. {package_name: set}.
+        households_changed_this_step (dict): Households that installed a package during the
+            last step, in order of installation. {household_id: Household}.
+        neighbourhood_graph (NeighbourhoodGraph | None): Neighbour graph of the "Network"
+            norm level, built on first use (see `get_neighbourhood_graph`).
+        network_norms (dict): Last "Network" subjective norm per household. {package_name: np.ndarray}.
         yearly_stats (list[dict]): List to store aggregated data collected each year.
+        engine (VectorizedEngine | None): Array engine that runs the yearly step when the
+            configured `engine` is "vectorized", None for the object model.
+        statistics (StatisticsCollector): Single-pass aggregated statistics, shared by the
+            data collection methods and cached until the next step.
+        metrics (SimulationMetrics): Phase timings and work counters of the run (see metrics.py).
+        active_set (ActiveSet | None): Residents and households the object model still steps,
+            per package (see active_set.py). None with the vectorized engine.
+        pruned_never_adopters (dict): Number of undecided residents per package that can
+            never adopt it and are no longer evaluated (see `prune_never_adopters`).
+        applied_pruning_inputs (tuple): The `pruning_inputs` the pruned pairs were computed
+            from; the pairs are recomputed when they change.
+        random_streams (RandomStreams | None): The seeded streams every random draw comes
+            from when `random_streams` is configured (see random_streams.py), None when
+            the global `random` and `np.random` generators are used.
     """
-    def __init__(self, nr_households, nr_residents):
+    def __init__(self, nr_households, nr_residents, seed=None):
         """
         Initializes the simulation environment.
 
@@ -38,13 +71,23 @@ class Environment(Model):
             nr_households (int): The total number of households to create.
             nr_residents (int): The total number of residents to create and
                                 distribute among households.
+            seed (int | None): Seed of the random streams. Drawn from `np.random` if
+                               None. Only used with `random_streams`.
         """
         super().__init__()
         self.config_id, self.config = utilities.choose_config()
-
-        self.solar_panel = SolarPanel(self)
-        self.heat_pump = HeatPump(self)
-        self.sustainability_packages = [self.solar_panel, self.heat_pump]
+        self.metrics = SimulationMetrics()
+        self.random_streams = None
+        if self.config.get('random_streams', False):
+            if seed is None:
+                seed = int(np.random.randint(0, 2 ** 32 - 1, dtype=np.int64))
+            self.random_streams = RandomStreams(seed)
+
+        self.sustainability_packages = create_packages(self)
+        self.packages_by_name = {package.name: package for package in self.sustainability_packages}
+        self.package_index = {package.name: p for p, package in enumerate(self.sustainability_packages)}
+        self.solar_panel = self.packages_by_name.get("Solar Panel")
+        self.heat_pump = self.packages_by_name.get("Heat Pump")
 
         self.decided_residents_this_step_per_package = {
                     pkg.name: 0 for pkg in self.sustainability_packages
@@ -54,20 +97,45 @@ class Environment(Model):
         self.households = []  # gewone Python-lijst voor filteren/gemak
         self.residents = []  # gewone Python-lijst voor filteren/gemak
         self.streets = []
+        self.street_installed_counts = {}
+        self.district_installed_counts = {}
+        self.changed_streets = {}
+        self.households_changed_this_step = {}
+        self.neighbourhood_graph = None
+        self.network_norms = {}
+        self.applied_subj_norm_level = None
         self.yearly_stats = []
         self.total_co2 = 0
         self.current_co2 = 0
 
-        self.create_agents(nr_households, nr_residents)
+        if self.config.get('agent_init', 'sequential') == 'bulk':
+            self.create_agents_bulk(nr_households, nr_residents)
+        else:
+            self.create_agents(nr_households, nr_residents)
         self.generate_streets()
+        self.init_installation_counters()
         self.update_subjective_norm()
 
+        self.engine = None
+        self.active_set = None
+        if self.config.get('engine', 'object') == 'vectorized':
+            self.engine = VectorizedEngine(self)
+        else:
+            self.active_set = ActiveSet(self)
+        self.pruned_never_adopters = {package.name: 0 for package in self.sustainability_packages}
+        self.applied_pruning_inputs = self.pruning_inputs()
+        if self.config.get('prune_never_adopters', False):
+            self.prune_never_adopters()
+        self.statistics = StatisticsCollector(self)
+
     def create_agents(self, nr_households: int, nr_residents: int):
         """
         Creates a specified number of Household agents and distributes residents among them.
 
         Initializes households with a chance to have pre-installed sustainability packages
         based on configuration. Residents are then created within these households.
+        With `random_streams` the population is drawn up front by `sample_population`,
+        so it is identical to the one `create_agents_bulk` creates.
 
         Args:
             nr_households (int): The number of household agents to create.
@@ -77,20 +145,31 @@ class Environment(Model):
         base = nr_residents // nr_households
         remainder = nr_residents % nr_households
 
+        population = None
+        if self.random_streams is not None:
+            population = self.sample_population(nr_households, nr_residents)
+            household_attributes, installed, resident_attributes = population
+            installed = installed.tolist()
+
         # Initialize the agent ID counter
         id_counter = 0
 
         for i in range(nr_households):
         
-            hh = Household(i, self)
+            if population is None:
+                hh = Household(i, self)
+            else:
+                hh = Household(i, self, {name: values[i] for name, values in household_attributes.items()})
             hh_emissions = hh.calc_co2_emissions()
             self.total_co2 += hh_emissions
             self.current_co2 += hh_emissions
-            for package in self.sustainability_packages:
-                chance_key = f"initial_{package.name.lower().replace(' ', '')}_chance"
-                initial_chance = self.config.get(chance_key, 0.0) # Default to 0% if not in config
+            for p, package in enumerate(self.sustainability_packages):
+                initial_chance = self.config.get(package.initial_chance_config_key, 0.0) # Default to 0% if not in config
                 
-                hh.package_installations[package.name] = (random.random() < initial_chance)
+                if population is None:
+                    hh.package_installations[package.name] = (random.random() < initial_chance)
+                else:
+                    hh.package_installations[package.name] = installed[i][p]
 
                 if hh.package_installations.get(package.name, False):
                     initial_savings = package.calc_co2_savings(hh)
@@ -103,7 +182,11 @@ class Environment(Model):
             self.households.append(hh)
 
             nr_res_for_hh = base + (1 if i < remainder else 0)
-            id_counter = hh.create_residents(nr_res_for_hh, id_counter)
+            attributes = None
+            if population is not None:
+                attributes = [{name: values[r] for name, values in resident_attributes.items()}
+                              for r in range(id_counter, id_counter + nr_res_for_hh)]
+            id_counter = hh.create_residents(nr_res_for_hh, id_counter, attributes)
             self.residents.extend(hh.residents)
         
         for hh_obj in self.households:
@@ -112,25 +195,153 @@ class Environment(Model):
                     if package.name not in res_obj.package_subjective_norms:
                          res_obj.package_subjective_norms[package.name] = self.config.get('subjective_norm', 0.0)
 
+    def create_agents_bulk(self, nr_households: int, nr_residents: int):
+        """
+        Creates the same population as `create_agents`, but draws all random
+        attributes at once (see `sample_population`) and computes the initial
+        behavioral control with the array kernels of the packages.
+
+        The agents are identical in structure. With the global generators the
+        random draws differ from `create_agents`, so a seed gives a different
+        (equally distributed) population; with `random_streams` both create the
+        same population. Selected with the `agent_init` config value "bulk".
+
+        Args:
+            nr_households (int): The number of household agents to create.
+            nr_residents (int): The total number of resident agents to create and
+                                distribute among the households.
+        """
+        packages = self.sustainability_packages
+        base = nr_residents // nr_households
+        remainder = nr_residents % nr_households
+        residents_per_household = np.full(nr_households, base, dtype=np.int64)
+        residents_per_household[:remainder] += 1
+        subjective_norm = self.config.get('subjective_norm', 0.0)
+
+        household_attributes, installed, columns = self.sample_population(nr_households, nr_residents)
+
+        for i in range(nr_households):
+            hh = Household(i, self, {name: values[i] for name, values in household_attributes.items()})
+            for package in packages:
+                hh.package_installations[package.name] = False
+                hh.skip_prev_flags[package.name] = False
+                hh.skip_next_flags[package.name] = False
+            self.households.append(hh)
+
+        # CO2 savings of the initial installations, in package order like `create_agents`
+        arrays = HouseholdArrays(self.households, packages)
+        savings = np.zeros((nr_households, len(packages)))
+        for p, package in enumerate(packages):
+            arrays.installed[:, p] = installed[:, p]
+            savings[:, p] = package.calc_co2_savings_batch(arrays)
+
+        installed_rows = installed.tolist()
+        savings_rows = savings.tolist()
+        for i, hh in enumerate(self.households):
+            hh_emissions = hh.calc_co2_emissions()
+            self.total_co2 += hh_emissions
+            self.current_co2 += hh_emissions
+            for p, package in enumerate(packages):
+                if installed_rows[i][p]:
+                    hh.package_installations[package.name] = True
+                    hh.co2_saved_yearly += savings_rows[i][p]
+                    self.current_co2 -= savings_rows[i][p]
+
+        household_index = np.repeat(np.arange(nr_households), residents_per_household)
+        incomes = np.array(columns["income"], dtype=np.float64)
+        behavioral_control = [
+            package.calculate_behavioral_influence_batch(incomes, arrays, household_index).tolist()
+            for package in packages
+        ]
+        package_names = [package.name for package in packages]
+
+        id_counter = 0
+        for i, hh in enumerate(self.households):
+            start = id_counter
+            attributes = [
+                {
+                    "income": columns["income"][r],
+                    "attitude": columns["attitude"][r],
+                    "attitude_mod": columns["attitude_mod"][r],
+                    "subj_norm_mod": columns["subj_norm_mod"][r],
+                    "behavioral_mod": columns["behavioral_mod"][r],
+                    "behavioral_control": {name: behavioral_control[p][r] for p, name in enumerate(package_names)},
+                }
+                for r in range(start, start + int(residents_per_household[i]))
+            ]
+            id_counter = hh.create_residents(len(attributes), id_counter, attributes)
+            self.residents.extend(hh.residents)
+
+        for res_obj in self.residents:
+            for name in package_names:
+                res_obj.package_subjective_norms.setdefault(name, subjective_norm)
+
+    def sample_population(self, nr_households: int, nr_residents: int):
+        """
+        Draws the random attributes of a whole population at once.
+
+        Draws from the "households", "initial_installations" and "residents"
+        streams with `random_streams`, from `np.random` otherwise.
+
+        Args:
+            nr_households (int): The number of households.
+            nr_residents (int): The total number of residents.
+
+        Returns:
+            tuple: (household attributes, installed, resident attributes). The
+                   attributes are columns with one entry per household or resident
+                   (see `Household.sample_attributes` and `Resident.sample_attributes`),
+                   installed is a boolean array (households x packages) of the
+                   initial installations.
+        """
+        packages = self.sustainability_packages
+        streams = self.random_streams
+        chances = np.array([self.config.get(package.initial_chance_config_key, 0.0) for package in packages])
+
+        if streams is None:
+            household_attributes = Household.sample_attributes(self.config, nr_households)
+            installed = np.random.random((nr_households, len(packages))) < chances
+            resident_attributes = Resident.sample_attributes(self.config_id, self.config, nr_residents)
+        else:
+            household_attributes = Household.sample_attributes(self.config, nr_households,
+                                                               streams.generator("households"))
+            installed = streams.generator("initial_installations").random((nr_households, len(packages))) < chances
+            resident_attributes = Resident.sample_attributes(self.config_id, self.config, nr_residents,
+                                                             streams.generator("residents"))
+
+        # Incomes stay NumPy floats, like the incomes drawn by the constructor
+        resident_columns = {name: (values.tolist() if name != "income" else list(values))
+                            for name, values in resident_attributes.items()}
+        return household_attributes, installed, resident_columns
+
     def generate_streets(self,):
         """
         Generate a list of streets, where each street is a list of households.
 
         The total number of households is distributed among streets. The number of
         streets is not fixed, and household counts per street are randomly assigned
-        within configured limits, with occasional larger streets.
+        within configured limits, with occasional larger streets. Drawn from the
+        "streets" stream with `random_streams`.
         """
         pointer = 0
         remaining = self.config['nr_households']
         min_households = min(self.config['min_nr_houses'], self.config['nr_households'])
         max_households = self.config['max_nr_houses']
 
+        if self.random_streams is None:
+            chance, randint = random.random, random.randint
+        else:
+            rng = self.random_streams.generator("streets")
+            chance = rng.random
+            def randint(low, high):
+                return int(rng.integers(low, high, endpoint=True))
+
         while remaining >= min_households:
             # 20% chance to pick a large household count (closer to max)
-            if random.random() < 0.2:
-                value = random.randint(int(max_households * 0.7), max_households)
+            if chance() < 0.2:
+                value = randint(int(max_households * 0.7), max_households)
             else:
-                value = random.randint(min_households, int(max_households * 0.6))
+                value = randint(min_households, int(max_households * 0.6))
 
             value = min(value, remaining)
             self.streets.append(self.households[pointer: pointer + value])
@@ -139,20 +350,86 @@ class Environment(Model):
 
         if remaining > 0:
             for i in range(pointer, len(self.households)):
-                chosen_list = random.randint(0, len(self.streets) - 1)
+                chosen_list = randint(0, len(self.streets) - 1)
                 self.streets[chosen_list].append(self.households[i])
 
+        for street_index, street in enumerate(self.streets):
+            for hh in street:
+                hh.street_index = street_index
+
+    def init_installation_counters(self):
+        """
+        Counts the installed packages per street and for the whole district.
+
+        The counters are kept up to date by `register_installation`, so the
+        "Street" and "District" subjective norms can be computed without
+        rescanning every household. All streets are marked as changed so the
+        first subjective norm update writes every resident.
+        """
+        for package in self.sustainability_packages:
+            self.street_installed_counts[package.name] = [
+                sum(1 for hh in street if hh.package_installations.get(package.name, False))
+                for street in self.streets
+            ]
+            self.district_installed_counts[package.name] = sum(
+                1 for hh in self.households if hh.package_installations.get(package.name, False)
+            )
+            self.changed_streets[package.name] = set()
+        self.mark_all_streets_changed()
+
+    def get_neighbourhood_graph(self):
+        """
+        Returns the neighbour graph of the "Network" norm level, building it
+        from the configured `network_topology` the first time it is needed.
+
+        Returns:
+            NeighbourhoodGraph: The graph, nodes in the order of `self.households`.
+        """
+        if self.neighbourhood_graph is None:
+            self.neighbourhood_graph = build_neighbourhood_graph(self)
+        return self.neighbourhood_graph
+
+    def mark_all_streets_changed(self):
+        """
+        Marks every street (and households outside streets) as changed, forcing the
+        next subjective norm update to rewrite all residents.
+        """
+        for package in self.sustainability_packages:
+            self.changed_streets[package.name].update(range(len(self.streets)))
+            self.changed_streets[package.name].add(None)
+
+    def register_installation(self, household, package):
+        """
+        Updates the installed counters after a household installed a package
+        and invalidates the household's memoized ROI values.
+
+        Args:
+            household (Household): The household that installed the package.
+            package (SustainabilityPackage): The package that was installed.
+        """
+        household.roi_cache.clear()
+        self.district_installed_counts[package.name] += 1
+        if household.street_index is not None:
+            self.street_installed_counts[package.name][household.street_index] += 1
+        self.changed_streets[package.name].add(household.street_index)
+        self.households_changed_this_step[household.unique_id] = household
+
     def update_subjective_norm(self):
         """
         Updates the subjective norm for all residents regarding each sustainability package.
 
         This involves resetting flags for "Direct" norm calculation (if applicable)
         and then invoking the package-specific subjective norm update logic.
+        When the configured norm level changed since the last update, all residents
+        are rewritten instead of only those on streets with new installations.
         """
+        if self.config['subj_norm_level'] != self.applied_subj_norm_level:
+            self.mark_all_streets_changed()
+            self.network_norms.clear()
+            self.applied_subj_norm_level = self.config['subj_norm_level']
+
         for hh in self.households:
-            for package in self.sustainability_packages:
-                hh.skip_prev_flags[package.name] = False
-                hh.skip_next_flags[package.name] = False
+            hh.reset_skip_flags()
         
         for package in self.sustainability_packages:
             package.update_package_subjective_norm(self)
@@ -166,82 +443,278 @@ class Environment(Model):
         2. Executing the step method for each household.
         3. Updating the subjective norm across the environment.
         4. Executing the step method for each sustainability package (e.g., price updates).
+
+        With the vectorized engine the same year is computed on arrays instead and
+        the agents are only updated when something reads them (see `sync_agents`).
+
+        When a parameter the never-adopter pruning depends on changed since the
+        last step (e.g. through `/update_parameter`), the pruned pairs are
+        recomputed first.
         """
-        for pkg_name in self.decided_residents_this_step_per_package:
-            self.decided_residents_this_step_per_package[pkg_name] = 0
+        if self.pruning_inputs() != self.applied_pruning_inputs:
+            self.prune_never_adopters()
+        self.statistics.invalidate()
+        self.households_changed_this_step = {}
+        if self.engine is not None:
+            self.engine.step()
+        else:
+            for pkg_name in self.decided_residents_this_step_per_package:
+                self.decided_residents_this_step_per_package[pkg_name] = 0
+
+            with self.metrics.phase("step_households"):
+                self.metrics.count("pairs_evaluated", self.active_set.size())
+                self.step_residents()
+                self.calc_household_decisions()
+
+            with self.metrics.phase("step_subjective_norm"):
+                self.update_subjective_norm()
+
+            with self.metrics.phase("step_package_prices"):
+                for package in self.sustainability_packages:
+                    package.step()
 
-        for hh in self.households:
-             hh.step()
+        self.metrics.count("agents_evaluated", len(self.households) + len(self.residents))
+        self.metrics.count("decisions_flipped", sum(self.decided_residents_this_step_per_package.values()))
+        self.metrics.count("households_installed", len(self.households_changed_this_step))
 
-        self.update_subjective_norm()
+    def prune_never_adopters(self):
+        """
+        Leaves the (resident, package) pairs that can provably never adopt out of
+        the yearly work, or brings all pairs back when `prune_never_adopters` is off.
+
+        A pair is pruned when the resident's decision score, with the subjective
+        norm and the behavioral control at their upper bounds, does not exceed
+        its decision threshold (see `active_set.never_adopter_mask`). Pruned pairs
+        are not evaluated while pruned, so their subjective norm and behavioral
+        control keep the values they had when they were pruned; adoption is
+        unaffected. Pairs that are no longer pruned get both refreshed before
+        their next decision. Called on creation, by `step` when one of the
+        `pruning_inputs` changed and after scenario overrides.
 
-        for package in self.sustainability_packages:
-            package.step()
+        Returns:
+            dict: Number of pruned undecided residents per package, also stored in
+                  `pruned_never_adopters`.
+        """
+        packages = self.sustainability_packages
+        pruned = self.never_adopter_pairs() if self.config.get('prune_never_adopters', False) else None
+
+        if self.engine is not None:
+            previous = self.engine.pruned
+            decided = self.engine.decisions
+        else:
+            previous = self.active_set.pruned
+            decided = np.array([[res.has_decided(p) for p in range(len(packages))] for res in self.residents],
+                               dtype=bool).reshape(-1, len(packages))
+
+        if previous is not None:
+            unpruned = previous & ~decided
+            if pruned is not None:
+                unpruned &= ~pruned
+            self.refresh_resident_factors(unpruned)
+
+        if self.engine is not None:
+            self.engine.pruned = pruned
+        else:
+            self.active_set.rebuild(pruned)
+        self.applied_pruning_inputs = self.pruning_inputs()
+
+        self.pruned_never_adopters = {
+            package.name: 0 if pruned is None else int(np.count_nonzero(pruned[:, p] & ~decided[:, p]))
+            for p, package in enumerate(packages)
+        }
+        return dict(self.pruned_never_adopters)
+
+    def pruning_inputs(self):
+        """
+        Returns:
+            tuple: The parameters the pruned never-adopter pairs depend on: whether
+                   pruning is on, the base subjective norm and the subjective norm
+                   modifier and maximum behavioral influence of every package.
+        """
+        return (
+            self.config.get('prune_never_adopters', False),
+            self.config.get('subjective_norm', 0.0),
+            tuple((package.subj_norm_mod, package.max_behavioral_influence) for package in self.sustainability_packages),
+        )
+
+    def refresh_resident_factors(self, pairs):
+        """
+        Refreshes the subjective norm and behavioral control of (resident, package)
+        pairs, e.g. pairs that are no longer pruned, like the yearly factor update.
+
+        Args:
+            pairs (np.ndarray): Boolean mask (residents x packages) of the pairs to refresh.
+        """
+        if not pairs.any():
+            return
+        if self.engine is not None:
+            self.engine.update_resident_factors(pairs)
+            self.engine.agents_stale = True
+            return
+        for i, p in zip(*np.nonzero(pairs)):
+            self.residents[i].update_package_factors(int(p), self.sustainability_packages[p])
+
+    def never_adopter_pairs(self):
+        """
+        Returns:
+            np.ndarray: Boolean mask (residents x packages) of the residents that can
+                        never decide for a package (see `active_set.never_adopter_mask`).
+        """
+        names = ("attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod", "decision_threshold")
+        if self.engine is not None:
+            attributes = {name: getattr(self.engine, name) for name in names}
+        else:
+            attributes = {name: np.array([getattr(res, name) for res in self.residents], dtype=np.float64)
+                          for name in names}
+        masks = [never_adopter_mask(**attributes, package=package, config=self.config)
+                 for package in self.sustainability_packages]
+        return np.column_stack(masks) if masks else np.zeros((len(self.residents), 0), dtype=bool)
+
+    def step_residents(self):
+        """
+        Steps the residents of the object model, like `Resident.step` for every
+        resident but only for the (resident, package) pairs in the active set.
+
+        Decisions are made first, then every resident gets its income raise (in
+        the order of `self.residents`, which draws the same random numbers as
+        stepping household by household; with `random_streams` all factors of
+        the year are drawn in one batch) and finally the subjective norm and
+        behavioral control of the packages that are still undecided are refreshed.
+        Residents that decided for a package leave its active set.
+        """
+        residents = self.residents
+        active_set = self.active_set
+        packages = self.sustainability_packages
+
+        for p, package in enumerate(packages):
+            active_set.undecided_residents[p] = array("q", [
+                i for i in active_set.undecided_residents[p] if not residents[i].calc_package_decision(p, package)
+            ])
+
+        if self.random_streams is None:
+            for resident in residents:
+                resident.raise_income()
+        else:
+            factors = self.random_streams.choices("income_raise", self.steps, self.config['raise_income'],
+                                                  len(residents)).tolist()
+            for resident, factor in zip(residents, factors):
+                resident.raise_income(factor)
+
+        for p, package in enumerate(packages):
+            for i in active_set.undecided_residents[p]:
+                residents[i].update_package_factors(p, package)
+
+    def calc_household_decisions(self):
+        """
+        Household votes and CO2 bookkeeping of the object model, like
+        `Household.step` without the resident steps, but only voting in the
+        households that have not installed a package yet.
+
+        Packages are handled one after another, so a household's heat pump vote
+        sees the solar panels it installed earlier in this step. The
+        installations are registered, and their savings subtracted from
+        `current_co2`, in household order to match stepping household by household.
+        """
+        households = self.households
+        active_set = self.active_set
+        new_installs = []
+
+        for p, package in enumerate(self.sustainability_packages):
+            open_households = []
+            for h in active_set.open_households[p]:
+                household = households[h]
+                if household.is_installed(p):
+                    continue
+                if household.vote(p):
+                    household.set_installed(p)
+                    new_installs.append((h, p, package.calc_co2_savings(household)))
+                else:
+                    open_households.append(h)
+            active_set.open_households[p] = array("q", open_households)
+
+            for household in households:
+                household.co2_saved_yearly += package.calc_co2_savings(household)
+
+        for h, p, saving in sorted(new_installs, key=lambda install: (install[0], install[1])):
+            self.register_installation(households[h], self.sustainability_packages[p])
+            self.current_co2 -= saving
+
+    def sync_agents(self):
+        """
+        Makes sure the Household and Resident agents reflect the current state.
+
+        A no-op for the object model. With the vectorized engine the array state
+        is written back onto the agents if it changed since the last sync.
+        """
+        if self.engine is not None:
+            self.engine.write_back()
 
     def collect_environment_data(self):
+        stats = self.statistics.current()
         environment_data = {
             "energy_price": self.energy_price,
-            "nr_agents_with_solar_panel": "nog doen", # TODO: ...
-            "nr_agents_with_heat_pump": "nog doen", # TODO: ...
-            "average_income": np.mean([resident.income for resident in self.residents]),
-            "average_attitude": np.mean([resident.attitude for resident in self.residents]),
-            "average_subjective_norm": {
-                package.name: np.mean([resident.subj_norm[package.name] for resident in self.residents])
-                for package in self.sustainability_packages
-            },
-            "average_behavioral_control": {
-                package.name: np.mean([resident.behavioral_control[package.name] for resident in self.residents])
-                for package in self.sustainability_packages
-            }
+            "nr_agents_with_solar_panel": stats["households_with_package"].get("Solar Panel", 0),
+            "nr_agents_with_heat_pump": stats["households_with_package"].get("Heat Pump", 0),
+            "average_income": stats["average_income"],
+            "average_attitude": stats["average_attitude"],
+            "average_subjective_norm": dict(stats["average_subjective_norm"]),
+            "average_behavioral_control": dict(stats["average_behavioral_control"]),
         }
 
         return environment_data
     
-    def setup_data_structure(self, file_name) -> None:       
-        data = {
-            "metadata":{
-                "config_id": self.config_id,
-                "nr_households": self.config['nr_households'],
-                "nr_residents": self.config['nr_residents'],
-                "simulation_years": self.config['simulation_years'],
-                "subjective_norm": self.config['subjective_norm'],
-            },
-            "simulation_years": {
-                f"year {year}": {
-                    "residents_data": {},
-                    "environment_data": {}
-                } for year in range(1, self.config['simulation_years'] + 1)
-            },
-            "conversation_history": {
-                "residents": {resident.unique_id: [] for resident in self.residents},
-            }
-        }
-
-        # Dump to the json file
-        with open(file_name, 'w+') as file:
-            json.dump(data, file, indent=4)
-
-    def export_data(self, file_name, year: int) -> None:
-        if not os.path.exists(file_name):
-            raise FileNotFoundError(f"Data file {file_name} not found.")
-
-        # Load current JSON data
-        with open(file_name, 'r') as file:
-            data = json.load(file)
+    def collect_resident_columns(self):
+        """
+        Collects the per-resident data of the current year as typed columns.
 
-        year_key = f"year {year}"
+        Contains the same information as `Resident.collect_resident_data`, with
+        the per-package values split into one column per package. With the
+        vectorized engine the columns are copied straight from its arrays.
 
-        for resident in self.residents:
-            resident_data = resident.collect_resident_data()
-            data['simulation_years'][year_key]['residents_data'][resident.unique_id] = resident_data
+        Returns:
+            dict[str, np.ndarray]: Column name to array with one entry per resident.
+        """
+        columns = {}
+        if self.engine is not None:
+            engine = self.engine
+            columns["id"] = np.array([res.unique_id for res in self.residents], dtype=np.int64)
+            columns["household_id"] = np.array([hh.unique_id for hh in self.households], dtype=np.int64)[engine.household_index]
+            columns["income"] = engine.income.copy()
+            for name in ("attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod"):
+                columns[name] = getattr(engine, name).copy()
+            for p, package in enumerate(self.sustainability_packages):
+                slug = package.slug
+                columns[f"subj_norm_{slug}"] = engine.subj_norm[:, p].copy()
+                columns[f"behavioral_control_{slug}"] = engine.behavioral_control[:, p].copy()
+                columns[f"decision_{slug}"] = engine.decisions[:, p].copy()
+            return columns
+
+        columns["id"] = np.array([res.unique_id for res in self.residents], dtype=np.int64)
+        columns["household_id"] = np.array([res.household.unique_id for res in self.residents], dtype=np.int64)
+        for name in ("income", "attitude", "attitude_mod", "subj_norm_mod", "behavioral_mod"):
+            columns[name] = np.array([getattr(res, name) for res in self.residents], dtype=np.float64)
+        for package in self.sustainability_packages:
+            slug = package.slug
+            columns[f"subj_norm_{slug}"] = np.array([res.subj_norm[package.name] for res in self.residents], dtype=np.float64)
+            columns[f"behavioral_control_{slug}"] = np.array([res.behavioral_control[package.name] for res in self.residents], dtype=np.float64)
+            columns[f"decision_{slug}"] = np.array([res.package_decisions.get(package.name, False) for res in self.residents], dtype=bool)
+        return columns
 
-        environment_data = self.collect_environment_data()
-        data['simulation_years'][year_key]['environment_data'] = environment_data
+    def collect_metadata(self):
+        """
+        Collects the run metadata stored alongside the exported simulation data.
 
-        # Save to file
-        with open(file_name, 'w') as file:
-            json.dump(data, file, indent=4)
-        
+        Returns:
+            dict: The configuration id and the main simulation parameters.
+        """
+        return {
+            "config_id": self.config_id,
+            "nr_households": self.config['nr_households'],
+            "nr_residents": self.config['nr_residents'],
+            "simulation_years": self.config['simulation_years'],
+            "subjective_norm": self.config['subjective_norm'],
+            "pruned_never_adopters": dict(self.pruned_never_adopters),
+        }
 
     def collect_start_of_year_data(self, year):
         """
@@ -257,22 +730,17 @@ class Environment(Model):
         Returns:
             dict: A dictionary containing the collected data for the start of the year.
         """
+        stats = self.statistics.current()
         data_per_package = {}
         for package in self.sustainability_packages:
-            residents_positive_decision = sum(
-                1 for hh in self.households for res in hh.residents if res.package_decisions.get(package.name, False)
-            )
-            households_with_package = sum(
-                1 for hh in self.households if hh.package_installations.get(package.name, False)
-            )
             data_per_package[package.name] = {
-                "residents_positive_decision": residents_positive_decision,
-                "households_with_package": households_with_package,
-                "price": package.price
+                "residents_positive_decision": stats["residents_positive_decision"][package.name],
+                "households_with_package": stats["households_with_package"][package.name],
+                "price": stats["price"][package.name]
             }
         
         total_decisions_this_year = sum(self.decided_residents_this_step_per_package.values())
-        total_yearly_co2_saved = sum(hh.co2_saved_yearly for hh in self.households)
+        total_yearly_co2_saved = stats["total_co2_saved_yearly"]
 
         data = {
             "year": year,
@@ -298,18 +766,13 @@ class Environment(Model):
             data_from_start_of_year (dict): The data dictionary collected at the
                                             start of the current year.
         """
+        stats = self.statistics.current()
         end_data_per_package = {}
         for package in self.sustainability_packages:
-            residents_positive_decision = sum(
-                1 for hh in self.households for res in hh.residents if res.package_decisions.get(package.name, False)
-            )
-            households_with_package = sum(
-                1 for hh in self.households if hh.package_installations.get(package.name, False)
-            )
             end_data_per_package[package.name] = {
-                "residents_positive_decision": residents_positive_decision,
-                "households_with_package": households_with_package,
-                "price": package.price
+                "residents_positive_decision": stats["residents_positive_decision"][package.name],
+                "households_with_package": stats["households_with_package"][package.name],
+                "price": stats["price"][package.name]
             }
         
         total_decisions_this_year_end = sum(self.decided_residents_this_step_per_package.values())
@@ -318,20 +781,25 @@ class Environment(Model):
         data_from_start_of_year["decisions_this_year_total_end"] = total_decisions_this_year_end 
         data_from_start_of_year["decisions_this_year_per_package_end"] = dict(self.decided_residents_this_step_per_package)
 
-    def collect_household_information(self):
+    def collect_household_information(self, households=None):
         """
         Collects detailed information about each household and its residents.
 
         This data is typically used for providing a detailed view of the
         simulation state at the end, often for UI display.
 
+        Args:
+            households (list[Household] | None): Only collect these households,
+                all households if None.
+
         Returns:
             list[dict]: A list of dictionaries, where each dictionary contains
                         detailed information for a household, including its residents'
                         attributes and decisions.
         """
+        self.sync_agents()
         households_data = []
-        for household in self.households:
+        for household in (self.households if households is None else households):
             resident_details = []
             for i, resident in enumerate(household.residents, start=1):
                 res_data = {"name": f"Resident {i}", "income": resident.income, 'unique_id': resident.unique_id}
@@ -343,6 +811,7 @@ class Environment(Model):
                 "id": household.unique_id, # Assuming Household has unique_id from Mesa Agent
                 "address": f"Dorpsstraat {household.unique_id}",
                 "name": f"Household {household.unique_id}", # Or however you identify them
+                "street": household.street_index,
                 "residents": resident_details
             }
             for pkg_name in [p.name for p in self.sustainability_packages]:
@@ -361,20 +830,21 @@ class Environment(Model):
         Returns:
             str: A summary string of the environment's state.
         """
-        total_households = len(self.households)
-        total_residents = sum(len(h.residents) for h in self.households)
+        stats = self.statistics.current()
+        total_households = stats["total_households"]
+        total_residents = stats["total_residents"]
+        total_yearly_co2_saved = stats["total_co2_saved_yearly"]
         output = f"Environment State:\n"
 
         for package in self.sustainability_packages:
             pkg_name = package.name
-            residents_decided = sum(1 for hh in self.households for r in hh.residents if r.package_decisions.get(pkg_name, False))
-            households_installed = sum(1 for hh in self.households if hh.package_installations.get(pkg_name, False))
-            total_yearly_co2_saved = sum(hh.co2_saved_yearly for hh in self.households)
+            residents_decided = stats["residents_positive_decision"][pkg_name]
+            households_installed = stats["households_with_package"][pkg_name]
             
             output += f"  --- {pkg_name} ---\n"
             output += f"    Residents decided for {pkg_name}: {residents_decided} / {total_residents}\n"
             output += f"    Households with {pkg_name}: {households_installed} / {total_households}\n"
-            output += f"    Current {pkg_name} Price: {package.price}\n"
+            output += f"    Current {pkg_name} Price: {stats['price'][pkg_name]}\n"
         output += f"  --- MISC INFO ---\n"
         output += f"    Total CO2 saved so far: {total_yearly_co2_saved / 1000:.1f} tons\n"
         output += f"    % of CO2 emission relative to district total: {self.current_co2 / self.total_co2 * 100:.1f}"
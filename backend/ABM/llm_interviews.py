@@ -0,0 +1,174 @@
+"""
+Batched resident interviews with a language model.
+
+After a run we often want to ask many residents the same question (e.g.
+"Why didn't you install a heat pump?"). The BatchInterviewer sends the
+conversations concurrently to an Ollama compatible endpoint through a
+bounded thread pool, and stores every answer in an on-disk ResponseCache
+keyed on the model and the complete conversation (including the system
+prompt), so asking the same question again costs nothing.
+
+The endpoint is configured with the `llm_host` config value (None uses the
+default Ollama host), which also makes it possible to test against a local
+stub server.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import ollama
+
+
+class ResponseCache:
+    """
+    On-disk cache of language model responses, one small JSON file per entry.
+
+    Attributes:
+        folder (Path): Folder the cache files are stored in.
+    """
+    def __init__(self, folder):
+        """
+        Args:
+            folder (str | Path): Folder to store the cache files in, created if needed.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_name, messages):
+        """
+        Returns the cache key of a conversation.
+
+        Args:
+            model_name (str): Name of the language model.
+            messages (list[dict]): The conversation, system prompt first.
+
+        Returns:
+            str: A SHA-256 hex digest of the model and the messages.
+        """
+        payload = json.dumps({"model": model_name, "messages": messages}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.folder / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Returns:
+            str | None: The cached response, None if there is none.
+        """
+        try:
+            with self._path(key).open("r", encoding="utf-8") as file:
+                return json.load(file)["response"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key, response):
+        """
+        Stores a response. The file is written atomically, so concurrent
+        writers and readers never see a partial entry.
+
+        Args:
+            key (str): The cache key (see `make_key`).
+            response (str): The response of the language model.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump({"response": response}, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class BatchInterviewer:
+    """
+    Sends many conversations concurrently to a language model.
+
+    Attributes:
+        model_name (str): Name of the language model.
+        cache (ResponseCache | None): Cache of earlier responses, None to disable caching.
+        max_workers (int): Maximum number of requests in flight at the same time.
+        cache_hits (int): Number of responses served from the cache.
+        requests_sent (int): Number of requests sent to the language model.
+    """
+    def __init__(self, model_name, host=None, cache=None, max_workers=8, client=None):
+        """
+        Args:
+            model_name (str): Name of the language model.
+            host (str | None): URL of the Ollama compatible endpoint, the default host if None.
+            cache (ResponseCache | None): Cache of earlier responses, None to disable caching.
+            max_workers (int): Maximum number of requests in flight at the same time.
+            client (ollama.Client | None): Client to use instead of one for `host`.
+        """
+        self.model_name = model_name
+        self.cache = cache
+        self.max_workers = max_workers
+        self.client = client if client is not None else ollama.Client(host=host)
+        self.cache_hits = 0
+        self.requests_sent = 0
+        self._counter_lock = threading.Lock()
+
+    def ask(self, messages):
+        """
+        Returns the response to a single conversation, from the cache if possible.
+
+        Args:
+            messages (list[dict]): The conversation, system prompt first.
+
+        Returns:
+            str: The response of the language model.
+        """
+        key = ResponseCache.make_key(self.model_name, messages) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._counter_lock:
+                    self.cache_hits += 1
+                return cached
+
+        response = self.client.chat(model=self.model_name, messages=messages)
+        with self._counter_lock:
+            self.requests_sent += 1
+        reply = response.message.content
+
+        if key is not None:
+            self.cache.put(key, reply)
+        return reply
+
+    def interview(self, conversations):
+        """
+        Sends all conversations concurrently, at most `max_workers` at a time.
+
+        A failed request does not stop the others; its error is reported instead.
+
+        Args:
+            conversations (dict): {resident_id: messages}.
+
+        Returns:
+            tuple[dict, dict]: ({resident_id: response}, {resident_id: error message}).
+        """
+        responses = {}
+        errors = {}
+        if not conversations:
+            return responses, errors
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(conversations))),
+                                thread_name_prefix="llm-interview") as executor:
+            futures = {
+                resident_id: executor.submit(self.ask, messages)
+                for resident_id, messages in conversations.items()
+            }
+            for resident_id, future in futures.items():
+                try:
+                    responses[resident_id] = future.result()
+                except Exception as e:
+                    errors[resident_id] = str(e)
+        return responses, errors
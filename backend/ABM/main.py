@@ -7,11 +7,15 @@ information at the end of each simulation year.
 """
 
 import random
+import threading
 import numpy as np
 import time
 from environment import Environment
 import utilities
 from shared_state import get_delay
+from data_export import create_exporter
+from checkpoint import save_checkpoint, load_checkpoint, restore_rng_states, checkpoint_path
+from metrics import metrics_file_name
 
 import os
 import glob
@@ -27,7 +31,231 @@ households_data = []  # Stores detailed household information per year (updated
 simulation_paused = False
 
 
+class SimulationResults:
+    """
+    Result storage of one simulation run.
+
+    Writes by the simulation and reads by the API can happen on different
+    threads, so all access goes through a lock and readers get copies.
+
+    With `record_events` the storage also keeps an event log for subscribers:
+    a "start" event with all households, a "year" event per finished year (the
+    year record plus only the households whose installations changed) and an
+    "end" event. `wait_for_events` hands out new events as soon as they are written.
+
+    Attributes:
+        graphics_data (list[dict]): Yearly aggregated data for charts/graphs.
+        households_data (list[dict]): Household details of the latest year.
+        years_completed (int): Number of simulated years stored so far.
+        households_version (int): Incremented every time the household details are replaced.
+        households_year (int): The simulation year of the stored household details.
+        record_events (bool): Whether yearly events are recorded for subscribers.
+        events (list[dict]): The recorded events, in order.
+        finished (bool): True once the run ended and no more events will follow.
+        metrics (SimulationMetrics | None): Phase timings and counters of the current run.
+    """
+    def __init__(self, graphics_data=None, households_data=None, record_events=False):
+        """
+        Args:
+            graphics_data (list | None): List to store the yearly data in, a new list if None.
+            households_data (list | None): List to store the household details in, a new list if None.
+            record_events (bool): Record yearly events for subscribers.
+        """
+        self.graphics_data = graphics_data if graphics_data is not None else []
+        self.households_data = households_data if households_data is not None else []
+        self.years_completed = 0
+        self.households_version = 0
+        self.households_year = 0
+        self._household_states = {}
+        self._household_changed_year = {}
+        self.record_events = record_events
+        self.events = []
+        self.finished = False
+        self.metrics = None
+        self._lock = threading.Lock()
+        self._new_event = threading.Condition(self._lock)
+
+    def clear(self):
+        """
+        Removes all stored data before a new run.
+        """
+        with self._lock:
+            self.graphics_data.clear()
+            self.households_data.clear()
+            self.years_completed = 0
+            self.households_version += 1
+            self.households_year = 0
+            self._household_states.clear()
+            self._household_changed_year.clear()
+            self.events.clear()
+            self.finished = False
+            self.metrics = None
+
+    def start(self, households):
+        """
+        Records the initial state of the households for subscribers.
+
+        Args:
+            households (list[dict]): Output of `Environment.collect_household_information`.
+        """
+        with self._lock:
+            self.events.append({"type": "start", "households": households})
+            self._new_event.notify_all()
+
+    def add_year(self, data, changed_households=None):
+        """
+        Stores the collected data of a finished year.
+
+        Args:
+            data (dict): The start and end of year data of `Environment`.
+            changed_households (list[dict] | None): Details of the households whose
+                installations changed this year, only used when recording events.
+        """
+        with self._lock:
+            self.graphics_data.append(data)
+            self.years_completed += 1
+            if self.record_events:
+                self.events.append({
+                    "type": "year",
+                    "year": data["year"],
+                    "data": data,
+                    "changed_households": changed_households or [],
+                })
+                self._new_event.notify_all()
+
+    def finish(self, status):
+        """
+        Marks the run as ended and wakes up all subscribers.
+
+        Args:
+            status (str): How the run ended (e.g. "finished", "cancelled" or "failed").
+        """
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            if self.record_events:
+                self.events.append({"type": "end", "status": status, "years_completed": self.years_completed})
+            self._new_event.notify_all()
+
+    def wait_for_events(self, start, timeout=None):
+        """
+        Returns the events from index `start` on, waiting for new ones if there are none yet.
+
+        Args:
+            start (int): Index of the first event the caller has not seen yet.
+            timeout (float | None): Maximum number of seconds to wait.
+
+        Returns:
+            list[dict]: The new events, empty if the timeout expired or the run ended.
+        """
+        with self._lock:
+            self._new_event.wait_for(lambda: len(self.events) > start or self.finished, timeout)
+            return self.events[start:]
+
+    def set_households(self, households):
+        """
+        Replaces the household details with those of the latest year.
+
+        Households whose package installations or resident decisions differ from
+        the previous details are marked as changed in the current year.
+
+        Args:
+            households (list[dict]): Output of `Environment.collect_household_information`.
+        """
+        with self._lock:
+            year = self.years_completed
+            for household in households:
+                state = household_decision_state(household)
+                if self._household_states.get(household["id"]) != state:
+                    self._household_states[household["id"]] = state
+                    self._household_changed_year[household["id"]] = year
+            self.households_data.clear()
+            self.households_data.extend(households)
+            self.households_version += 1
+            self.households_year = year
+
+    def query_households(self, since_year=None, street=None, id_from=None, id_to=None,
+                         offset=0, limit=None, fields=None):
+        """
+        Returns a filtered page of the latest household details.
+
+        Args:
+            since_year (int | None): Only households whose installations or resident
+                decisions changed after this year.
+            street (int | None): Only households in this street.
+            id_from (int | None): Only households with an id of at least this value.
+            id_to (int | None): Only households with an id of at most this value.
+            offset (int): Number of matching households to skip.
+            limit (int | None): Maximum number of households to return, all if None.
+            fields (list[str] | None): Household keys to return ("id" is always
+                included), all keys if None.
+
+        Returns:
+            tuple[list[dict], int]: The page of households and the total number of matches.
+        """
+        with self._lock:
+            matches = [
+                household for household in self.households_data
+                if (since_year is None or self._household_changed_year.get(household["id"], 0) > since_year)
+                and (street is None or household.get("street") == street)
+                and (id_from is None or household["id"] >= id_from)
+                and (id_to is None or household["id"] <= id_to)
+            ]
+        page = matches[offset:] if limit is None else matches[offset:offset + limit]
+        if fields is not None:
+            page = [{key: household[key] for key in ["id", *fields] if key in household} for household in page]
+        return page, len(matches)
+
+    def get_graphics_data(self):
+        """
+        Returns:
+            list[dict]: A copy of the yearly data stored so far.
+        """
+        with self._lock:
+            return list(self.graphics_data)
+
+    def get_households_data(self):
+        """
+        Returns:
+            list[dict]: A copy of the latest household details.
+        """
+        with self._lock:
+            return list(self.households_data)
+
+
+def household_decision_state(household):
+    """
+    Returns the package installations and resident decisions of a household.
+
+    Args:
+        household (dict): A household of `Environment.collect_household_information`.
+
+    Returns:
+        tuple: The installation flags followed by the decision flags of every resident.
+    """
+    installed = tuple(value for key, value in household.items() if key.endswith("_installed"))
+    decisions = tuple(
+        value for resident in household["residents"] for key, value in resident.items() if key.endswith("_decision")
+    )
+    return installed + decisions
+
+
+# Results of runs started without their own storage (e.g. from the command line)
+default_results = SimulationResults(graphics_data, households_data)
+
+
 def initialize_data_collection(model: Environment):
+    """
+    Creates the data files for a new run and returns the exporter that fills them.
+
+    Args:
+        model (Environment): The simulation environment.
+
+    Returns:
+        JsonLinesExporter | ColumnarExporter: Exporter for the configured `data_format` that
+            appends each year's data as it is produced.
+    """
     save_folder = config['data_save_folder']
     os.makedirs(save_folder, exist_ok=True)
 
@@ -35,9 +263,10 @@ def initialize_data_collection(model: Environment):
     run_number = len(existing_files) + 1
     file_name = os.path.join(save_folder, f"simulation_data_{run_number:03d}.json")
 
-    model.setup_data_structure(file_name)
+    exporter = create_exporter(file_name, config.get('data_format', 'jsonl'))
+    exporter.setup(model)
 
-    return file_name
+    return exporter
 
 
 def toggle_simulation_pause():
@@ -60,71 +289,176 @@ def is_simulation_paused():
     return simulation_paused
 
 
-def run_simulation(nr_households=10, nr_residents=10, simulation_years=30, seed=None):
+def run_simulation(nr_households=10, nr_residents=10, simulation_years=30, seed=None, headless=None,
+                   results=None, cancel_event=None, resume_from=None):
     """
     Runs the agent-based model simulation.
 
     Initializes the model with the given parameters, runs it for the specified
     number of simulation years, and collects data.
 
+    In headless mode the simulation runs as fast as possible: there is no delay
+    between years, the pause flag is not polled, the environment state is not
+    printed and the household details are only collected once at the end.
+
+    With the `checkpoint_every` config value set, a checkpoint is written to
+    `checkpoint_folder` after every that many years. A run started with
+    `resume_from` continues from such a checkpoint up to `simulation_years`
+    and produces the same results as the uninterrupted run; the number of
+    households and residents and the seed are then taken from the checkpoint.
+
+    The phases of every year are timed in `model.metrics` (see metrics.py),
+    which is also available as `results.metrics` while the run is going and,
+    when data is collected, written to `simulation_metrics_NNN.json`.
+
     Args:
         nr_households (int): The number of households in the simulation.
         nr_residents (int): The total number of residents, distributed among households.
         simulation_years (int): The number of years the simulation will run.
         seed (int): Seed for random number generators for reproducibility.
+        headless (bool | None): Run in headless mode. Defaults to the `headless` config value.
+        results (SimulationResults | None): Storage for the collected data. Defaults to the
+            module level `graphics_data` and `households_data`.
+        cancel_event (threading.Event | None): When set, the run stops after the current year.
+        resume_from (str | None): Path of a checkpoint to continue from.
 
     Returns:
-        dict: A dictionary containing a message indicating simulation completion.
+        dict: A dictionary with a completion message, the number of completed years,
+              whether the run was cancelled, the run time, the throughput in agent-years
+              per second, the path of the last checkpoint written (None if none) and the
+              path of the metrics file (None if no data is collected) and the number of
+              pruned never-adopters per package.
     """
-    global graphics_data
-    global households_data
-
-    if seed is None:
-        seed = random.randint(0, 2 ** 32 - 1)
-
-    random.seed(seed)
-    np.random.seed(seed)
-
-    graphics_data.clear()
-    households_data.clear()
-
-    model = Environment(nr_households=nr_households, nr_residents=nr_residents)
-
-    if config['collect_data']:
-        file_name = initialize_data_collection(model)
-
-    for year in range(simulation_years):
-        while is_simulation_paused():
-            time.sleep(1)
-
-        print(f"=== Year {year + 1} ===")
-        print("Current Environment State (begin):")
-        print(model)
-
-        data = model.collect_start_of_year_data(year + 1)
-        model.step()
-
-        print(f"\nEnd of Year {year + 1}:")
-        for package_name, count in model.decided_residents_this_step_per_package.items():
-            print(f"  Decisions this year for {package_name}: {count}")
-
-        print("  Current Environment State (end):")
-        print(model)
-        print("-" * 40)
+    if results is None:
+        results = default_results
+    if headless is None:
+        headless = config.get('headless', False)
+
+    results.clear()
+    start_time = time.perf_counter()
+    exporter = None
+
+    if resume_from is not None:
+        state = load_checkpoint(resume_from)
+        model = state["model"]
+        seed = state["seed"]
+        start_year = state["year"]
+        restore_rng_states(state)
+
+        for data in model.yearly_stats:
+            results.add_year(data)
+        if config['collect_data'] and state["exporter"] is not None and os.path.exists(state["exporter"].file_name):
+            exporter = state["exporter"]
+            # The interrupted run may have exported years after the checkpoint
+            exporter.rewind(start_year)
+    else:
+        if seed is None:
+            seed = random.randint(0, 2 ** 32 - 1)
+        random.seed(seed)
+        np.random.seed(seed)
+
+        model = Environment(nr_households=nr_households, nr_residents=nr_residents, seed=seed)
+        start_year = 0
+
+    metrics = model.metrics
+    results.metrics = metrics
+    if config['collect_data'] and exporter is None:
+        exporter = initialize_data_collection(model)
+
+    if results.record_events:
+        results.start(model.collect_household_information())
+
+    checkpoint_every = config.get('checkpoint_every', 0)
+    last_checkpoint = None
+    years_completed = start_year
+    for year in range(start_year, simulation_years):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+
+        if not headless:
+            while is_simulation_paused() and not (cancel_event is not None and cancel_event.is_set()):
+                time.sleep(1)
+
+            print(f"=== Year {year + 1} ===")
+            print("Current Environment State (begin):")
+            print(model)
+
+        with metrics.phase("collect_start"):
+            data = model.collect_start_of_year_data(year + 1)
+        with metrics.phase("step"):
+            model.step()
+
+        if not headless:
+            print(f"\nEnd of Year {year + 1}:")
+            for package_name, count in model.decided_residents_this_step_per_package.items():
+                print(f"  Decisions this year for {package_name}: {count}")
+
+            print("  Current Environment State (end):")
+            print(model)
+            print("-" * 40)
+
+        with metrics.phase("collect_end"):
+            model.collect_end_of_year_data(data)
+        with metrics.phase("events"):
+            changed_households = None
+            if results.record_events:
+                changed_households = model.collect_household_information(
+                    list(model.households_changed_this_step.values()))
+            results.add_year(data, changed_households)
+        years_completed += 1
+
+        # Append this year's data to the export files if configured
+        if config['collect_data']:
+            with metrics.phase("export"):
+                metrics.count("bytes_written", exporter.export_year(model, year + 1))
 
-        model.collect_end_of_year_data(data)
-        graphics_data.append(data)
+        if checkpoint_every and (year + 1) % checkpoint_every == 0:
+            with metrics.phase("checkpoint"):
+                last_checkpoint = save_checkpoint(checkpoint_path(config['checkpoint_folder'], seed, year + 1),
+                                                  model, year + 1, seed, exporter)
+        metrics.end_year(year + 1)
 
-        # Export data to JSON file if configured
-        if config['collect_data']:
-            model.export_data(file_name, year + 1)
+        if headless:
+            continue
 
         # Update household data (per year)
-        households_data.clear()
-        households_data.extend(model.collect_household_information())
-
-        # Wait before next simulation year
-        time.sleep(get_delay())
+        results.set_households(model.collect_household_information())
+
+        # Wait before next simulation year, waking up early when cancelled
+        if cancel_event is not None:
+            cancel_event.wait(get_delay())
+        else:
+            time.sleep(get_delay())
+
+    if headless:
+        results.set_households(model.collect_household_information())
+
+    cancelled = years_completed < simulation_years
+    elapsed = time.perf_counter() - start_time
+    agent_years = (len(model.households) + len(model.residents)) * (years_completed - start_year)
+    agent_years_per_second = agent_years / elapsed if elapsed > 0 else float("inf")
+    print(f"Simulation {'cancelled' if cancelled else 'finished'}: {years_completed} years, {agent_years} agent-years "
+          f"in {elapsed:.2f} s ({agent_years_per_second:,.0f} agent-years/s)")
+    if config.get('prune_never_adopters', False):
+        print(f"Pruned never-adopters per package: {model.pruned_never_adopters}")
+
+    metrics_file = None
+    if exporter is not None:
+        metrics_file = metrics_file_name(exporter.file_name)
+        metrics.write(metrics_file)
+
+    return {
+        "message": "Simulation cancelled" if cancelled else "Simulation finished",
+        "years_completed": years_completed,
+        "cancelled": cancelled,
+        "seed": seed,
+        "elapsed_seconds": elapsed,
+        "agent_years": agent_years,
+        "agent_years_per_second": agent_years_per_second,
+        "checkpoint": last_checkpoint,
+        "metrics_file": metrics_file,
+        "pruned_never_adopters": dict(model.pruned_never_adopters),
+    }
 
 
 if __name__ == "__main__":
@@ -132,5 +466,6 @@ if __name__ == "__main__":
         config['nr_households'],
         config['nr_residents'],
         config['simulation_years'],
-        config['seed']
-    )
\ No newline at end of file
+        config['seed'],
+        config.get('headless', False)
+    )
@@ -0,0 +1,244 @@
+"""
+Per-phase timing and counters of a simulation run.
+
+Every Environment owns a SimulationMetrics. The yearly step and the run loop
+in main.py time their phases with `metrics.phase(name)` and count the work
+they did with `metrics.count(name, value)`:
+
+- run loop: "collect_start", "step", "collect_end", "events", "export", "checkpoint"
+- object model step: "step_households" (resident decisions and household votes),
+  "step_subjective_norm", "step_package_prices"
+- vectorized step: "step_resident_decisions", "step_income_raise",
+  "step_resident_factors", "step_household_decisions", "step_subjective_norm",
+  "step_package_prices"
+- counters: "agents_evaluated" (households and residents stepped),
+  "decisions_flipped" (residents that decided for a package),
+  "households_installed" (households with a new installation),
+  "pairs_evaluated" (object model: active resident and household package pairs, see active_set.py),
+  "bytes_written" (data export)
+
+The "step" phase includes the step_* phases. Every phase keeps a histogram of
+its duration per year and every year keeps its own record of phase times and
+counters. The metrics are served by the `/metrics` endpoint in the
+Prometheus text format and written next to the run's data files.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the duration histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def metrics_file_name(manifest_file_name):
+    """
+    Returns the path of the metrics file that belongs to a manifest.
+
+    The name deliberately does not match `simulation_data_*.json`, the pattern
+    used to number the runs in the data folder.
+
+    Args:
+        manifest_file_name (str): Path of the `simulation_data_NNN.json` manifest.
+
+    Returns:
+        str: Path of the matching `simulation_metrics_NNN.json` file.
+    """
+    folder, name = os.path.split(str(manifest_file_name))
+    stem = os.path.splitext(name)[0].replace("simulation_data", "simulation_metrics", 1)
+    return os.path.join(folder, stem + ".json")
+
+
+class Histogram:
+    """
+    Duration histogram with cumulative buckets, like a Prometheus histogram.
+
+    Attributes:
+        buckets (tuple[float]): Upper bounds of the buckets.
+        bucket_counts (list[int]): Number of observations per bucket (not cumulative).
+        count (int): Number of observations.
+        sum (float): Sum of all observations.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Adds an observation.
+
+        Args:
+            value (float): The observed duration in seconds.
+        """
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: {"buckets": {upper bound: cumulative count}, "count", "sum"}.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class SimulationMetrics:
+    """
+    Phase timings and counters of one simulation run.
+
+    Safe to read from the API thread while the simulation thread writes.
+
+    Attributes:
+        phases (dict[str, Histogram]): Duration histogram per phase.
+        counters (dict[str, int]): Totals of the counters over the whole run.
+        years (list[dict]): One record per finished year:
+            {"year", "phases": {name: seconds}, "counters": {name: value}}.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (tuple[float]): Upper bounds of the duration histogram buckets.
+        """
+        self.buckets = tuple(buckets)
+        self.phases = {}
+        self.counters = {}
+        self.years = []
+        self._current = {"phases": {}, "counters": {}}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Times the enclosed block as one execution of a phase.
+
+        Args:
+            name (str): Name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """
+        Records one execution of a phase.
+
+        Args:
+            name (str): Name of the phase.
+            seconds (float): Duration of the execution.
+        """
+        with self._lock:
+            if name not in self.phases:
+                self.phases[name] = Histogram(self.buckets)
+            self.phases[name].observe(seconds)
+            year_phases = self._current["phases"]
+            year_phases[name] = year_phases.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        """
+        Adds to a counter.
+
+        Args:
+            name (str): Name of the counter.
+            value (int): Amount to add.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            year_counters = self._current["counters"]
+            year_counters[name] = year_counters.get(name, 0) + value
+
+    def end_year(self, year):
+        """
+        Closes the record of a simulation year; later observations go to the next year.
+
+        Args:
+            year (int): The simulation year that was just completed.
+        """
+        with self._lock:
+            self.years.append({"year": year, **self._current})
+            self._current = {"phases": {}, "counters": {}}
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: {"phases": {name: histogram dict}, "counters": {...}, "years": [...]}.
+        """
+        with self._lock:
+            return {
+                "phases": {name: histogram.to_dict() for name, histogram in self.phases.items()},
+                "counters": dict(self.counters),
+                "years": [
+                    {"year": record["year"], "phases": dict(record["phases"]), "counters": dict(record["counters"])}
+                    for record in self.years
+                ],
+            }
+
+    def to_prometheus(self, labels=None):
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Args:
+            labels (dict | None): Extra labels added to every sample, e.g. {"job_id": "..."}.
+
+        Returns:
+            str: The metrics text.
+        """
+        data = self.to_dict()
+        extra = "".join(f',{key}="{value}"' for key, value in (labels or {}).items())
+        lines = [
+            "# HELP abm_phase_seconds Duration of a simulation phase per year.",
+            "# TYPE abm_phase_seconds histogram",
+        ]
+        for name, histogram in data["phases"].items():
+            for bound, cumulative in histogram["buckets"].items():
+                lines.append(f'abm_phase_seconds_bucket{{phase="{name}",le="{bound}"{extra}}} {cumulative}')
+            lines.append(f'abm_phase_seconds_sum{{phase="{name}"{extra}}} {histogram["sum"]}')
+            lines.append(f'abm_phase_seconds_count{{phase="{name}"{extra}}} {histogram["count"]}')
+
+        lines += [
+            "# HELP abm_work_total Work done by the simulation (agents evaluated, decisions flipped, ...).",
+            "# TYPE abm_work_total counter",
+        ]
+        for name, value in data["counters"].items():
+            lines.append(f'abm_work_total{{counter="{name}"{extra}}} {value}')
+
+        year_labels = f"{{{extra.lstrip(',')}}}" if extra else ""
+        lines += [
+            "# HELP abm_years_completed Number of simulation years with a closed metrics record.",
+            "# TYPE abm_years_completed gauge",
+            f"abm_years_completed{year_labels} {len(data['years'])}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes the metrics as JSON.
+
+        Args:
+            path (str): Path of the file.
+        """
+        data = self.to_dict()
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
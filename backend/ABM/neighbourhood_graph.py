@@ -0,0 +1,283 @@
+"""
+Neighbourhood graphs for the "Network" subjective norm level.
+
+A NeighbourhoodGraph stores who influences whom as a weighted graph in
+compressed sparse row (CSR) form: the neighbours of household `i` are
+`indices[indptr[i]:indptr[i + 1]]` with the matching `weights`. The
+subjective norm of a household is the weighted fraction of its neighbours
+that installed a package, computed for all households at once as a sparse
+matrix-vector product, so an update costs O(edges) instead of a Python loop
+over streets.
+
+The topology is chosen with the `network_topology` config value:
+- "street": the previous and next household in the same street.
+- "grid": households on a square grid, connected to their 4 direct neighbours.
+- "small_world": a Watts-Strogatz ring lattice with randomly rewired edges.
+- "geo": households within `network_radius` of each other, with coordinates
+  loaded from the CSV file in `network_coordinates_file`.
+"""
+import math
+import numpy as np
+
+
+class NeighbourhoodGraph:
+    """
+    Weighted, directed neighbour graph in CSR form.
+
+    Attributes:
+        nr_nodes (int): Number of households in the graph.
+        indptr (np.ndarray): Row pointers, length nr_nodes + 1.
+        indices (np.ndarray): Neighbour index of every edge.
+        weights (np.ndarray): Weight of every edge.
+    """
+    def __init__(self, nr_nodes, indptr, indices, weights):
+        """
+        Args:
+            nr_nodes (int): Number of households in the graph.
+            indptr (np.ndarray): Row pointers, length nr_nodes + 1.
+            indices (np.ndarray): Neighbour index of every edge.
+            weights (np.ndarray): Weight of every edge.
+        """
+        self.nr_nodes = nr_nodes
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # Row of every edge and the weighted degree of every node, reused by every product
+        self._rows = np.repeat(np.arange(nr_nodes, dtype=np.int64), np.diff(self.indptr))
+        self.weighted_degree = np.bincount(self._rows, weights=self.weights, minlength=nr_nodes)
+
+    @classmethod
+    def from_edges(cls, nr_nodes, sources, targets, weights=None, symmetric=True):
+        """
+        Builds a graph from an edge list. Self loops are dropped and duplicate
+        edges are merged (keeping the first weight).
+
+        Args:
+            nr_nodes (int): Number of households in the graph.
+            sources (array_like): Source node of every edge.
+            targets (array_like): Target node of every edge.
+            weights (array_like | None): Weight of every edge, 1.0 if None.
+            symmetric (bool): Also add the reverse of every edge.
+
+        Returns:
+            NeighbourhoodGraph: The graph.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.ones(len(sources)) if weights is None else np.asarray(weights, dtype=np.float64)
+        if symmetric:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+            weights = np.concatenate([weights, weights])
+
+        keep = sources != targets
+        sources, targets, weights = sources[keep], targets[keep], weights[keep]
+
+        keys, first = np.unique(sources * nr_nodes + targets, return_index=True)
+        sources, targets, weights = keys // nr_nodes, keys % nr_nodes, weights[first]
+
+        indptr = np.zeros(nr_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=nr_nodes), out=indptr[1:])
+        return cls(nr_nodes, indptr, targets, weights)
+
+    @property
+    def nr_edges(self):
+        """
+        Returns:
+            int: Number of (directed) edges.
+        """
+        return len(self.indices)
+
+    def neighbours(self, node):
+        """
+        Returns:
+            np.ndarray: The neighbours of a household.
+        """
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def adoption_fraction(self, installed):
+        """
+        Computes the weighted fraction of neighbours that installed a package.
+
+        Args:
+            installed (np.ndarray): Installation state per household (bool or 0/1).
+
+        Returns:
+            np.ndarray: Fraction per household, 0.0 for households without neighbours.
+        """
+        adopted = np.bincount(self._rows, weights=self.weights * installed[self.indices], minlength=self.nr_nodes)
+        return np.divide(adopted, self.weighted_degree, out=np.zeros(self.nr_nodes), where=self.weighted_degree > 0)
+
+
+def street_graph(streets, nr_households):
+    """
+    Connects every household to the previous and next household in its street,
+    the same neighbours as the "Direct" norm level.
+
+    Args:
+        streets (list[list[int]]): Household indices per street.
+        nr_households (int): Number of households.
+
+    Returns:
+        NeighbourhoodGraph: The graph.
+    """
+    sources = []
+    targets = []
+    for street in streets:
+        sources.extend(street[:-1])
+        targets.extend(street[1:])
+    return NeighbourhoodGraph.from_edges(nr_households, sources, targets)
+
+
+def grid_graph(nr_households, columns=None):
+    """
+    Places the households row by row on a grid and connects each to its
+    4 direct neighbours.
+
+    Args:
+        nr_households (int): Number of households.
+        columns (int | None): Width of the grid, a square grid if None.
+
+    Returns:
+        NeighbourhoodGraph: The graph.
+    """
+    columns = columns or max(1, math.ceil(math.sqrt(nr_households)))
+    nodes = np.arange(nr_households)
+    right = nodes[(nodes % columns != columns - 1) & (nodes + 1 < nr_households)]
+    down = nodes[nodes + columns < nr_households]
+    sources = np.concatenate([right, down])
+    targets = np.concatenate([right + 1, down + columns])
+    return NeighbourhoodGraph.from_edges(nr_households, sources, targets)
+
+
+def small_world_graph(nr_households, nr_neighbours, rewire_chance, rng):
+    """
+    Builds a Watts-Strogatz small-world graph: a ring where every household is
+    connected to its `nr_neighbours` nearest households, after which every edge
+    is rewired to a random household with chance `rewire_chance`.
+
+    Args:
+        nr_households (int): Number of households.
+        nr_neighbours (int): Neighbours per household in the ring (rounded down to even).
+        rewire_chance (float): Chance to rewire every edge.
+        rng (np.random.Generator): Random generator for the rewiring.
+
+    Returns:
+        NeighbourhoodGraph: The graph.
+    """
+    half = max(1, nr_neighbours // 2)
+    nodes = np.arange(nr_households)
+    sources = np.repeat(nodes, half)
+    targets = (sources + np.tile(np.arange(1, half + 1), nr_households)) % max(nr_households, 1)
+
+    rewire = rng.random(len(targets)) < rewire_chance
+    targets[rewire] = rng.integers(0, nr_households, np.count_nonzero(rewire))
+    return NeighbourhoodGraph.from_edges(nr_households, sources, targets)
+
+
+def geo_graph(coordinates, radius):
+    """
+    Connects all households within `radius` of each other.
+
+    The households are bucketed in square cells of size `radius`, so only
+    pairs in the same or adjacent cells are compared.
+
+    Args:
+        coordinates (np.ndarray): (x, y) per household, shape (nr_households, 2).
+        radius (float): Maximum distance between neighbours.
+
+    Returns:
+        NeighbourhoodGraph: The graph.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    nr_households = len(coordinates)
+    cells = np.floor((coordinates - coordinates.min(axis=0, initial=0.0)) / radius).astype(np.int64)
+    width = cells[:, 0].max(initial=0) + 3
+    cell_keys = (cells[:, 1] + 1) * width + (cells[:, 0] + 1)
+
+    order = np.argsort(cell_keys, kind="stable")
+    sorted_keys = cell_keys[order]
+
+    sources = []
+    targets = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            target_keys = cell_keys + dy * width + dx
+            start = np.searchsorted(sorted_keys, target_keys, side="left")
+            stop = np.searchsorted(sorted_keys, target_keys, side="right")
+            counts = stop - start
+            pair_sources = np.repeat(np.arange(nr_households), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            pair_targets = order[np.repeat(start, counts) + offsets]
+
+            distance = np.linalg.norm(coordinates[pair_sources] - coordinates[pair_targets], axis=1)
+            close = distance <= radius
+            sources.append(pair_sources[close])
+            targets.append(pair_targets[close])
+
+    return NeighbourhoodGraph.from_edges(nr_households, np.concatenate(sources), np.concatenate(targets),
+                                         symmetric=False)
+
+
+def load_coordinates(path, nr_households):
+    """
+    Loads household coordinates from a CSV file with an `x` and `y` column,
+    one row per household in household order.
+
+    Args:
+        path (str): Path to the CSV file.
+        nr_households (int): Number of households in the simulation.
+
+    Returns:
+        np.ndarray: (x, y) per household.
+
+    Raises:
+        ValueError: If the file has fewer rows than there are households.
+    """
+    table = np.genfromtxt(path, delimiter=",", names=True, dtype=np.float64)
+    coordinates = np.column_stack([np.atleast_1d(table["x"]), np.atleast_1d(table["y"])])
+    if len(coordinates) < nr_households:
+        raise ValueError(f"{path} has coordinates for {len(coordinates)} households, {nr_households} needed")
+    return coordinates[:nr_households]
+
+
+def build_neighbourhood_graph(environment):
+    """
+    Builds the neighbourhood graph configured with `network_topology`.
+
+    The small-world rewiring draws its seed from `np.random` (or uses the
+    "network" stream with `random_streams`), so the graph is reproducible for
+    a seeded simulation.
+
+    Args:
+        environment (Environment): The environment with the households and streets.
+
+    Returns:
+        NeighbourhoodGraph: The graph, nodes in the order of `environment.households`.
+
+    Raises:
+        ValueError: If the topology is unknown or the geo topology has no coordinates file.
+    """
+    config = environment.config
+    topology = config.get('network_topology', 'street')
+    nr_households = len(environment.households)
+    position = {hh.unique_id: i for i, hh in enumerate(environment.households)}
+
+    if topology == "street":
+        streets = [[position[hh.unique_id] for hh in street] for street in environment.streets]
+        return street_graph(streets, nr_households)
+    if topology == "grid":
+        return grid_graph(nr_households)
+    if topology == "small_world":
+        streams = environment.random_streams
+        if streams is None:
+            rng = np.random.default_rng(np.random.randint(0, 2 ** 32 - 1, dtype=np.int64))
+        else:
+            rng = streams.generator("network")
+        return small_world_graph(nr_households, config.get('network_neighbours', 4),
+                                 config.get('network_rewire_chance', 0.1), rng)
+    if topology == "geo":
+        path = config.get('network_coordinates_file')
+        if not path:
+            raise ValueError("The geo network topology needs a network_coordinates_file")
+        return geo_graph(load_coordinates(path, nr_households), config.get('network_radius', 50.0))
+    raise ValueError(f"Unknown network_topology: {topology}")
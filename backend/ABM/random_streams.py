@@ -0,0 +1,113 @@
+"""
+Counter-based random number streams.
+
+By default every draw of the simulation comes from the global `random` and
+`np.random` generators, so the numbers an agent gets depend on how many draws
+were made before it: reordering, batching or splitting the work changes the
+results. With `random_streams` enabled, the Environment draws from a
+RandomStreams instead. Every draw is addressed by the run's seed, a subsystem
+and a counter (e.g. the year), and within that stream by the agent's position:
+
+- "households", "initial_installations", "residents": the initial population,
+  drawn in one batch each (agents created outside the population draw from
+  a stream of their own, keyed by their unique_id)
+- "streets": the street sizes of `generate_streets`
+- "income_raise": the income raise of every resident, per year
+- "package_prices": the price step of every package, per year
+- "network": the small-world rewiring of the neighbourhood graph
+
+The streams are Philox generators (a counter-based bit generator) seeded from
+a SeedSequence, so the draws of one stream do not depend on any other stream
+and a slice of a stream (`uniforms(..., start=...)`) can be drawn on its own.
+The object model and the vectorized engine, sequential and bulk agent
+creation, and runs in different worker processes therefore get exactly the
+same numbers for a given seed. Nothing but the seed has to be stored to
+resume a run.
+"""
+import numpy as np
+
+SUBSYSTEMS = ("households", "initial_installations", "residents", "streets", "income_raise",
+              "package_prices", "network")
+
+# Number of doubles Philox produces per counter increment (see `uniforms`)
+PHILOX_BLOCK = 4
+
+
+class RandomStreams:
+    """
+    The random streams of one simulation run.
+
+    Attributes:
+        seed (int): Seed of the run.
+    """
+    def __init__(self, seed):
+        """
+        Args:
+            seed (int): Seed of the run.
+        """
+        self.seed = seed
+
+    def seed_sequence(self, subsystem, *counter):
+        """
+        Returns the SeedSequence of a stream.
+
+        Args:
+            subsystem (str): One of `SUBSYSTEMS`.
+            *counter (int): Further keys of the stream, e.g. the year or a unique_id.
+
+        Returns:
+            np.random.SeedSequence: The same sequence for the same arguments.
+        """
+        return np.random.SeedSequence(self.seed, spawn_key=(SUBSYSTEMS.index(subsystem),) + tuple(counter))
+
+    def generator(self, subsystem, *counter):
+        """
+        Returns a new generator at the start of a stream.
+
+        Args:
+            subsystem (str): One of `SUBSYSTEMS`.
+            *counter (int): Further keys of the stream, e.g. the year or a unique_id.
+
+        Returns:
+            np.random.Generator: A Philox generator, in the same state for the same arguments.
+        """
+        return np.random.Generator(np.random.Philox(self.seed_sequence(subsystem, *counter)))
+
+    def uniforms(self, subsystem, counter, n, start=0):
+        """
+        Draws uniform numbers in [0, 1) from a stream, one per agent.
+
+        Every number takes one 64-bit draw, so the number at position `i` is the
+        same whether it is drawn in a batch from position 0 or on its own with
+        `start=i`.
+
+        Args:
+            subsystem (str): One of `SUBSYSTEMS`.
+            counter (int): Counter of the stream, e.g. the year.
+            n (int): Number of draws.
+            start (int): Position of the first draw in the stream.
+
+        Returns:
+            np.ndarray: The draws at positions `start` to `start + n`.
+        """
+        bit_generator = np.random.Philox(self.seed_sequence(subsystem, counter))
+        bit_generator.advance(start // PHILOX_BLOCK)
+        skip = start % PHILOX_BLOCK
+        return np.random.Generator(bit_generator).random(skip + n)[skip:]
+
+    def choices(self, subsystem, counter, options, n, start=0):
+        """
+        Picks uniformly from a list of options, one pick per agent (see `uniforms`).
+
+        Args:
+            subsystem (str): One of `SUBSYSTEMS`.
+            counter (int): Counter of the stream, e.g. the year.
+            options (list): The options.
+            n (int): Number of picks.
+            start (int): Position of the first pick in the stream.
+
+        Returns:
+            np.ndarray: The picked options.
+        """
+        indices = (self.uniforms(subsystem, counter, n, start) * len(options)).astype(np.int64)
+        return np.asarray(options)[np.minimum(indices, len(options) - 1)]
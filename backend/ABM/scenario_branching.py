@@ -0,0 +1,185 @@
+"""
+Scenario branching: fork a simulated world at year N and run policy variants.
+
+Policy comparisons (a subsidy on `heat_pump_price`, an `energy_price` shock,
+...) usually share the same first N years. `run_scenarios` simulates that
+shared prefix once, takes an in-memory snapshot of the Environment (see
+checkpoint.py) and runs every scenario forward from its own copy of the
+snapshot in a process pool.
+
+Every copy also restores the states of the global random generators, so all
+scenarios continue with the same random numbers: differences between them
+come from the policy, not from noise.
+
+Example:
+    python scenario_branching.py --fork-year 10 --years 30 --seed 4 \\
+        --scenario subsidy heat_pump_price=3000 --scenario shock energy_price=0.45
+"""
+import argparse
+import json
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from environment import Environment
+from checkpoint import snapshot, restore_snapshot
+from batch_runner import parse_grid
+
+
+def apply_overrides(model, overrides):
+    """
+    Applies a scenario's config overrides to a forked Environment.
+
+    Besides changing the model's configuration, the values that were copied
+    into the model when it was created are updated too: the price of a package
+    whose price config key is overridden (e.g. `heat_pump_price`) and the
+    environment's `energy_price`. Never-adopter pruning is redone for the new
+    parameters.
+
+    Args:
+        model (Environment): The forked environment.
+        overrides (dict): Config key to new value.
+
+    Raises:
+        KeyError: If a key does not exist in the configuration.
+    """
+    for key, value in overrides.items():
+        if key not in model.config:
+            raise KeyError(f"Parameter '{key}' does not exist in the configuration.")
+        model.config[key] = value
+        if key == 'energy_price':
+            model.energy_price = value
+        for package in model.sustainability_packages:
+            if package.price_config_key == key:
+                package.price = value
+    model.prune_never_adopters()
+
+
+def run_prefix(fork_year, seed, nr_households, nr_residents):
+    """
+    Runs the shared years of all scenarios and snapshots the result.
+
+    Args:
+        fork_year (int): Number of years to simulate before forking.
+        seed (int): Seed for `random`, `np.random` and the random streams.
+        nr_households (int): Number of households.
+        nr_residents (int): Number of residents.
+
+    Returns:
+        bytes: Snapshot of the Environment after `fork_year` years.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    model = Environment(nr_households=nr_households, nr_residents=nr_residents, seed=seed)
+    for year in range(fork_year):
+        data = model.collect_start_of_year_data(year + 1)
+        model.step()
+        model.collect_end_of_year_data(data)
+    return snapshot(model, fork_year, seed)
+
+
+def run_branch(prefix_snapshot, name, overrides, simulation_years):
+    """
+    Runs one scenario forward from the snapshot. Executed inside a worker process.
+
+    Args:
+        prefix_snapshot (bytes): Snapshot taken by `run_prefix`.
+        name (str): Name of the scenario.
+        overrides (dict): Config overrides of the scenario.
+        simulation_years (int): Total number of years, including the shared prefix.
+
+    Returns:
+        tuple: (name, yearly_stats) with the collected data of every year, including the prefix.
+    """
+    state = restore_snapshot(prefix_snapshot)
+    model = state["model"]
+    apply_overrides(model, overrides)
+
+    for year in range(state["year"], simulation_years):
+        data = model.collect_start_of_year_data(year + 1)
+        model.step()
+        model.collect_end_of_year_data(data)
+    return name, model.yearly_stats
+
+
+def run_scenarios(fork_year, scenarios, simulation_years=None, seed=None, nr_households=None,
+                  nr_residents=None, max_workers=None):
+    """
+    Runs the shared prefix once and every scenario forward from it in parallel.
+
+    Args:
+        fork_year (int): Number of years shared by all scenarios.
+        scenarios (dict): Scenario name to config overrides, e.g.
+            {"baseline": {}, "subsidy": {"heat_pump_price": 3000}}.
+        simulation_years (int | None): Total number of years, defaults to the config value.
+        seed (int | None): Seed of the shared prefix, random if None.
+        nr_households (int | None): Number of households, defaults to the config value.
+        nr_residents (int | None): Number of residents, defaults to the config value.
+        max_workers (int | None): Number of worker processes, defaults to the number of CPUs.
+
+    Returns:
+        dict: {"seed", "fork_year", "scenarios": {name: yearly_stats}}. The yearly
+              stats of every scenario start with the shared years.
+
+    Raises:
+        ValueError: If `fork_year` is outside the simulated years.
+    """
+    conf = config.configs[config.CHOSEN_CONFIG]
+    simulation_years = simulation_years if simulation_years is not None else conf['simulation_years']
+    if not 0 <= fork_year <= simulation_years:
+        raise ValueError(f"fork_year must be between 0 and {simulation_years}.")
+    if seed is None:
+        seed = random.randint(0, 2 ** 32 - 1)
+
+    prefix_snapshot = run_prefix(
+        fork_year, seed,
+        nr_households if nr_households is not None else conf['nr_households'],
+        nr_residents if nr_residents is not None else conf['nr_residents'],
+    )
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_branch, prefix_snapshot, name, overrides, simulation_years)
+            for name, overrides in scenarios.items()
+        ]
+        for future in futures:
+            name, yearly_stats = future.result()
+            results[name] = yearly_stats
+
+    return {"seed": seed, "fork_year": fork_year, "scenarios": results}
+
+
+def parse_scenarios(scenario_args):
+    """
+    Parses command line scenarios of the form [name, key=value, ...].
+
+    Returns:
+        dict: Scenario name to config overrides, always including an unchanged "baseline".
+    """
+    scenarios = {"baseline": {}}
+    for name, *assignments in scenario_args or []:
+        scenarios[name] = {key: values[0] for key, values in parse_grid(assignments).items()}
+    return scenarios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fork the simulation at a year and run policy scenarios.")
+    parser.add_argument("--fork-year", type=int, required=True, help="Years shared by all scenarios.")
+    parser.add_argument("--years", type=int, default=None, help="Total simulation years.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the shared prefix.")
+    parser.add_argument("--scenario", nargs="+", action="append",
+                        help="Scenario as: name key=value [key=value ...]. Can be repeated.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    outcome = run_scenarios(args.fork_year, parse_scenarios(args.scenario), args.years, args.seed,
+                            max_workers=args.workers)
+    print(f"seed={outcome['seed']} forked after year {outcome['fork_year']}")
+    for scenario_name, stats in outcome["scenarios"].items():
+        last_year = stats[-1]
+        installed = {name: values["households_with_package"]
+                     for name, values in last_year["end_state_per_package"].items()}
+        print(f"{scenario_name}: year {last_year['year']}: co2 saved "
+              f"{last_year['total_co2_saved_yearly'] / 1000:.1f} tons, households with package {json.dumps(installed)}")
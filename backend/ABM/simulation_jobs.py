@@ -0,0 +1,246 @@
+"""
+Background simulation jobs for the Flask API.
+
+Starting a simulation creates a SimulationJob and returns immediately; the
+run itself executes on a background worker thread. Every job has its own
+SimulationResults storage, so the API can report progress and results of
+several jobs without sharing the module level lists in `main.py`. The
+storage records an event per simulated year, so clients can subscribe to a
+job (see `SimulationJob.events`) instead of polling its data.
+
+Jobs run one at a time: the simulation seeds and uses the global `random`
+and `np.random` generators and reads the shared configuration, so running
+two jobs at the same time would make both irreproducible. Further jobs wait
+in the queue with status "queued".
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from main import run_simulation, SimulationResults
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class SimulationJob:
+    """
+    A single simulation run requested through the API.
+
+    Attributes:
+        job_id (str): Unique identifier of the job.
+        params (dict): Simulation parameters (nr_households, nr_residents, simulation_years, seed, headless).
+        status (str): One of "queued", "running", "finished", "cancelled" or "failed".
+        results (SimulationResults): The data collected by this job.
+        result (dict | None): The return value of `run_simulation` once finished.
+        error (str | None): Error message if the job failed.
+        cancel_event (threading.Event): Set to request cancellation.
+    """
+    def __init__(self, job_id, params):
+        self.job_id = job_id
+        self.params = params
+        self.status = QUEUED
+        self.results = SimulationResults(record_events=True)
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        """
+        Returns:
+            bool: True if the job will not run (any further).
+        """
+        return self.status in (FINISHED, CANCELLED, FAILED)
+
+    def events(self, start=0, keepalive=15.0):
+        """
+        Yields the events of the job as they are recorded, starting with event `start`.
+
+        Every event is a dictionary with an "id" (its index). Year events contain the
+        year record and the details of the households whose installations changed;
+        the last event has type "end". When no event arrives within `keepalive`
+        seconds, None is yielded so the caller can keep the connection alive.
+
+        Args:
+            start (int): Index of the first event to yield (to resume a stream).
+            keepalive (float): Seconds to wait for a new event before yielding None.
+
+        Yields:
+            dict | None: The next event, or None on a keepalive timeout.
+        """
+        index = start
+        while True:
+            events = self.results.wait_for_events(index, keepalive)
+            if not events:
+                if self.results.finished:
+                    return
+                yield None
+                continue
+            for event in events:
+                yield dict(event, id=index)
+                index += 1
+                if event["type"] == "end":
+                    return
+
+    def to_dict(self):
+        """
+        Returns the status and progress of the job for the API.
+
+        Returns:
+            dict: Job id, status, parameters, progress and timing information.
+        """
+        simulation_years = self.params["simulation_years"]
+        years_completed = self.results.years_completed
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "params": self.params,
+            "years_completed": years_completed,
+            "simulation_years": simulation_years,
+            "progress": years_completed / simulation_years if simulation_years else 1.0,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Queues simulation jobs and runs them on a background worker.
+
+    Attributes:
+        max_finished_jobs (int): Number of finished jobs whose results are kept in memory.
+    """
+    def __init__(self, max_finished_jobs=20):
+        """
+        Args:
+            max_finished_jobs (int): Number of finished jobs whose results are kept in memory.
+        """
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation-job")
+
+    def submit(self, params):
+        """
+        Queues a new simulation job.
+
+        Args:
+            params (dict): Simulation parameters (nr_households, nr_residents, simulation_years, seed, headless).
+
+        Returns:
+            SimulationJob: The queued job.
+        """
+        with self._lock:
+            job = SimulationJob(str(next(self._ids)), params)
+            self._jobs[job.job_id] = job
+            self._prune_finished_jobs()
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """
+        Returns:
+            SimulationJob | None: The job with the given id, None if unknown.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self):
+        """
+        Returns:
+            SimulationJob | None: The most recently submitted job, None if there are no jobs.
+        """
+        with self._lock:
+            return next(reversed(self._jobs.values()), None)
+
+    def list_jobs(self):
+        """
+        Returns:
+            list[SimulationJob]: All known jobs, oldest first.
+        """
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """
+        Requests cancellation of a job.
+
+        A queued job is cancelled immediately, a running job stops after the current year.
+
+        Args:
+            job_id (str): The id of the job.
+
+        Returns:
+            SimulationJob | None: The job, None if unknown.
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.results.finish(job.status)
+        return job
+
+    def _run(self, job):
+        """
+        Executes a job on the worker thread.
+        """
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.results.finish(job.status)
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        params = job.params
+
+        # Keep the shared config in line with the running job (read by the agents and /get_config)
+        conf = config.configs[config.CHOSEN_CONFIG]
+        for key in ("nr_households", "nr_residents", "simulation_years", "seed"):
+            conf[key] = params[key]
+
+        try:
+            job.result = run_simulation(
+                params["nr_households"],
+                params["nr_residents"],
+                params["simulation_years"],
+                seed=params["seed"],
+                headless=params.get("headless"),
+                results=job.results,
+                cancel_event=job.cancel_event,
+            )
+            job.status = CANCELLED if job.result["cancelled"] else FINISHED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job.results.finish(job.status)
+
+    def _prune_finished_jobs(self):
+        """
+        Drops the oldest finished jobs beyond `max_finished_jobs`. Must be called with the lock held.
+        """
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
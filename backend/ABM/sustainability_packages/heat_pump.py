@@ -1,37 +1,21 @@
-import random
 import numpy as np
-from sustainability_packages.packages_base import SustainabilityPackage
+from sustainability_packages.packages_base import SustainabilityPackage, register_package
 
 
+@register_package
 class HeatPump(SustainabilityPackage):
     """
     Represents a Heat Pump as a sustainability package.
 
     Inherits from SustainabilityPackage and defines specific behaviors for
-    heat pumps, such as price updates, behavioral influence calculation,
-    and ROI calculation.
+    heat pumps, such as behavioral influence calculation and ROI calculation.
+    Electricity generated by installed packages (e.g. solar panels) is used
+    for the heat pump first.
     """
-    def __init__(self, environment):
-        """
-        Initializes a HeatPump package instance.
-
-        Args:
-            environment (Model): The simulation model/environment.
-        """
-        super().__init__(
-            name="Heat Pump",
-            environment=environment,
-            price_config_key='heat_pump_price',
-            price_increase_config_key='heatpump_price_increase'
-        )
-
-    def step(self):
-        """
-        Updates the price of the heat pump for the current step.
-
-        The price increases by a random amount defined in the configuration.
-        """
-        self.price += round(random.randint(*self.config['heatpump_price_increase']))
+    name = "Heat Pump"
+    price_config_key = 'heat_pump_price'
+    price_increase_key = 'heatpump_price_increase'
+    initial_chance_config_key = 'initial_heatpump_chance'
 
     def calculate_behavioral_influence(self, income, household):
         """
@@ -53,7 +37,7 @@ class HeatPump(SustainabilityPackage):
         difference = income - self.price / 1.829  # Division to make price of heatpump equal to avg price of solarpanels
         normalized_diff = (difference - min_diff) / (max_diff - min_diff)
 
-        roi = self.calc_roi(household)
+        roi = self.get_roi(household)
         # Influence from ROI: higher ROI (longer payback) reduces positive influence.
         # Maps ROI [0, 30] to a contribution. If ROI is 0, contribution is 0.25.
         # If ROI is 30, contribution is 0. If ROI > 30, contribution is < 0 (then clipped by max(0,...)).
@@ -61,6 +45,13 @@ class HeatPump(SustainabilityPackage):
 
         return np.clip(normalized_diff + influence_roi, 0, 1)
     
+    def roi_cache_key(self):
+        """
+        Returns:
+            tuple: The package price and the configured gas and energy prices used by `calc_roi`.
+        """
+        return (self.price, self.config['gas_price'], self.config['energy_price'])
+
     def calc_roi(self, household):
         """
         Calculates the simple payback period (Return on Investment time) in years for a heat pump.
@@ -79,15 +70,59 @@ class HeatPump(SustainabilityPackage):
         gas_costs = household.gas_usage * self.config['gas_price']
         heat_pump_costs = household.heatpump_usage * self.config['energy_price']
 
-        for package_name, is_installed in household.package_installations.items():
-            if package_name == "Solar Panel" and is_installed:
-                heat_pump_costs = min(household.heatpump_usage - (household.energy_generation * household.solarpanel_amount), 0) * self.config['energy_price']
+        generation = self.installed_energy_generation(household)
+        if generation is not None:
+            heat_pump_costs = min(household.heatpump_usage - generation, 0) * self.config['energy_price']
         savings = gas_costs - heat_pump_costs
 
         if savings <= 0:
             return float("inf")
         return self.price / savings
     
+    def calculate_behavioral_influence_batch(self, incomes, households, household_index):
+        """
+        Array version of `calculate_behavioral_influence` for many residents at once.
+
+        Args:
+            incomes (np.ndarray): Income per resident.
+            households (HouseholdArrays): Column view of all households.
+            household_index (np.ndarray): For each resident, the position of its household.
+
+        Returns:
+            np.ndarray: The behavioral influence per resident, clipped between 0 and 1.
+        """
+        max_diff = self.price / 3
+        min_diff = -(self.price / 3)
+
+        difference = incomes - self.price / 1.829
+        normalized_diff = (difference - min_diff) / (max_diff - min_diff)
+
+        roi = self.calc_roi_batch(households)[household_index]
+        influence_roi = np.maximum(0, np.minimum(0.25, 0.25 * (1 - roi / 30)))
+
+        return np.clip(normalized_diff + influence_roi, 0, 1)
+
+    def calc_roi_batch(self, households):
+        """
+        Array version of `calc_roi` for all households.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Returns:
+            np.ndarray: The ROI time in years per household, inf where savings are not positive.
+        """
+        gas_costs = households.gas_usage * self.config['gas_price']
+        heat_pump_costs = households.heatpump_usage * self.config['energy_price']
+
+        generation, has_generation = self.installed_energy_generation_batch(households)
+        heat_pump_costs_generation = np.minimum(households.heatpump_usage - generation, 0) * self.config['energy_price']
+        heat_pump_costs = np.where(has_generation, heat_pump_costs_generation, heat_pump_costs)
+        savings = gas_costs - heat_pump_costs
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(savings > 0, self.price / savings, float("inf"))
+
     def calc_co2_savings(self, household):
         """
         Calculates net annual CO2 savings by replacing gas heating with electric heating.
@@ -95,8 +130,21 @@ class HeatPump(SustainabilityPackage):
         co2_saved = household.gas_usage * self.config['CO2_gas']
         co2_used = household.heatpump_usage * self.config['CO2_electricity']
 
-        for package_name, is_installed in household.package_installations.items():
-            if package_name == "Solar Panel" and is_installed:
-                co2_used = min(household.heatpump_usage - (household.energy_generation * household.solarpanel_amount), 0) * self.config['CO2_electricity']
+        generation = self.installed_energy_generation(household)
+        if generation is not None:
+            co2_used = min(household.heatpump_usage - generation, 0) * self.config['CO2_electricity']
+
+        return co2_saved - co2_used
+
+    def calc_co2_savings_batch(self, households):
+        """
+        Array version of `calc_co2_savings` for all households.
+        """
+        co2_saved = households.gas_usage * self.config['CO2_gas']
+        co2_used = households.heatpump_usage * self.config['CO2_electricity']
+
+        generation, has_generation = self.installed_energy_generation_batch(households)
+        co2_used_generation = np.minimum(households.heatpump_usage - generation, 0) * self.config['CO2_electricity']
+        co2_used = np.where(has_generation, co2_used_generation, co2_used)
 
-        return co2_saved - co2_used
\ No newline at end of file
+        return co2_saved - co2_used
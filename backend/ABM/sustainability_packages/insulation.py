@@ -0,0 +1,70 @@
+import numpy as np
+from sustainability_packages.packages_base import SustainabilityPackage, register_package
+
+
+@register_package
+class Insulation(SustainabilityPackage):
+    """
+    Represents home insulation as a sustainability package.
+
+    Insulation saves a fixed fraction (`insulation_gas_saving`) of a
+    household's gas usage. The package only declares its array kernels; the
+    per-household methods of the object model use the defaults of
+    SustainabilityPackage.
+    """
+    name = "Insulation"
+    price_config_key = 'insulation_price'
+    price_increase_key = 'insulation_price_increase'
+    initial_chance_config_key = 'initial_insulation_chance'
+
+    def calculate_behavioral_influence_batch(self, incomes, households, household_index):
+        """
+        Behavioral influence per resident from affordability and ROI.
+
+        Args:
+            incomes (np.ndarray): Income per resident.
+            households (HouseholdArrays): Column view of all households.
+            household_index (np.ndarray): For each resident, the position of its household.
+
+        Returns:
+            np.ndarray: The behavioral influence per resident, clipped between 0 and 1.
+        """
+        max_diff = self.price / 3
+        min_diff = -(self.price / 3)
+
+        difference = incomes - self.price
+        normalized_diff = (difference - min_diff) / (max_diff - min_diff)
+
+        # Maps ROI [0, 20] to a contribution of [0.25, 0]
+        roi = self.calc_roi_batch(households)[household_index]
+        influence_roi = np.maximum(0, 0.25 * (1 - roi / 20))
+
+        return np.clip(normalized_diff + influence_roi, 0, 1)
+
+    def roi_cache_key(self):
+        """
+        Returns:
+            tuple: The package price, gas price and gas saving used by `calc_roi_batch`.
+        """
+        return (self.price, self.config['gas_price'], self.config['insulation_gas_saving'])
+
+    def calc_roi_batch(self, households):
+        """
+        Payback period in years: price / yearly gas savings.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Returns:
+            np.ndarray: The ROI time in years per household, inf where savings are not positive.
+        """
+        savings = households.gas_usage * self.config['insulation_gas_saving'] * self.config['gas_price']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(savings > 0, self.price / savings, float("inf"))
+
+    def calc_co2_savings_batch(self, households):
+        """
+        Annual CO2 savings of the gas that is no longer used.
+        """
+        return households.gas_usage * self.config['insulation_gas_saving'] * self.config['CO2_gas']
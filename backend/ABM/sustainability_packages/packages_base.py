@@ -1,78 +1,273 @@
 import random
 import numpy as np
 import utilities
+from vectorized_engine import HouseholdArrays
+
+# Registered package types, {package name: class}. See `register_package`.
+PACKAGE_TYPES = {}
+
+
+def register_package(package_class):
+    """
+    Class decorator that makes a package type available to the simulation.
+
+    Which registered packages take part in a run is configured with the
+    `sustainability_packages` config value (see `registry.create_packages`).
+
+    Args:
+        package_class (type): Subclass of SustainabilityPackage with a `name`.
+
+    Returns:
+        type: The same class.
+    """
+    PACKAGE_TYPES[package_class.name] = package_class
+    return package_class
+
 
 class SustainabilityPackage:
     """
     Base class for all sustainability packages (e.g., Solar Panels, Heat Pumps).
 
-    This class provides common attributes and methods that individual package
-    types can inherit and extend.
+    A package is declared with class attributes for its name and config keys
+    and array kernels over all households: `calc_roi_batch`,
+    `calc_co2_savings_batch`, `calculate_behavioral_influence_batch` and
+    optionally `calc_energy_generation_batch`. The price dynamics are the
+    yearly random increase of `step`. The per-household methods used by the
+    object model fall back to the kernels, so a new package only has to
+    implement them; packages may override them with plain Python versions.
 
     Attributes:
         name (str): The name of the sustainability package.
+        price_config_key (str): Configuration key for the package's initial price.
+        price_increase_key (str): Configuration key for the package's price increase range.
+        initial_chance_config_key (str | None): Configuration key for the chance that a
+            household starts with the package installed.
         environment (Model): Reference to the simulation model.
         config_id (int): Identifier for the chosen configuration.
         config (dict): The configuration dictionary.
         price (float): Current price of the package.
-        price_increase_key (str): Configuration key for the package's price increase range.
+        slug (str): File name friendly name, e.g. "solar_panel".
         subj_norm_mod (float): Package-specific modifier for subjective norm influence.
+        max_behavioral_influence (float): Upper bound of the behavioral influence, used to
+            prune residents that can never adopt the package (see active_set.py).
     """
-    def __init__(self, name, environment, price_config_key, price_increase_config_key):
+    name = None
+    price_config_key = None
+    price_increase_key = None
+    initial_chance_config_key = None
+    max_behavioral_influence = 1.0
+
+    def __init__(self, environment):
         """
-        Initializes a generic sustainability package.
+        Initializes a sustainability package from its declared config keys.
 
         Args:
-            name (str): The name of the package (e.g., "Solar Panel").
             environment (Model): The simulation model/environment.
-            price_config_key (str): The key in the configuration file to find the initial price.
-            price_increase_config_key (str): The key for the price increase range.
         """
-        self.name = name
         self.environment = environment
         self.config_id, self.config = utilities.choose_config()
-        self.price = self.config[price_config_key]
-        self.price_increase_key = price_increase_config_key
-        
+        self.price = self.config[self.price_config_key]
+        self.slug = self.name.lower().replace(' ', '_')
+
         # Package-specific subjective norm modifier, defaults to 1.0 if not in config.
-        self.subj_norm_mod = self.config.get(f"{name.lower().replace(' ', '_')}_subj_norm_mod", 1.0)
+        self.subj_norm_mod = self.config.get(f"{self.slug}_subj_norm_mod", 1.0)
+
+    def _household_arrays(self, household):
+        """
+        Returns a single-household column view, used by the per-household fallbacks.
+        """
+        return HouseholdArrays([household], self.environment.sustainability_packages)
 
 
     def step(self):
         """
         Updates the package's price based on a configured random increase.
         This method is called once per simulation step (e.g., per year).
+
+        With `random_streams` the increase is drawn from the "package_prices"
+        stream of the year and the package's position, instead of from `random`.
         """
         increase_range = self.config.get(self.price_increase_key, (0,0)) # Default to no increase if key missing
-        self.price += round(random.randint(*increase_range))
+        streams = self.environment.random_streams
+        if streams is None:
+            self.price += round(random.randint(*increase_range))
+        else:
+            rng = streams.generator("package_prices", self.environment.steps, self.environment.package_index[self.name])
+            self.price += int(rng.integers(increase_range[0], increase_range[1], endpoint=True))
 
     def calculate_behavioral_influence(self, income, household):
         """
-        Calculates the behavioral influence component for decision-making.
+        Calculates the behavioral influence component for decision-making,
+        i.e. how affordability and ROI influence a resident's decision.
 
-        This method should be implemented by subclasses to define how factors
-        like affordability and ROI influence a resident's decision for this
-        specific package.
+        Defaults to `calculate_behavioral_influence_batch` for a single resident.
 
         Args:
             income (float): The resident's annual income.
             household (Household): The household considering the package.
 
-        Raises:
-            NotImplementedError: If not overridden by a subclass.
+        Returns:
+            float: The behavioral influence, between 0 and 1.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
+        influence = self.calculate_behavioral_influence_batch(
+            np.array([income], dtype=np.float64), self._household_arrays(household), np.zeros(1, dtype=np.int64)
+        )
+        return float(influence[0])
 
     def calc_roi(self, household):
         """
         Calculates the Return on Investment (ROI) or payback period for the package.
 
-        This method should be implemented by subclasses to define how ROI is
-        calculated for this specific package.
+        Defaults to `calc_roi_batch` for a single household.
 
         Args:
             household (Household): The household for which to calculate ROI.
 
+        Returns:
+            float: The ROI time in years.
+        """
+        return float(self.calc_roi_batch(self._household_arrays(household))[0])
+
+    def roi_cache_key(self):
+        """
+        Returns the prices `calc_roi` depends on, besides the household.
+
+        Packages whose ROI reads other prices (e.g. from the configuration)
+        override this, so changing them at runtime invalidates the memoized ROI.
+
+        Returns:
+            tuple: The package price and the energy price of the environment.
+        """
+        return (self.price, self.environment.energy_price)
+
+    def get_roi(self, household):
+        """
+        Returns the ROI of this package for a household, memoized per household.
+
+        The ROI only depends on the household, the prices and the installed
+        packages, so all residents of a household share one computation. Cached
+        values are keyed on `roi_cache_key`, and the cache of a household is
+        cleared when it installs a package.
+
+        Args:
+            household (Household): The household for which to get the ROI.
+
+        Returns:
+            float: The ROI time in years, see `calc_roi`.
+        """
+        key = self.roi_cache_key()
+        cached = household.roi_cache.get(self.name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        roi = self.calc_roi(household)
+        household.roi_cache[self.name] = (key, roi)
+        return roi
+
+    def calc_roi_batch(self, households):
+        """
+        Array version of `calc_roi` for all households.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Raises:
+            NotImplementedError: If not overridden by a subclass.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def calc_energy_generation(self, household):
+        """
+        Returns the electricity (kWh per year) this package generates for a household
+        once installed. Packages that do not generate electricity return 0.
+
+        Args:
+            household (Household): The household.
+
+        Returns:
+            float: The annual generation in kWh.
+        """
+        return float(self.calc_energy_generation_batch(self._household_arrays(household))[0])
+
+    def calc_energy_generation_batch(self, households):
+        """
+        Array version of `calc_energy_generation` for all households.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Returns:
+            np.ndarray: Annual generation per household, zeros by default.
+        """
+        return np.zeros(len(households.nr_residents), dtype=np.int64)
+
+    def installed_energy_generation(self, household):
+        """
+        Sums the generation of the other packages a household has installed.
+
+        Args:
+            household (Household): The household.
+
+        Returns:
+            int | float | None: The annual generation in kWh, None if the household has
+                                no generating package installed.
+        """
+        generation = None
+        for package in self.environment.sustainability_packages:
+            if package is not self and package.generates_energy and household.package_installations.get(package.name, False):
+                generation = (generation or 0) + package.calc_energy_generation(household)
+        return generation
+
+    def installed_energy_generation_batch(self, households):
+        """
+        Array version of `installed_energy_generation`.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Generation per household and whether the
+                household has a generating package installed.
+        """
+        nr_households = len(households.nr_residents)
+        generation = np.zeros(nr_households, dtype=np.int64)
+        has_generation = np.zeros(nr_households, dtype=bool)
+        for package in self.environment.sustainability_packages:
+            if package is not self and package.generates_energy:
+                installed = households.is_installed(package.name)
+                generation = generation + np.where(installed, package.calc_energy_generation_batch(households), 0)
+                has_generation |= installed
+        return generation, has_generation
+
+    @property
+    def generates_energy(self):
+        """
+        Returns:
+            bool: True if the package overrides `calc_energy_generation_batch`.
+        """
+        return type(self).calc_energy_generation_batch is not SustainabilityPackage.calc_energy_generation_batch
+
+    def calculate_behavioral_influence_batch(self, incomes, households, household_index):
+        """
+        Array version of `calculate_behavioral_influence` used by the vectorized engine.
+
+        Args:
+            incomes (np.ndarray): Income per resident.
+            households (HouseholdArrays): Column view of all households.
+            household_index (np.ndarray): For each resident, the position of its household.
+
+        Raises:
+            NotImplementedError: If not overridden by a subclass.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def calc_co2_savings_batch(self, households):
+        """
+        Array version of `calc_co2_savings` used by the vectorized engine.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
         Raises:
             NotImplementedError: If not overridden by a subclass.
         """
@@ -84,8 +279,9 @@ class SustainabilityPackage:
         to all relevant residents in the environment.
 
         The calculation method depends on the `subj_norm_level` configured
-        (e.g., "District", "Street", "Direct"). Uses `self.name` to identify
-        this package's adoption rates.
+        (e.g., "District", "Street", "Direct", "Network"). Uses `self.name` to identify
+        this package's adoption rates. "District" and "Street" read the installed
+        counters kept by the environment instead of rescanning the households.
 
         Args:
             environment (Model): The simulation environment, providing access to
@@ -96,31 +292,36 @@ class SustainabilityPackage:
 
         # --- District Level ---
         # Subjective norm is based on the adoption rate in the entire district.
+        # Residents are only rewritten when a household installed the package since the last update.
         if subj_norm_level == "District":
             all_households_in_scope = environment.households
             if not all_households_in_scope:
                 subj_norm_value = 0.0
             else:
-                num_installed = sum(1 for hh in all_households_in_scope if hh.package_installations.get(package_name, False))
+                num_installed = environment.district_installed_counts[package_name]
                 num_total = len(all_households_in_scope)
                 subj_norm_value = (num_installed / (num_total - 1)) if num_total > 1 else (num_installed / num_total if num_total == 1 else 0.0)
 
             subj_norm_value = min(max(0.0, subj_norm_value), 1.0)
-            for hh in all_households_in_scope:
-                for res in hh.residents:
-                    res.package_subjective_norms[package_name] = subj_norm_value
+            if environment.changed_streets[package_name]:
+                for hh in all_households_in_scope:
+                    for res in hh.residents:
+                        res.package_subjective_norms[package_name] = subj_norm_value
         
         # --- Street Level ---
         # Subjective norm is based on the adoption rate within the household's street.
+        # Only streets whose installed count changed since the last update are rewritten.
         elif subj_norm_level == "Street":
-            for street_list in environment.streets:
+            for street_index in environment.changed_streets[package_name]:
+                if street_index is None:
+                    continue
+                street_list = environment.streets[street_index]
                 if not street_list:
-                    subj_norm_value_street = 0.0
-                else:
-                    num_installed_in_street = sum(1 for hh_in_street in street_list if hh_in_street.package_installations.get(package_name, False))
-                    num_total_in_street = len(street_list)
-                    subj_norm_value_street = (num_installed_in_street / (num_total_in_street - 1)) if num_total_in_street > 1 else (num_installed_in_street / num_total_in_street if num_total_in_street == 1 else 0.0)
+                    continue
 
+                num_installed_in_street = environment.street_installed_counts[package_name][street_index]
+                num_total_in_street = len(street_list)
+                subj_norm_value_street = (num_installed_in_street / (num_total_in_street - 1)) if num_total_in_street > 1 else num_installed_in_street / num_total_in_street
 
                 subj_norm_value_street = min(max(0.0, subj_norm_value_street), 1.0)
                 for hh_in_street in street_list:
@@ -153,20 +354,42 @@ class SustainabilityPackage:
                                 current_norm = res_direct.package_subjective_norms.get(package_name, 0.0)
                                 res_direct.package_subjective_norms[package_name] = min(1.0, current_norm + 0.5)
                             hh_curr_direct.skip_next_flags[package_name] = True
+        # --- Network Level ---
+        # Subjective norm is the weighted fraction of neighbours in the neighbourhood graph
+        # that installed the package, computed as one sparse matrix-vector product.
+        # Only households whose norm changed are rewritten.
+        elif subj_norm_level == "Network":
+            if environment.changed_streets[package_name]:
+                households = environment.households
+                installed = np.fromiter((hh.package_installations.get(package_name, False) for hh in households),
+                                        dtype=bool, count=len(households))
+                norms = environment.get_neighbourhood_graph().adoption_fraction(installed)
+                previous = environment.network_norms.get(package_name)
+                changed = np.arange(len(households)) if previous is None else np.flatnonzero(norms != previous)
+                for i in changed.tolist():
+                    value = float(norms[i])
+                    for res_network in households[i].residents:
+                        res_network.package_subjective_norms[package_name] = value
+                environment.network_norms[package_name] = norms
+
         else: # Default or unknown level, set to configured base subjective norm.
             default_norm = environment.config.get('subjective_norm', 0.0)
             for hh_default in environment.households:
                 for res_default in hh_default.residents:
                     res_default.package_subjective_norms[package_name] = default_norm
 
+        environment.changed_streets[package_name].clear()
+
     def calc_co2_savings(self, household):
         """
         Calculates the annual CO2 savings generated by this package for a given household.
 
+        Defaults to `calc_co2_savings_batch` for a single household.
+
         Args:
             household (Household): The household that has the package installed.
 
         Returns:
             float: The estimated annual CO2 savings in kg.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
\ No newline at end of file
+        return float(self.calc_co2_savings_batch(self._household_arrays(household))[0])
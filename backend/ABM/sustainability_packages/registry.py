@@ -0,0 +1,33 @@
+"""
+Creates the sustainability packages of a simulation.
+
+Package types register themselves with `register_package` (see
+packages_base.py); importing their modules here makes the built-in packages
+available. The packages that take part in a run, and their order, are
+configured with the `sustainability_packages` config value.
+"""
+from sustainability_packages.packages_base import PACKAGE_TYPES
+from sustainability_packages import solar_panel, heat_pump, insulation  # noqa: F401 (registers the packages)
+
+DEFAULT_PACKAGES = ["Solar Panel", "Heat Pump"]
+
+
+def create_packages(environment):
+    """
+    Instantiates the configured sustainability packages.
+
+    Args:
+        environment (Environment): The simulation environment.
+
+    Returns:
+        list[SustainabilityPackage]: The packages, in configured order.
+
+    Raises:
+        ValueError: If a configured package is not registered.
+    """
+    packages = []
+    for name in environment.config.get('sustainability_packages', DEFAULT_PACKAGES):
+        if name not in PACKAGE_TYPES:
+            raise ValueError(f"Unknown sustainability package '{name}', registered: {sorted(PACKAGE_TYPES)}")
+        packages.append(PACKAGE_TYPES[name](environment))
+    return packages
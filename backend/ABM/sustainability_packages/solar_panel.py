@@ -1,39 +1,20 @@
-import random
 import numpy as np
-import utilities
-from sustainability_packages.packages_base import SustainabilityPackage
+from sustainability_packages.packages_base import SustainabilityPackage, register_package
 
 
+@register_package
 class SolarPanel(SustainabilityPackage):
     """
     Represents Solar Panels as a sustainability package.
 
     Inherits from SustainabilityPackage and defines specific behaviors for
-    solar panels, such as price updates, behavioral influence calculation,
-    and ROI calculation.
+    solar panels, such as behavioral influence calculation, ROI calculation
+    and the electricity they generate. The price is per panel.
     """
-    def __init__(self, environment):
-        """
-        Initializes a SolarPanel package instance.
-
-        Args:
-            environment (Model): The simulation model/environment.
-        """
-        super().__init__(
-            name="Solar Panel",
-            environment=environment,
-            price_config_key='solar_panel_price',
-            price_increase_config_key='solarpanel_price_increase'
-        )
-
-    def step(self):
-        """
-        Updates the price per solar panel for the current step.
-
-        The price increases by 
-        a random amount defined in the configuration.
-        """
-        self.price += round(random.randint(*self.config['solarpanel_price_increase']))
+    name = "Solar Panel"
+    price_config_key = 'solar_panel_price'
+    price_increase_key = 'solarpanel_price_increase'
+    initial_chance_config_key = 'initial_solarpanel_chance'
 
     def calculate_behavioral_influence(self, income, household):
         """
@@ -58,7 +39,7 @@ class SolarPanel(SustainabilityPackage):
         difference = income - total_panel_cost
         normalized_diff = (difference - min_diff) / (max_diff - min_diff)
 
-        roi = self.calc_roi(household)
+        roi = self.get_roi(household)
         # Influence from ROI: higher ROI (longer payback) reduces positive influence.
         # Maps ROI [0, 10] to an influence contribution [0.25, 0].
         # If ROI is 0, contribution is 0.25. If ROI is 10, contribution is 0.
@@ -90,9 +71,69 @@ class SolarPanel(SustainabilityPackage):
             return float("inf")
         return cost / savings
     
+    def calculate_behavioral_influence_batch(self, incomes, households, household_index):
+        """
+        Array version of `calculate_behavioral_influence` for many residents at once.
+
+        Args:
+            incomes (np.ndarray): Income per resident.
+            households (HouseholdArrays): Column view of all households.
+            household_index (np.ndarray): For each resident, the position of its household.
+
+        Returns:
+            np.ndarray: The behavioral influence per resident, clipped between 0 and 1.
+        """
+        max_diff = self.price / 3
+        min_diff = -(self.price / 3)
+
+        total_panel_cost = self.price * households.solarpanel_amount[household_index]
+        difference = incomes - total_panel_cost
+        normalized_diff = (difference - min_diff) / (max_diff - min_diff)
+
+        roi = self.calc_roi_batch(households)[household_index]
+        influence_roi = np.maximum(0, 0.25 - 0.025 * roi)
+
+        return np.clip(normalized_diff + influence_roi, 0, 1)
+
+    def calc_roi_batch(self, households):
+        """
+        Array version of `calc_roi` for all households.
+
+        Args:
+            households (HouseholdArrays): Column view of all households.
+
+        Returns:
+            np.ndarray: The ROI time in years per household, inf where savings are not positive.
+        """
+        annual_energy_generation_total = households.energy_generation * households.solarpanel_amount
+        savings = annual_energy_generation_total * self.environment.energy_price
+        cost = self.price * households.solarpanel_amount
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(savings > 0, cost / savings, float("inf"))
+
+    def calc_energy_generation(self, household):
+        """
+        Returns the annual generation of all panels of a household (kWh).
+        """
+        return household.energy_generation * household.solarpanel_amount
+
+    def calc_energy_generation_batch(self, households):
+        """
+        Array version of `calc_energy_generation` for all households.
+        """
+        return households.energy_generation * households.solarpanel_amount
+
     def calc_co2_savings(self, household):
         """
         Calculates annual CO2 savings by displacing grid electricity.
         """
         annual_energy_generation = household.energy_generation * household.solarpanel_amount
         return annual_energy_generation * self.config['CO2_electricity']
+
+    def calc_co2_savings_batch(self, households):
+        """
+        Array version of `calc_co2_savings` for all households.
+        """
+        annual_energy_generation = households.energy_generation * households.solarpanel_amount
+        return annual_energy_generation * self.config['CO2_electricity']
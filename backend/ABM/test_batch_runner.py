@@ -0,0 +1,35 @@
+import pytest
+from batch_runner import run_batch, run_replication, expand_param_grid, summarize_replications
+
+
+def final_summaries(updates):
+    summaries = {}
+    for update in updates:
+        summaries[tuple(sorted(update["params"].items()))] = update
+    return summaries
+
+
+def test_batch_is_reproducible_regardless_of_worker_count(small_config):
+    grid = {"energy_price": [0.25, 0.4]}
+    single = final_summaries(run_batch([1, 2, 3], grid, simulation_years=5, max_workers=1))
+    parallel = final_summaries(run_batch([1, 2, 3], grid, simulation_years=5, max_workers=3))
+
+    assert single.keys() == parallel.keys()
+    for key in single:
+        assert single[key]["seeds"] == [1, 2, 3]
+        assert single[key]["summary"] == parallel[key]["summary"]
+
+
+def test_replication_restores_config(small_config):
+    seed, params, yearly_stats = run_replication(4, {"energy_price": 0.5}, simulation_years=3)
+    assert small_config["energy_price"] == 0.32
+    assert len(yearly_stats) == 3
+
+    summary = summarize_replications({seed: yearly_stats})
+    ci = summary[-1]["total_co2_saved_yearly"]
+    assert ci["ci_low"] == ci["mean"] == ci["ci_high"] == yearly_stats[-1]["total_co2_saved_yearly"]
+
+
+def test_unknown_grid_key_is_rejected(small_config):
+    with pytest.raises(KeyError):
+        expand_param_grid({"does_not_exist": [1, 2]})
@@ -0,0 +1,44 @@
+import pytest
+import config
+import benchmark
+
+
+def test_run_case_reports_years_memory_and_restores_config():
+    conf = config.configs[config.CHOSEN_CONFIG]
+    original = dict(conf)
+    case = benchmark.benchmark_cases([30], ["Direct"], [True], [["Solar Panel", "Heat Pump", "Insulation"]])[0]
+
+    result = benchmark.run_case(case, simulation_years=2, seed=1)
+
+    assert conf == original
+    assert [year["year"] for year in result["years"]] == [1, 2]
+    assert all(year["seconds"] >= year["phases"]["step"] > 0 for year in result["years"])
+    assert result["years"][0]["phases"]["export"] > 0
+    assert result["agent_years_per_second"] > 0
+    assert result["peak_memory_mb"] is None or result["peak_memory_mb"] >= result["baseline_memory_mb"]
+
+
+def make_report(seconds_per_year, peak_memory_mb=100.0):
+    cases = [
+        {"nr_households": size, "subj_norm_level": "Street", "collect_data": False, "packages": ["Solar Panel"],
+         "seconds_per_year": seconds, "peak_memory_mb": peak_memory_mb}
+        for size, seconds in seconds_per_year.items()
+    ]
+    return {"version": benchmark.REPORT_VERSION, "cases": cases, "scaling": benchmark.scaling_exponents(cases)}
+
+
+def test_scaling_exponent_and_comparison():
+    baseline = make_report({1000: 1.0, 10000: 100.0})
+    current = make_report({1000: 0.5, 10000: 5.0}, peak_memory_mb=105.0)
+    group = "households=* norm=Street collect_data=False packages=Solar Panel"
+
+    assert baseline["scaling"][group] == pytest.approx(2.0)
+    comparison = benchmark.compare_reports(baseline, current)
+
+    assert comparison["scaling"][group] == {"baseline": pytest.approx(2.0), "current": pytest.approx(1.0)}
+    key = benchmark.case_key(current["cases"][1])
+    assert comparison["cases"][key]["speedup"] == pytest.approx(20.0)
+    assert comparison["regressions"] == []
+    assert benchmark.compare_reports(current, baseline)["regressions"] == [
+        benchmark.case_key(case) for case in baseline["cases"]
+    ]
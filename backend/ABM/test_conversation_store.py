@@ -0,0 +1,67 @@
+import threading
+from types import SimpleNamespace
+from AgentLLMHandler import AgentLLMHandler
+from conversation_store import ConversationStore, conversations_file_name
+from data_export import write_manifest
+from llm_interviews import BatchInterviewer
+
+
+class EchoClient:
+    def chat(self, model, messages):
+        return SimpleNamespace(message=SimpleNamespace(content=f"echo {messages[-1]['content']}"))
+
+
+def make_handler(tmp_path):
+    handler = AgentLLMHandler("test-model", {"data_save_folder": str(tmp_path)})
+    handler._interviewer = BatchInterviewer("test-model", client=EchoClient())
+    return handler
+
+
+def test_concurrent_appends_keep_every_turn(tmp_path):
+    store = ConversationStore(tmp_path / "conversations.sqlite")
+
+    def chat(resident_id):
+        for turn in range(20):
+            store.append(resident_id, [{"role": "user", "content": f"q{turn}"}, {"role": "assistant", "content": f"a{turn}"}])
+
+    threads = [threading.Thread(target=chat, args=(resident_id % 3,)) for resident_id in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.resident_ids() == [0, 1, 2]
+    for resident_id in range(3):
+        conversation = store.get(resident_id)
+        assert len(conversation) == 80
+        # Turns are never interleaved: every question is directly followed by its answer
+        for question, answer in zip(conversation[::2], conversation[1::2]):
+            assert answer["content"] == "a" + question["content"][1:]
+
+
+def test_start_only_opens_a_conversation_once(tmp_path):
+    store = ConversationStore(tmp_path / "conversations.sqlite")
+    assert store.start(5, [{"role": "system", "content": "first"}]) == [{"role": "system", "content": "first"}]
+    assert store.start(5, [{"role": "system", "content": "second"}]) == [{"role": "system", "content": "first"}]
+
+
+def test_chat_appends_turns_to_the_store(tmp_path):
+    handler = make_handler(tmp_path)
+
+    assert handler.chat(7, "Hallo") == "echo Hallo"
+    handler.chat(7, "Waarom?")
+
+    conversation = ConversationStore(conversations_file_name(handler.file_name)).get(7)
+    assert [message["role"] for message in conversation] == ["system", "user", "assistant", "user", "assistant"]
+    assert conversation[-1]["content"] == "echo Waarom?"
+    assert not handler.file_name.exists()
+
+
+def test_legacy_conversations_are_imported(tmp_path):
+    handler = make_handler(tmp_path)
+    legacy = [{"role": "system", "content": "old"}, {"role": "user", "content": "Hallo"}]
+    write_manifest(handler.file_name, {"conversation_history": {"residents": {"3": legacy}}})
+
+    handler.set_current_agent_id(3)
+    handler.get_agent_conversation()
+    assert handler.current_agent_conversation == legacy
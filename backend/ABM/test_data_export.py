@@ -0,0 +1,178 @@
+import json
+import random
+import numpy as np
+import pytest
+import config
+from environment import Environment
+from data_export import (JsonLinesExporter, ColumnarExporter, create_exporter, load_manifest, read_year_records,
+                         find_resident_record, write_manifest, load_year_columns, load_resident_columns,
+                         load_resident_history)
+from AgentLLMHandler import AgentLLMHandler
+
+
+pytestmark = pytest.mark.config(nr_households=40, nr_residents=90)
+
+
+@pytest.fixture
+def model(small_config):
+    random.seed(11)
+    np.random.seed(11)
+    return Environment(40, 90)
+
+
+def run_with_export(model, file_name, years, data_format="jsonl"):
+    exporter = create_exporter(str(file_name), data_format)
+    exporter.setup(model)
+    snapshots = {}
+    for year in range(1, years + 1):
+        model.step()
+        model.sync_agents()
+        snapshots[year] = [json.loads(json.dumps(res.collect_resident_data())) for res in model.residents]
+        exporter.export_year(model, year)
+    return exporter, snapshots
+
+
+def test_years_are_appended_and_readable(model, tmp_path):
+    file_name = tmp_path / "simulation_data_001.json"
+    _, snapshots = run_with_export(model, file_name, 3)
+
+    manifest = load_manifest(file_name)
+    assert sorted(manifest["years"]) == ["year 1", "year 2", "year 3"]
+    assert manifest["metadata"]["nr_residents"] == model.config["nr_residents"]
+    for year, expected in snapshots.items():
+        records = list(read_year_records(file_name, manifest, year))
+        assert [{k: v for k, v in record.items() if k != "year"} for record in records] == expected
+        assert all(record["year"] == year for record in records)
+
+    resident = model.residents[17]
+    record = find_resident_record(file_name, manifest, 2, resident.unique_id)
+    assert record["id"] == resident.unique_id
+    assert record["income"] == snapshots[2][17]["income"]
+
+
+def test_find_resident_record_does_not_depend_on_the_record_layout(tmp_path):
+    file_name = tmp_path / "simulation_data_001.json"
+    records = [{"year": 1, "income": 3, "id": 13}, {"household_id": 13, "id": 3, "income": 1300}]
+    chunk = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode()
+    (tmp_path / "simulation_data_001.jsonl").write_bytes(chunk)
+    manifest = {"format": "jsonl", "years": {"year 1": {"offset": 0, "length": len(chunk)}}}
+
+    assert find_resident_record(file_name, manifest, 1, 3) == records[1]
+    assert find_resident_record(file_name, manifest, 1, "13") == records[0]
+    assert find_resident_record(file_name, manifest, 1, 1) is None
+
+
+def test_export_keeps_sections_written_in_between(model, tmp_path):
+    file_name = tmp_path / "simulation_data_001.json"
+    exporter = JsonLinesExporter(str(file_name))
+    exporter.setup(model)
+
+    manifest = load_manifest(file_name)
+    # Conversations live in the conversation store, not in new manifests
+    assert "conversation_history" not in manifest
+    manifest["notes"] = {"0": "Hallo"}
+    write_manifest(file_name, manifest)
+
+    model.step()
+    exporter.export_year(model, 1)
+    assert load_manifest(file_name)["notes"] == {"0": "Hallo"}
+
+
+def test_llm_handler_reads_streamed_history(model, tmp_path):
+    file_name = tmp_path / "simulation_data_001.json"
+    run_with_export(model, file_name, 7)
+
+    handler = AgentLLMHandler("test-model", {"data_save_folder": str(tmp_path)})
+    handler.file_name = file_name
+    handler.set_current_agent_id(model.residents[3].unique_id)
+
+    history = handler._get_resident_history(max_years=5)
+    assert [year for year, *_ in history] == [3, 4, 5, 6, 7]
+    assert "(Year 7)" in handler._get_system_prompt_second_version()["content"]
+
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_columnar_export_matches_resident_data(monkeypatch, tmp_path, engine):
+    conf = config.configs[config.CHOSEN_CONFIG]
+    monkeypatch.setitem(conf, "nr_households", 40)
+    monkeypatch.setitem(conf, "engine", engine)
+    random.seed(11)
+    np.random.seed(11)
+    model = Environment(40, 90)
+
+    file_name = tmp_path / "simulation_data_001.json"
+    exporter, snapshots = run_with_export(model, file_name, 4, data_format="npy")
+    assert isinstance(exporter, ColumnarExporter)
+
+    columns = load_year_columns(file_name, 4)
+    assert isinstance(columns["income"], np.memmap)
+    assert columns["income"].dtype == np.float64
+    assert columns["decision_heat_pump"].dtype == bool
+    assert columns["id"].tolist() == [record["id"] for record in snapshots[4]]
+    assert columns["income"].tolist() == [record["income"] for record in snapshots[4]]
+    assert columns["behavioral_control_solar_panel"].tolist() == [
+        record["behavioral_control"]["Solar Panel"] for record in snapshots[4]
+    ]
+
+    resident_id = snapshots[1][5]["id"]
+    history = load_resident_columns(file_name, resident_id)
+    assert history["year"].tolist() == [1, 2, 3, 4]
+    assert history["income"].tolist() == [snapshots[year][5]["income"] for year in range(1, 5)]
+
+    record = find_resident_record(file_name, load_manifest(file_name), 3, resident_id)
+    assert record["subj_norm"] == snapshots[3][5]["subj_norm"]
+
+
+def test_columnar_records_round_trip_to_resident_data(model, tmp_path):
+    file_name = tmp_path / "simulation_data_001.json"
+    _, snapshots = run_with_export(model, file_name, 5, data_format="npy")
+    manifest = load_manifest(file_name)
+
+    for year in (1, 5):
+        for expected in snapshots[year][::10]:
+            record = find_resident_record(file_name, manifest, year, expected["id"])
+            assert record.keys() == expected.keys()
+            assert record == expected
+
+
+@pytest.mark.parametrize("data_format", ["jsonl", "npy"])
+def test_package_adopters_round_trip(model, tmp_path, data_format):
+    file_name = tmp_path / "simulation_data_001.json"
+    run_with_export(model, file_name, 2, data_format=data_format)
+    manifest = load_manifest(file_name)
+
+    solar_adopter = next(res for res in model.residents
+                         if res.package_decisions["Solar Panel"] and not res.package_decisions["Heat Pump"])
+    heat_pump_adopter = next(res for res in model.residents if res.package_decisions["Heat Pump"])
+    for resident in (solar_adopter, heat_pump_adopter):
+        record = find_resident_record(file_name, manifest, 2, resident.unique_id)
+        assert record["solar_panels"] is resident.package_decisions["Solar Panel"]
+        assert record["heat_pump"] is resident.package_decisions["Heat Pump"]
+    assert find_resident_record(file_name, manifest, 2, solar_adopter.unique_id)["solar_panels"] is True
+
+
+def test_unknown_data_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        create_exporter(str(tmp_path / "simulation_data_001.json"), "xml")
+
+
+@pytest.mark.parametrize("data_format", ["jsonl", "npy"])
+def test_history_index_matches_exported_records_and_grows(monkeypatch, model, tmp_path, data_format):
+    monkeypatch.setitem(model.config, "simulation_years", 3)
+    file_name = tmp_path / "simulation_data_001.json"
+    exporter, snapshots = run_with_export(model, file_name, 5, data_format=data_format)
+    assert exporter.history.capacity == 6
+
+    manifest = load_manifest(file_name)
+    resident = model.residents[17]
+    history = load_resident_history(file_name, manifest, resident.unique_id, max_years=4)
+    assert history["year"].tolist() == [2, 3, 4, 5]
+
+    for i, year in enumerate(history["year"].tolist()):
+        record = next(r for r in snapshots[year] if r["id"] == resident.unique_id)
+        assert history["attitude"][i] == record["attitude"]
+        assert {name: values[i] for name, values in history["subj_norm"].items()} == record["subj_norm"]
+        assert {name: values[i] for name, values in history["behavioral_control"].items()} == record["behavioral_control"]
+
+    assert len(load_resident_history(file_name, manifest, resident.unique_id)["year"]) == 5
+    assert load_resident_history(file_name, manifest, -1) is None
@@ -0,0 +1,294 @@
+import json
+import random
+import numpy as np
+import pytest
+import app
+from environment import Environment
+from vectorized_engine import HouseholdArrays
+
+
+pytestmark = pytest.mark.config(nr_households=120, nr_residents=250)
+
+
+def make_environment(seed=3):
+    random.seed(seed)
+    np.random.seed(seed)
+    return Environment(120, 250)
+
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_installation_counters_match_households(monkeypatch, small_config, engine):
+    monkeypatch.setitem(small_config, "engine", engine)
+    model = make_environment()
+    for _ in range(10):
+        model.step()
+    model.sync_agents()
+
+    for package in model.sustainability_packages:
+        street_counts = [
+            sum(1 for hh in street if hh.package_installations[package.name]) for street in model.streets
+        ]
+        assert model.street_installed_counts[package.name] == street_counts
+        assert model.district_installed_counts[package.name] == sum(
+            1 for hh in model.households if hh.package_installations[package.name]
+        )
+
+
+def test_street_norm_is_rewritten_after_norm_level_change(monkeypatch, small_config):
+    monkeypatch.setitem(small_config, "subj_norm_level", "Direct")
+    model = make_environment()
+    model.step()
+
+    monkeypatch.setitem(small_config, "subj_norm_level", "Street")
+    model.update_subjective_norm()
+
+    for street_index, street in enumerate(model.streets):
+        for package in model.sustainability_packages:
+            installed = model.street_installed_counts[package.name][street_index]
+            expected = min(installed / max(len(street) - 1, 1), 1.0)
+            for hh in street:
+                for res in hh.residents:
+                    assert res.package_subjective_norms[package.name] == expected
+
+
+def test_statistics_match_full_scans_and_are_cached_per_step(small_config):
+    model = make_environment()
+    model.step()
+
+    stats = model.statistics.current()
+    assert model.statistics.current() is stats
+    for package in model.sustainability_packages:
+        assert stats["residents_positive_decision"][package.name] == sum(
+            1 for res in model.residents if res.package_decisions[package.name]
+        )
+        assert stats["households_with_package"][package.name] == sum(
+            1 for hh in model.households if hh.package_installations[package.name]
+        )
+    assert stats["total_co2_saved_yearly"] == sum(hh.co2_saved_yearly for hh in model.households)
+    assert stats["average_income"] == np.mean([res.income for res in model.residents])
+
+    model.step()
+    assert model.statistics.current() is not stats
+
+
+def test_roi_is_memoized_per_household_and_invalidated(monkeypatch, small_config):
+    model = make_environment()
+    household = next(hh for hh in model.households if not hh.package_installations["Solar Panel"])
+    calls = []
+    original_calc_roi = model.heat_pump.calc_roi
+
+    def counting_calc_roi(hh):
+        calls.append(hh)
+        return original_calc_roi(hh)
+
+    monkeypatch.setattr(model.heat_pump, "calc_roi", counting_calc_roi)
+    household.roi_cache.clear()
+
+    roi = model.heat_pump.get_roi(household)
+    assert model.heat_pump.get_roi(household) == roi
+    assert len(calls) == 1
+
+    model.heat_pump.price += 100
+    assert model.heat_pump.get_roi(household) == original_calc_roi(household)
+    assert len(calls) == 2
+
+    # Installing solar panels changes the heat pump savings
+    household.package_installations["Solar Panel"] = True
+    model.register_installation(household, model.solar_panel)
+    assert model.heat_pump.get_roi(household) == original_calc_roi(household)
+    assert len(calls) == 3
+
+
+def test_package_fallbacks_match_kernels(monkeypatch, small_config):
+    monkeypatch.setitem(small_config, "sustainability_packages", ["Solar Panel", "Insulation"])
+    model = make_environment()
+    insulation = model.packages_by_name["Insulation"]
+    assert model.heat_pump is None
+
+    arrays = HouseholdArrays(model.households, model.sustainability_packages)
+    rois = insulation.calc_roi_batch(arrays)
+    savings = insulation.calc_co2_savings_batch(arrays)
+    for h, household in enumerate(model.households[:10]):
+        assert insulation.calc_roi(household) == rois[h]
+        assert insulation.calc_co2_savings(household) == savings[h]
+        assert model.solar_panel.calc_energy_generation(household) == \
+            model.solar_panel.calc_energy_generation_batch(arrays)[h]
+
+
+def test_unknown_package_is_rejected(monkeypatch, small_config):
+    monkeypatch.setitem(small_config, "sustainability_packages", ["Solar Panel", "Wind Turbine"])
+    with pytest.raises(ValueError):
+        make_environment()
+
+
+def test_bulk_agent_init_matches_sequential_formulas(monkeypatch, small_config):
+    monkeypatch.setitem(small_config, "agent_init", "bulk")
+    model = make_environment()
+    again = make_environment()
+
+    assert len(model.households) == 120 and len(model.residents) == 250
+    assert [res.income for res in model.residents] == [res.income for res in again.residents]
+    assert model.current_co2 == pytest.approx(model.total_co2 - sum(hh.co2_saved_yearly for hh in model.households))
+    for hh in model.households:
+        low, high = small_config["yearly_gas_usage"]
+        assert low <= hh.gas_usage <= high
+        for res in hh.residents:
+            for package in model.sustainability_packages:
+                assert res.package_decisions[package.name] == hh.package_installations[package.name]
+                assert res.behavioral_control[package.name] == package.calculate_behavioral_influence(res.income, hh)
+
+
+def test_bulk_agent_init_runs_identically_in_both_engines(monkeypatch, small_config):
+    monkeypatch.setitem(small_config, "agent_init", "bulk")
+    stats = []
+    for engine in ("object", "vectorized"):
+        monkeypatch.setitem(small_config, "engine", engine)
+        model = make_environment()
+        for year in range(8):
+            data = model.collect_start_of_year_data(year + 1)
+            model.step()
+            model.collect_end_of_year_data(data)
+        stats.append(model.yearly_stats)
+    assert stats[0] == stats[1]
+
+
+def test_compact_agent_state_behaves_like_dicts(small_config):
+    model = make_environment()
+    resident = model.residents[0]
+    household = resident.household
+    names = [package.name for package in model.sustainability_packages]
+
+    assert list(resident.package_decisions) == names
+    assert resident.package_decisions == {name: household.package_installations[name] for name in names}
+    assert resident.package_decisions.get("Wind Turbine", "missing") == "missing"
+    with pytest.raises(KeyError):
+        resident.subj_norm["Wind Turbine"] = 1.0
+
+    # The views read and write one slotted list per agent, in blocks of one value per package
+    n = len(names)
+    state = resident._package_state
+    assert len(state) == 4 * n
+    assert state[3 * n:] == [resident.package_decisions[name] for name in names]
+    assert household._package_state[:n] == [household.package_installations[name] for name in names]
+    assert len(household._package_state) == 3 * n
+
+    resident.package_subjective_norms["Heat Pump"] = 0.75
+    assert state[2 * n + names.index("Heat Pump")] == 0.75
+    resident.calc_subjective_norm()
+    if not resident.package_decisions["Heat Pump"]:
+        assert resident.subj_norm["Heat Pump"] == 0.75
+        assert state[names.index("Heat Pump")] == 0.75
+
+    resident.behavioral_control = {"Solar Panel": 0.1, "Heat Pump": 0.2}
+    assert dict(resident.behavioral_control) == {"Solar Panel": 0.1, "Heat Pump": 0.2}
+    assert resident._package_state[n:2 * n] == [0.1, 0.2]
+    assert json.loads(json.dumps(resident.collect_resident_data()))["behavioral_control"] == {
+        "Solar Panel": 0.1, "Heat Pump": 0.2
+    }
+
+
+def test_active_set_matches_stepping_every_agent(small_config):
+    active = make_environment(seed=8)
+    sizes = []
+    for _ in range(12):
+        sizes.append(active.active_set.size())
+        active.step()
+
+    every_agent = make_environment(seed=8)
+    for _ in range(12):
+        for hh in every_agent.households:
+            hh.step()
+        every_agent.update_subjective_norm()
+        for package in every_agent.sustainability_packages:
+            package.step()
+
+    assert sizes == sorted(sizes, reverse=True) and sizes[-1] < sizes[0]
+    assert active.current_co2 == every_agent.current_co2
+    for hh_active, hh_every in zip(active.households, every_agent.households):
+        assert hh_active.co2_saved_yearly == hh_every.co2_saved_yearly
+        assert dict(hh_active.package_installations) == dict(hh_every.package_installations)
+        for res_active, res_every in zip(hh_active.residents, hh_every.residents):
+            assert res_active.income == res_every.income
+            assert res_active.get_package_state() == res_every.get_package_state()
+
+    # Residents and households that are done with a package are no longer scheduled
+    for p in range(len(active.sustainability_packages)):
+        assert list(active.active_set.undecided_residents[p]) == [
+            i for i, res in enumerate(active.residents) if not res.has_decided(p)
+        ]
+        assert all(not active.households[h].is_installed(p) for h in active.active_set.open_households[p])
+
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_pruned_never_adopters_do_not_change_adoption(monkeypatch, small_config, engine):
+    monkeypatch.setitem(small_config, "engine", engine)
+    def run(model):
+        for year in range(12):
+            data = model.collect_start_of_year_data(year + 1)
+            model.step()
+            model.collect_end_of_year_data(data)
+        return model
+
+    unpruned = run(make_environment(seed=6))
+    monkeypatch.setitem(small_config, "prune_never_adopters", True)
+    pruned = make_environment(seed=6)
+
+    # Brute force: the best possible score of every undecided resident
+    for p, package in enumerate(pruned.sustainability_packages):
+        expected = sum(
+            1 for res in pruned.residents if not res.has_decided(p) and
+            (res.attitude * res.attitude_mod + max(1.0, small_config['subjective_norm']) * package.subj_norm_mod *
+             res.subj_norm_mod + 1.0 * res.behavioral_mod) / 6 <= res.decision_threshold
+        )
+        assert pruned.pruned_never_adopters[package.name] == expected > 0
+    assert pruned.collect_metadata()["pruned_never_adopters"] == pruned.pruned_never_adopters
+    run(pruned)
+
+    assert pruned.current_co2 == unpruned.current_co2
+    for data_pruned, data_unpruned in zip(pruned.yearly_stats, unpruned.yearly_stats):
+        assert data_pruned["end_state_per_package"] == data_unpruned["end_state_per_package"]
+    if engine == "object":
+        assert pruned.active_set.size() < unpruned.active_set.size()
+
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_parameter_update_reprunes_never_adopters(monkeypatch, small_config, engine):
+    monkeypatch.setitem(small_config, "engine", engine)
+    monkeypatch.setitem(small_config, "prune_never_adopters", True)
+    model = make_environment(seed=6)
+    for _ in range(3):
+        model.step()
+    pruned_before = dict(model.pruned_never_adopters)
+    previous = (model.engine.pruned if model.engine is not None else model.active_set.pruned).copy()
+    client = app.app.test_client()
+
+    base_norm = small_config["subjective_norm"]
+    response = client.post("/update_parameter", json={"parameter": "subjective_norm", "value": base_norm + 3.0})
+    assert response.status_code == 200
+    assert model.pruning_inputs() != model.applied_pruning_inputs
+    model.prune_never_adopters()
+    assert sum(model.pruned_never_adopters.values()) < sum(pruned_before.values())
+
+    # Residents that are no longer pruned decide with refreshed factors
+    model.sync_agents()
+    current = model.engine.pruned if model.engine is not None else model.active_set.pruned
+    unpruned = np.argwhere(previous & ~current)
+    assert len(unpruned) > 0
+    for i, p in unpruned:
+        res, package = model.residents[i], model.sustainability_packages[p]
+        if res.has_decided(p):
+            continue
+        assert res.subj_norm[package.name] == res.package_subjective_norms[package.name]
+        assert res.behavioral_control[package.name] == package.calculate_behavioral_influence(res.income, res.household)
+
+    # Changing it back prunes them again at the next step
+    client.post("/update_parameter", json={"parameter": "subjective_norm", "value": base_norm})
+    model.step()
+    assert model.pruning_inputs() == model.applied_pruning_inputs
+    assert sum(model.pruned_never_adopters.values()) > 0
+    decided = model.engine.decisions if model.engine is not None else None
+    for p, package in enumerate(model.sustainability_packages):
+        pairs = model.never_adopter_pairs()[:, p]
+        undecided = ~decided[:, p] if decided is not None else \
+            np.array([not res.has_decided(p) for res in model.residents])
+        assert model.pruned_never_adopters[package.name] == int(np.count_nonzero(pairs & undecided))
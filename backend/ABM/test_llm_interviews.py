@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from llm_interviews import BatchInterviewer, ResponseCache
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/chat like Ollama by echoing the question, failing on "fail"."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+
+        question = body["messages"][-1]["content"]
+        if question == "fail":
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b'{"error": "stub failure"}')
+            return
+
+        reply = {
+            "model": body["model"],
+            "created_at": "2025-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": f"{body['messages'][0]['content']} says: {question}"},
+            "done": True,
+        }
+        payload = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def conversations(question, count=12):
+    return {
+        resident_id: [{"role": "system", "content": f"Resident {resident_id}"}, {"role": "user", "content": question}]
+        for resident_id in range(count)
+    }
+
+
+def test_interviews_run_concurrently_and_are_cached(stub_server, tmp_path):
+    host = f"http://127.0.0.1:{stub_server.server_address[1]}"
+    interviewer = BatchInterviewer("stub-model", host=host, cache=ResponseCache(tmp_path), max_workers=4)
+
+    responses, errors = interviewer.interview(conversations("Why no heat pump?"))
+
+    assert errors == {}
+    assert responses[3] == "Resident 3 says: Why no heat pump?"
+    assert stub_server.requests == 12
+    assert 1 < stub_server.max_in_flight <= 4
+
+    # A new interviewer with the same cache folder does not send any request
+    again = BatchInterviewer("stub-model", host=host, cache=ResponseCache(tmp_path), max_workers=4)
+    assert again.interview(conversations("Why no heat pump?")) == (responses, {})
+    assert again.cache_hits == 12
+    assert stub_server.requests == 12
+
+    # Another model or question is a cache miss
+    BatchInterviewer("other-model", host=host, cache=ResponseCache(tmp_path)).interview(
+        conversations("Why no heat pump?", count=1))
+    assert stub_server.requests == 13
+
+
+def test_failed_requests_are_reported_per_resident(stub_server, tmp_path):
+    host = f"http://127.0.0.1:{stub_server.server_address[1]}"
+    interviewer = BatchInterviewer("stub-model", host=host, cache=ResponseCache(tmp_path))
+    batch = conversations("Why?", count=3)
+    batch[1][-1]["content"] = "fail"
+
+    responses, errors = interviewer.interview(batch)
+
+    assert sorted(responses) == [0, 2]
+    assert list(errors) == [1]
+    assert ResponseCache(tmp_path).get(ResponseCache.make_key("stub-model", batch[1])) is None
+
+
+def test_handler_interviews_residents_with_their_own_system_prompt(stub_server, tmp_path):
+    from AgentLLMHandler import AgentLLMHandler
+
+    handler = AgentLLMHandler("stub-model", {
+        "data_save_folder": str(tmp_path),
+        "llm_host": f"http://127.0.0.1:{stub_server.server_address[1]}",
+        "llm_cache_folder": str(tmp_path / "llm_cache"),
+    })
+
+    responses, errors = handler.interview_residents([4, 7], "Why no heat pump?")
+
+    assert errors == {}
+    assert sorted(responses) == [4, 7]
+    assert all(reply.endswith("says: Why no heat pump?") for reply in responses.values())
+    assert not handler.file_name.exists()
+    with pytest.raises(ValueError):
+        handler.interview_residents([4], " ")
@@ -0,0 +1,154 @@
+import os
+import numpy as np
+import pytest
+import data_export
+import main
+
+
+pytestmark = pytest.mark.config(nr_households=50, nr_residents=110)
+
+
+def test_headless_run_skips_sleep_and_printing(monkeypatch, capsys, small_config):
+    def no_sleep(seconds):
+        raise AssertionError("headless runs must not sleep")
+
+    monkeypatch.setattr(main.time, "sleep", no_sleep)
+    monkeypatch.setattr(main, "simulation_paused", True)
+
+    result = main.run_simulation(50, 110, 4, seed=5, headless=True)
+
+    assert len(main.graphics_data) == 4
+    assert len(main.households_data) == 50
+    assert result["agent_years"] == (50 + 110) * 4
+    assert result["agent_years_per_second"] > 0
+    assert "Environment State" not in capsys.readouterr().out
+
+
+def test_headless_run_matches_interactive_run(monkeypatch, small_config):
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+
+    main.run_simulation(50, 110, 4, seed=9, headless=False)
+    interactive = [dict(data) for data in main.graphics_data]
+    main.run_simulation(50, 110, 4, seed=9, headless=True)
+
+    assert main.graphics_data == interactive
+
+
+def make_household(household_id, street, installed, decision):
+    return {
+        "id": household_id,
+        "street": street,
+        "Solar Panel_installed": installed,
+        "residents": [{"name": "Resident 1", "income": 30000 + household_id, "Solar Panel_decision": decision}],
+    }
+
+
+def test_household_queries_filter_page_and_track_changes():
+    results = main.SimulationResults()
+    results.add_year({"year": 1})
+    results.set_households([make_household(i, i // 3, False, False) for i in range(6)])
+    results.add_year({"year": 2})
+    results.set_households([make_household(i, i // 3, i == 4, i == 1) for i in range(6)])
+    results.add_year({"year": 3})
+    # Only income changes, which does not count as a changed decision
+    households = [make_household(i, i // 3, i == 4, i == 1) for i in range(6)]
+    households[0]["residents"][0]["income"] += 500
+    results.set_households(households)
+
+    assert results.households_year == 3
+    assert [hh["id"] for hh in results.query_households(since_year=1)[0]] == [1, 4]
+    assert results.query_households(since_year=2) == ([], 0)
+
+    page, total = results.query_households(street=1, offset=1, limit=1, fields=["Solar Panel_installed"])
+    assert total == 3
+    assert page == [{"id": 4, "Solar Panel_installed": True}]
+    assert [hh["id"] for hh in results.query_households(id_from=2, id_to=3)[0]] == [2, 3]
+
+
+@pytest.mark.parametrize("random_streams", [False, True])
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_resumed_run_matches_uninterrupted_run(monkeypatch, tmp_path, small_config, engine, random_streams):
+    monkeypatch.setitem(small_config, "engine", engine)
+    monkeypatch.setitem(small_config, "random_streams", random_streams)
+    monkeypatch.setitem(small_config, "checkpoint_every", 3)
+    monkeypatch.setitem(small_config, "checkpoint_folder", str(tmp_path))
+
+    result = main.run_simulation(50, 110, 8, seed=21, headless=True)
+    uninterrupted = [dict(data) for data in main.graphics_data]
+    households = list(main.households_data)
+    assert result["checkpoint"].endswith("checkpoint_21_year_006.pkl.gz")
+
+    # Scramble the global generators: the checkpoint must restore them
+    main.random.seed(0)
+    main.np.random.seed(0)
+    resumed = main.run_simulation(headless=True, simulation_years=8,
+                                  resume_from=str(tmp_path / "checkpoint_21_year_003.pkl.gz"))
+
+    assert resumed["years_completed"] == 8
+    assert resumed["agent_years"] == (50 + 110) * 5
+    assert main.graphics_data == uninterrupted
+    assert main.households_data == households
+
+
+@pytest.mark.parametrize("data_format", ["jsonl", "npy"])
+def test_resumed_run_does_not_duplicate_exported_years(monkeypatch, tmp_path, small_config, data_format):
+    monkeypatch.setitem(small_config, "collect_data", True)
+    monkeypatch.setitem(small_config, "data_format", data_format)
+    monkeypatch.setitem(small_config, "data_save_folder", str(tmp_path / "data"))
+    monkeypatch.setitem(small_config, "checkpoint_every", 3)
+    monkeypatch.setitem(small_config, "checkpoint_folder", str(tmp_path / "checkpoints"))
+    manifest_file = tmp_path / "data" / "simulation_data_001.json"
+
+    main.run_simulation(50, 110, 8, seed=4, headless=True)
+    manifest = data_export.load_manifest(manifest_file)
+    records = open(data_export.records_file_name(manifest_file), "rb").read() if data_format == "jsonl" else None
+    history_years = np.load(os.path.join(data_export.history_dir_name(manifest_file), "years.npy"))
+
+    main.run_simulation(headless=True, simulation_years=8,
+                        resume_from=str(tmp_path / "checkpoints" / "checkpoint_4_year_003.pkl.gz"))
+
+    assert data_export.load_manifest(manifest_file)["years"] == manifest["years"]
+    assert list(manifest["years"]) == [f"year {year}" for year in range(1, 9)]
+    assert np.array_equal(np.load(os.path.join(data_export.history_dir_name(manifest_file), "years.npy")),
+                          history_years)
+    if data_format == "jsonl":
+        assert open(data_export.records_file_name(manifest_file), "rb").read() == records
+        assert len(records.splitlines()) == 110 * 8
+    else:
+        assert sorted(os.listdir(data_export.columns_dir_name(manifest_file))) == \
+            [f"year_{year:03d}" for year in range(1, 9)]
+
+
+@pytest.mark.parametrize("engine", ["object", "vectorized"])
+def test_run_records_phase_metrics(monkeypatch, tmp_path, small_config, engine):
+    monkeypatch.setitem(small_config, "engine", engine)
+    monkeypatch.setitem(small_config, "collect_data", True)
+    monkeypatch.setitem(small_config, "data_save_folder", str(tmp_path))
+
+    result = main.run_simulation(50, 110, 3, seed=3, headless=True)
+    metrics = main.default_results.metrics.to_dict()
+
+    step_phases = {"object": "step_households", "vectorized": "step_resident_decisions"}[engine]
+    for phase in ("collect_start", "step", "collect_end", "events", "export", step_phases):
+        assert metrics["phases"][phase]["count"] == 3
+    assert metrics["counters"]["agents_evaluated"] == (50 + 110) * 3
+    assert metrics["counters"]["bytes_written"] > 0
+    decisions = sum(sum(data["decisions_this_year_per_package_end"].values()) for data in main.graphics_data)
+    assert metrics["counters"]["decisions_flipped"] == decisions
+    assert [record["year"] for record in metrics["years"]] == [1, 2, 3]
+    assert os.path.exists(result["metrics_file"])
+
+
+def test_consecutive_runs_get_consecutive_numbers(monkeypatch, tmp_path, small_config):
+    monkeypatch.setitem(small_config, "collect_data", True)
+    monkeypatch.setitem(small_config, "data_save_folder", str(tmp_path))
+
+    first = main.run_simulation(50, 110, 1, seed=1, headless=True)
+    second = main.run_simulation(50, 110, 1, seed=2, headless=True)
+
+    assert os.path.basename(first["metrics_file"]) == "simulation_metrics_001.json"
+    assert os.path.basename(second["metrics_file"]) == "simulation_metrics_002.json"
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json")) == [
+        "simulation_data_001.json", "simulation_data_002.json",
+        "simulation_metrics_001.json", "simulation_metrics_002.json",
+    ]
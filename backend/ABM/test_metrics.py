@@ -0,0 +1,49 @@
+import fnmatch
+import os
+import pickle
+import pytest
+from metrics import SimulationMetrics, Histogram, metrics_file_name
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    data = histogram.to_dict()
+    assert data["buckets"] == {"0.1": 1, "1.0": 3, "+Inf": 4}
+    assert data["count"] == 4
+    assert data["sum"] == pytest.approx(4.25)
+
+
+def test_metrics_keep_per_year_records_and_render_prometheus():
+    metrics = SimulationMetrics(buckets=(0.5,))
+    metrics.observe("step", 0.2)
+    metrics.count("agents_evaluated", 10)
+    metrics.end_year(1)
+    metrics.observe("step", 0.7)
+    metrics.count("agents_evaluated", 10)
+    metrics.end_year(2)
+
+    data = metrics.to_dict()
+    assert data["counters"] == {"agents_evaluated": 20}
+    assert [record["phases"]["step"] for record in data["years"]] == [0.2, 0.7]
+    assert data["years"][1]["counters"] == {"agents_evaluated": 10}
+
+    text = metrics.to_prometheus({"job_id": "abc"})
+    assert 'abm_phase_seconds_bucket{phase="step",le="0.5",job_id="abc"} 1' in text
+    assert 'abm_phase_seconds_bucket{phase="step",le="+Inf",job_id="abc"} 2' in text
+    assert 'abm_work_total{counter="agents_evaluated",job_id="abc"} 20' in text
+    assert 'abm_years_completed{job_id="abc"} 2' in text
+    assert "abm_years_completed 2" in metrics.to_prometheus()
+
+    # The lock is not pickled, so models with metrics can be checkpointed
+    restored = pickle.loads(pickle.dumps(metrics))
+    restored.count("agents_evaluated", 1)
+    assert restored.counters == {"agents_evaluated": 21}
+
+
+def test_metrics_file_name_sits_next_to_the_manifest():
+    assert metrics_file_name("data/simulation_data_007.json") == os.path.join("data", "simulation_metrics_007.json")
+    assert not fnmatch.fnmatch(os.path.basename(metrics_file_name("data/simulation_data_007.json")),
+                               "simulation_data_*.json")
@@ -1,78 +1,72 @@
+import random
+import numpy as np
 import pytest
-from backend.ABM.agents.resident_agent import Resident
-from backend.ABM.agents.household_agent import Household
-from backend.ABM.environment import Environment
+from agents.resident_agent import Resident
+from agents.household_agent import Household
+from environment import Environment
 
-def test_resident_initialization():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
-    assert resident.id == 1
+
+pytestmark = pytest.mark.config(nr_households=10, nr_residents=20)
+
+
+@pytest.fixture
+def env(small_config):
+    random.seed(1)
+    np.random.seed(1)
+    return Environment(nr_households=10, nr_residents=20)
+
+
+def test_resident_initialization(env):
+    household = env.households[0]
+    resident = Resident(1000, env, household)
+    assert resident.unique_id == 1000
+    assert resident.household is household
     assert 0 <= resident.income  # Income should be non-negative
-    assert resident.attitude == 0.2
-    assert resident.attitude_mod == 1.0
-    assert resident.subj_norm_mod == 1.1
-    assert resident.behavioral_mod == 0.9
-    assert not resident.solar_panels
-    print("test_resident_initialization passed!")
-
-def test_resident_behavioral_influence():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
-    influence = resident.calculate_behavioral_influence(3000)
-    assert -0.3 <= influence <= 0.3  # Influence should be within bounds
-    print("test_resident_behavioral_influence passed!")
-
-def test_resident_calc_decision():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
-    decision = resident.calc_decision(0.1, (0.1, 3000))
-    assert isinstance(decision, bool) or decision is None  # Should return True or None
-    print("test_resident_calc_decision passed!")
-
-def test_resident_income_update():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
+    assert 0 <= resident.attitude <= 1
+    assert not any(resident.package_decisions.values())
+
+
+def test_resident_behavioral_influence(env):
+    resident = env.residents[0]
+    for package in env.sustainability_packages:
+        influence = package.calculate_behavioral_influence(resident.income, resident.household)
+        assert 0 <= influence <= 1
+
+
+def test_resident_calc_decision(env):
+    resident = env.residents[0]
+    resident.calc_decision()
+    assert all(isinstance(decision, bool) for decision in resident.package_decisions.values())
+
+
+def test_resident_income_update(env):
+    resident = env.residents[0]
     initial_income = resident.income
-    resident.calc_decision(0.1, (0.1, 3000))
+    env.step()
     assert resident.income >= initial_income  # Income should not decrease
-    print("test_resident_income_update passed!")
-
-def test_resident_no_solar_panels_by_default():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
-    assert not resident.solar_panels  # Should be False initially
-    print("test_resident_no_solar_panels_by_default passed!")
-
-def test_household_initialization():
-    household = Household(False, 1)
-    assert household.id == 1
-    assert not household.solar_panels
-    print("test_household_initialization passed!")
-
-def test_environment_initialization():
-    env = Environment()
-    assert 2600 <= env.solarpanel_price <= 3900  # Price should be within range
-    assert env.environmental_inf == 0.0
-    print("test_environment_initialization passed!")
-
-def test_environment_change_influence():
-    households = [Household(True, i) for i in range(10)]
-    env = Environment()
-    initial_influence = env.environmental_inf
-    env.change_influence(households)
-    assert 0.0 <= env.environmental_inf <= 0.5
-    assert env.environmental_inf >= initial_influence  # Influence should increase
-    print("test_environment_change_influence passed!")
-
-def test_environment_behavioral_influence_increase():
-    env = Environment()
-    initial_behavioral_inf = env.behavioral_inf
-    env.change_influence([Household(True, i) for i in range(5)])
-    assert env.behavioral_inf > initial_behavioral_inf  # Should increase
-    print("test_environment_behavioral_influence_increase passed!")
-
-def test_resident_decision_threshold():
-    resident = Resident(1, 0.2, 1.0, 1.1, 0.9)
-    decision = resident.calc_decision(10, (0.1, 3000))
-    assert decision is None  # Should not install solar panels if threshold is too high
-    print("test_resident_decision_threshold passed!")
 
 
+def test_resident_decision_threshold(env, monkeypatch):
+    resident = env.residents[0]
+    monkeypatch.setattr(resident, "decision_threshold", 10)
+    resident.calc_decision()
+    assert not any(resident.package_decisions.values())  # Nothing is installed if the threshold is too high
+
+
+def test_household_initialization(env):
+    household = Household(1000, env)
+    assert household.unique_id == 1000
+    assert household.residents == []
+    assert not any(household.package_installations.values())
+
+
+def test_environment_initialization(env):
+    assert len(env.households) == 10
+    assert len(env.residents) == 20
+    assert sum(len(household.residents) for household in env.households) == 20
+    for package in env.sustainability_packages:
+        assert package.price > 0
+
 
 if __name__ == "__main__":
-    pytest.main()
\ No newline at end of file
+    pytest.main()
@@ -0,0 +1,68 @@
+import random
+import numpy as np
+import pytest
+import config
+from environment import Environment
+from neighbourhood_graph import NeighbourhoodGraph, geo_graph, grid_graph, load_coordinates, small_world_graph
+
+
+def test_from_edges_builds_symmetric_csr_without_duplicates():
+    graph = NeighbourhoodGraph.from_edges(4, [0, 0, 1, 2, 2], [1, 1, 2, 2, 3], weights=[1.0, 5.0, 2.0, 9.0, 1.0])
+
+    assert graph.indptr.tolist() == [0, 1, 3, 5, 6]
+    assert [graph.neighbours(node).tolist() for node in range(4)] == [[1], [0, 2], [1, 3], [2]]
+    assert graph.weighted_degree.tolist() == [1.0, 3.0, 3.0, 1.0]
+
+    installed = np.array([True, False, False, True])
+    assert graph.adoption_fraction(installed).tolist() == [0.0, 1 / 3, 1 / 3, 0.0]
+
+
+def test_nodes_without_neighbours_have_zero_adoption():
+    graph = NeighbourhoodGraph.from_edges(3, [0], [1])
+    assert graph.adoption_fraction(np.array([True, True, True])).tolist() == [1.0, 1.0, 0.0]
+
+
+def test_grid_and_small_world_degrees():
+    grid = grid_graph(9)
+    assert sorted(grid.neighbours(4).tolist()) == [1, 3, 5, 7]
+    assert sorted(grid.neighbours(0).tolist()) == [1, 3]
+
+    ring = small_world_graph(20, 4, 0.0, np.random.default_rng(1))
+    assert all(len(ring.neighbours(node)) == 4 for node in range(20))
+    rewired = small_world_graph(20, 4, 0.5, np.random.default_rng(1))
+    assert rewired.indices.tolist() != ring.indices.tolist()
+
+
+def test_geo_graph_matches_pairwise_distances(tmp_path):
+    rng = np.random.default_rng(3)
+    coordinates = rng.random((300, 2)) * 100
+    path = tmp_path / "coordinates.csv"
+    np.savetxt(path, coordinates, delimiter=",", header="x,y", comments="")
+
+    graph = geo_graph(load_coordinates(str(path), 300), 12.0)
+
+    distances = np.linalg.norm(coordinates[:, None] - coordinates[None], axis=2)
+    for node in range(300):
+        expected = np.flatnonzero((distances[node] <= 12.0) & (np.arange(300) != node))
+        assert sorted(graph.neighbours(node).tolist()) == expected.tolist()
+
+
+@pytest.mark.parametrize("topology", ["grid", "small_world"])
+def test_network_norm_is_neighbour_adoption_fraction(monkeypatch, topology):
+    conf = config.configs[config.CHOSEN_CONFIG]
+    monkeypatch.setitem(conf, "subj_norm_level", "Network")
+    monkeypatch.setitem(conf, "network_topology", topology)
+    monkeypatch.setitem(conf, "nr_households", 100)
+    random.seed(2)
+    np.random.seed(2)
+    model = Environment(100, 210)
+    model.step()
+    model.step()
+
+    graph = model.get_neighbourhood_graph()
+    for i, hh in enumerate(model.households):
+        neighbours = [model.households[j] for j in graph.neighbours(i)]
+        for package in model.sustainability_packages:
+            expected = sum(n.package_installations[package.name] for n in neighbours) / len(neighbours) if neighbours else 0.0
+            for res in hh.residents:
+                assert res.package_subjective_norms[package.name] == pytest.approx(expected)
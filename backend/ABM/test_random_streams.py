@@ -0,0 +1,57 @@
+import random
+import numpy as np
+import pytest
+from environment import Environment
+from random_streams import RandomStreams
+
+
+pytestmark = pytest.mark.config(nr_households=120, nr_residents=250, random_streams=True)
+
+
+def run_model(global_seed, years=6):
+    random.seed(global_seed)
+    np.random.seed(global_seed)
+    model = Environment(120, 250, seed=11)
+    for year in range(years):
+        data = model.collect_start_of_year_data(year + 1)
+        model.step()
+        model.collect_end_of_year_data(data)
+    model.sync_agents()
+    return model
+
+
+def test_stream_slices_match_the_batch():
+    streams = RandomStreams(5)
+    batch = streams.uniforms("income_raise", 3, 23)
+    for start in (0, 1, 4, 7, 13):
+        assert np.array_equal(streams.uniforms("income_raise", 3, 6, start=start), batch[start:start + 6])
+    assert not np.array_equal(streams.uniforms("income_raise", 4, 23), batch)
+    assert not np.array_equal(RandomStreams(6).uniforms("income_raise", 3, 23), batch)
+
+
+@pytest.mark.parametrize("engine,agent_init", [("vectorized", "sequential"), ("object", "bulk"), ("vectorized", "bulk")])
+def test_runs_are_identical_in_every_mode(monkeypatch, small_config, engine, agent_init):
+    reference = run_model(global_seed=1)
+
+    monkeypatch.setitem(small_config, "engine", engine)
+    monkeypatch.setitem(small_config, "agent_init", agent_init)
+    # The global generators are not used, so their state does not matter
+    model = run_model(global_seed=2)
+
+    assert model.yearly_stats == reference.yearly_stats
+    assert [len(street) for street in model.streets] == [len(street) for street in reference.streets]
+    assert [res.income for res in model.residents] == [res.income for res in reference.residents]
+    assert [dict(res.behavioral_control) for res in model.residents] == \
+           [dict(res.behavioral_control) for res in reference.residents]
+    assert model.current_co2 == reference.current_co2
+
+
+def test_single_resident_raise_matches_the_batched_draw(small_config):
+    model = run_model(global_seed=1, years=2)
+    resident = model.residents[57]
+    options = small_config['raise_income']
+    factors = model.random_streams.choices("income_raise", model.steps, options, len(model.residents))
+
+    income = resident.income
+    resident.raise_income()
+    assert resident.income == int(round(income * factors.tolist()[57], -1))
@@ -0,0 +1,34 @@
+import pytest
+from batch_runner import run_replication
+from scenario_branching import run_scenarios, parse_scenarios
+
+
+def test_unchanged_scenario_matches_uninterrupted_run(small_config):
+    _, _, uninterrupted = run_replication(7, {}, simulation_years=6)
+    outcome = run_scenarios(3, {"baseline": {}}, simulation_years=6, seed=7, max_workers=1)
+    assert outcome["scenarios"]["baseline"] == uninterrupted
+
+
+def test_scenarios_share_the_prefix_and_diverge_after_the_fork(small_config):
+    scenarios = {"baseline": {}, "subsidy": {"heat_pump_price": 500}}
+    outcome = run_scenarios(3, scenarios, simulation_years=8, seed=3, max_workers=2)
+    baseline = outcome["scenarios"]["baseline"]
+    subsidy = outcome["scenarios"]["subsidy"]
+
+    assert len(baseline) == len(subsidy) == 8
+    assert baseline[:3] == subsidy[:3]
+    assert baseline[3:] != subsidy[3:]
+    # The fork has its own copy of the configuration
+    assert small_config["heat_pump_price"] != 500
+
+
+def test_unknown_override_is_rejected(small_config):
+    with pytest.raises(KeyError):
+        run_scenarios(1, {"typo": {"heat_pump_prise": 1}}, simulation_years=2, seed=1, max_workers=1)
+
+
+def test_parse_scenarios():
+    assert parse_scenarios([["shock", "energy_price=0.45", "streets=abc"]]) == {
+        "baseline": {},
+        "shock": {"energy_price": 0.45, "streets": "abc"},
+    }
@@ -0,0 +1,102 @@
+import threading
+import main
+import simulation_jobs
+from simulation_jobs import JobManager
+
+
+def job_params(seed, simulation_years=3):
+    return {"nr_households": 40, "nr_residents": 90, "simulation_years": simulation_years,
+            "seed": seed, "headless": True}
+
+
+def test_jobs_run_in_background_with_separate_results(small_config):
+    manager = JobManager()
+    first = manager.submit(job_params(1))
+    second = manager.submit(job_params(2, simulation_years=2))
+    first.future.result(timeout=60)
+    second.future.result(timeout=60)
+
+    assert first.status == simulation_jobs.FINISHED
+    assert second.status == simulation_jobs.FINISHED
+    assert len(first.results.get_graphics_data()) == 3
+    assert len(second.results.get_graphics_data()) == 2
+    assert len(first.results.get_households_data()) == 40
+    assert first.to_dict()["progress"] == 1.0
+    assert manager.latest() is second
+    # Jobs do not touch the module level storage used by command line runs
+    assert first.results is not main.default_results
+
+
+def test_cancel_stops_running_and_queued_jobs(monkeypatch, small_config):
+    year_started = threading.Event()
+    release = threading.Event()
+    original_run = main.run_simulation
+
+    def slow_run_simulation(*args, **kwargs):
+        results = kwargs["results"]
+        original_add_year = results.add_year
+
+        def add_year(*args):
+            original_add_year(*args)
+            year_started.set()
+            release.wait(10)
+        results.add_year = add_year
+        return original_run(*args, **kwargs)
+
+    monkeypatch.setattr(simulation_jobs, "run_simulation", slow_run_simulation)
+
+    manager = JobManager()
+    running = manager.submit(job_params(3, simulation_years=10))
+    queued = manager.submit(job_params(4))
+    assert year_started.wait(30)
+
+    manager.cancel(queued.job_id)
+    manager.cancel(running.job_id)
+    release.set()
+    running.future.result(timeout=60)
+
+    assert queued.status == simulation_jobs.CANCELLED
+    assert queued.results.years_completed == 0
+    assert running.status == simulation_jobs.CANCELLED
+    assert running.result["cancelled"]
+    assert running.result["years_completed"] == 1
+
+
+def test_failed_job_reports_error(monkeypatch, small_config):
+    def failing_run_simulation(*args, **kwargs):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(simulation_jobs, "run_simulation", failing_run_simulation)
+    manager = JobManager()
+    job = manager.submit(job_params(5))
+    job.future.result(timeout=30)
+
+    assert job.status == simulation_jobs.FAILED
+    assert job.to_dict()["error"] == "boom"
+    assert manager.get("unknown") is None
+
+
+def test_job_events_stream_years_and_changed_households(small_config):
+    manager = JobManager()
+    job = manager.submit(job_params(6, simulation_years=4))
+    events = [event for event in job.events(keepalive=30) if event is not None]
+    job.future.result(timeout=60)
+
+    assert [event["type"] for event in events] == ["start"] + ["year"] * 4 + ["end"]
+    assert [event["id"] for event in events] == list(range(6))
+    assert events[-1]["status"] == simulation_jobs.FINISHED
+    assert [event["data"] for event in events[1:-1]] == job.results.get_graphics_data()
+
+    # Applying the changed households to the start snapshot reproduces the final state
+    installed = {household["id"]: household for household in events[0]["households"]}
+    for event in events[1:-1]:
+        for household in event["changed_households"]:
+            installed[household["id"]] = household
+    final = {household["id"]: household for household in job.results.get_households_data()}
+    for household_id, household in final.items():
+        for package_name in ("Solar Panel", "Heat Pump"):
+            expected = household[f"{package_name}_installed"]
+            assert installed[household_id][f"{package_name}_installed"] == expected
+
+    # Resuming after the last seen event only returns the rest
+    assert [event["id"] for event in job.events(start=4) if event is not None] == [4, 5]
@@ -0,0 +1,81 @@
+import random
+import numpy as np
+import pytest
+import config
+from environment import Environment
+
+
+def run_environment(monkeypatch, engine, seed, subj_norm_level, nr_households=150, nr_residents=320, years=15,
+                    parameter_changes=None):
+    conf = config.configs[config.CHOSEN_CONFIG]
+    monkeypatch.setitem(conf, "engine", engine)
+    monkeypatch.setitem(conf, "subj_norm_level", subj_norm_level)
+    monkeypatch.setitem(conf, "nr_households", nr_households)
+
+    random.seed(seed)
+    np.random.seed(seed)
+    model = Environment(nr_households, nr_residents)
+    original_values = {}
+    for year in range(years):
+        for key, value in (parameter_changes or {}).get(year, {}).items():
+            original_values.setdefault(key, conf[key])
+            monkeypatch.setitem(conf, key, value)
+        data = model.collect_start_of_year_data(year + 1)
+        model.step()
+        model.collect_end_of_year_data(data)
+    conf.update(original_values)
+    return model
+
+
+@pytest.mark.parametrize("subj_norm_level", ["District", "Street", "Direct", "Network"])
+@pytest.mark.parametrize("seed", [7, 42])
+def test_vectorized_engine_matches_object_model(monkeypatch, seed, subj_norm_level):
+    object_model = run_environment(monkeypatch, "object", seed, subj_norm_level)
+    vectorized_model = run_environment(monkeypatch, "vectorized", seed, subj_norm_level)
+
+    assert vectorized_model.yearly_stats == object_model.yearly_stats
+    assert vectorized_model.current_co2 == object_model.current_co2
+    assert str(vectorized_model) == str(object_model)
+    assert vectorized_model.collect_environment_data() == object_model.collect_environment_data()
+
+    vectorized_model.sync_agents()
+    for object_res, vectorized_res in zip(object_model.residents, vectorized_model.residents):
+        assert vectorized_res.income == object_res.income
+        assert vectorized_res.package_decisions == object_res.package_decisions
+        assert vectorized_res.behavioral_control == object_res.behavioral_control
+
+
+def test_agents_are_only_synced_when_read(monkeypatch):
+    model = run_environment(monkeypatch, "vectorized", 1, "Street", years=0)
+    model.step()
+    assert model.engine.agents_stale
+
+    model.collect_start_of_year_data(1)
+    str(model)
+    assert model.engine.agents_stale
+
+    model.collect_household_information()
+    assert not model.engine.agents_stale
+
+
+def test_registered_package_matches_in_both_engines(monkeypatch):
+    monkeypatch.setitem(config.configs[config.CHOSEN_CONFIG], "sustainability_packages",
+                        ["Solar Panel", "Heat Pump", "Insulation"])
+    object_model = run_environment(monkeypatch, "object", 5, "Street")
+    vectorized_model = run_environment(monkeypatch, "vectorized", 5, "Street")
+
+    assert [package.name for package in object_model.sustainability_packages][-1] == "Insulation"
+    assert vectorized_model.yearly_stats == object_model.yearly_stats
+    assert vectorized_model.current_co2 == object_model.current_co2
+
+
+def test_engines_match_after_a_price_change(monkeypatch):
+    monkeypatch.setitem(config.configs[config.CHOSEN_CONFIG], "heatpump_price_increase", (0, 0))
+    changes = {4: {"gas_price": 4.0}, 6: {"energy_price": 0.1}}
+    object_model = run_environment(monkeypatch, "object", 3, "Street", years=10, parameter_changes=changes)
+    vectorized_model = run_environment(monkeypatch, "vectorized", 3, "Street", years=10, parameter_changes=changes)
+
+    assert vectorized_model.yearly_stats == object_model.yearly_stats
+    vectorized_model.sync_agents()
+    for object_res, vectorized_res in zip(object_model.residents, vectorized_model.residents):
+        assert vectorized_res.behavioral_control == object_res.behavioral_control
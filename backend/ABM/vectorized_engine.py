@@ -0,0 +1,404 @@
+"""
+Structure-of-arrays simulation engine.
+
+The object model in `environment.py` steps every Household and Resident agent
+one at a time. For large populations that per-agent Python work dominates the
+run time, so this module keeps the same state in NumPy arrays (one row per
+resident or household, one column per sustainability package) and runs a
+whole simulation year as batched array operations.
+
+The engine is built from an already initialized Environment and reproduces
+the object model exactly: the same random draws are consumed in the same
+order and every formula is evaluated in the same floating point order, so a
+seeded run yields identical adoption curves in both modes.
+"""
+import random
+import numpy as np
+
+
+def round_half_even(values, ndigits):
+    """
+    Rounds an array exactly like Python's built-in round(x, ndigits) for ndigits < 0.
+
+    `np.round` divides by the power of ten first, which can create or remove a
+    tie for values close to a halfway point. The object model rounds incomes
+    stored as Python ints with the built-in round, so the result is corrected
+    here using the exact remainder.
+
+    Args:
+        values (np.ndarray): The values to round.
+        ndigits (int): The (negative) number of digits to round to, e.g. -1 for tens.
+
+    Returns:
+        np.ndarray: The rounded values as floats.
+    """
+    factor = 10.0 ** -ndigits
+    half = factor / 2
+    units = np.rint(values / factor)
+    remainder = values - units * factor
+    units = np.where(remainder > half, units + 1, units)
+    units = np.where(remainder < -half, units - 1, units)
+
+    # Exact ties go to the even neighbour
+    remainder = values - units * factor
+    odd = units % 2 != 0
+    units = np.where((remainder == half) & odd, units + 1, units)
+    units = np.where((remainder == -half) & odd, units - 1, units)
+    return units * factor
+
+
+class HouseholdArrays:
+    """
+    Column view of all households in the environment.
+
+    Attribute names mirror the Household agent so the batch kernels of the
+    sustainability packages read like their per-household counterparts.
+
+    Attributes:
+        solarpanel_amount (np.ndarray): Number of solar panels per household.
+        energy_generation (np.ndarray): Energy generation per panel per year (kWh).
+        gas_usage (np.ndarray): Annual gas usage per household.
+        energy_usage (np.ndarray): Annual electricity usage per household.
+        heatpump_usage (np.ndarray): Annual heat pump electricity usage per household.
+        installed (np.ndarray): Boolean matrix (households x packages) of installed packages.
+        co2_saved_yearly (np.ndarray): Accumulated CO2 savings per household.
+        nr_residents (np.ndarray): Number of residents per household.
+    """
+    def __init__(self, households, packages):
+        """
+        Copies the attributes of the household agents into arrays.
+
+        Args:
+            households (list[Household]): The household agents, in environment order.
+            packages (list[SustainabilityPackage]): The sustainability packages, in environment order.
+        """
+        self.package_index = {package.name: p for p, package in enumerate(packages)}
+
+        self.solarpanel_amount = np.array([hh.solarpanel_amount for hh in households], dtype=np.int64)
+        self.energy_generation = np.array([hh.energy_generation for hh in households], dtype=np.int64)
+        self.gas_usage = np.array([hh.gas_usage for hh in households], dtype=np.int64)
+        self.energy_usage = np.array([hh.energy_usage for hh in households], dtype=np.int64)
+        self.heatpump_usage = np.array([hh.heatpump_usage for hh in households], dtype=np.int64)
+        self.installed = np.array(
+            [[hh.package_installations.get(package.name, False) for package in packages] for hh in households],
+            dtype=bool
+        ).reshape(len(households), len(packages))
+        self.co2_saved_yearly = np.array([hh.co2_saved_yearly for hh in households], dtype=np.float64)
+        self.nr_residents = np.array([len(hh.residents) for hh in households], dtype=np.int64)
+
+    def is_installed(self, package_name):
+        """
+        Returns which households have a given package installed.
+
+        Args:
+            package_name (str): The name of the package (e.g., "Solar Panel").
+
+        Returns:
+            np.ndarray: Boolean array with one entry per household. All False if
+                        the package is not part of the simulation.
+        """
+        p = self.package_index.get(package_name)
+        if p is None:
+            return np.zeros(len(self.installed), dtype=bool)
+        return self.installed[:, p]
+
+
+class VectorizedEngine:
+    """
+    Runs the yearly step of an Environment on structure-of-arrays state.
+
+    Resident rows are stored in the order of `environment.residents`, which is
+    the order in which the object model steps them (household by household).
+
+    Attributes:
+        environment (Environment): The environment this engine drives.
+        packages (list[SustainabilityPackage]): The sustainability packages, in environment order.
+        households (HouseholdArrays): Column view of the households.
+        household_index (np.ndarray): For each resident, the position of its household.
+        income (np.ndarray): Income per resident.
+        income_is_int (np.ndarray): Whether the income is already a Python int in the object
+                                    model (after the first raise), which changes the rounding rule.
+        attitude, attitude_mod, subj_norm_mod, behavioral_mod, decision_threshold (np.ndarray):
+            Static TPB attributes per resident.
+        subj_norm (np.ndarray): Subjective norm used in decisions (residents x packages).
+        package_subjective_norms (np.ndarray): Latest norm from the environment (residents x packages).
+        behavioral_control (np.ndarray): Behavioral control (residents x packages).
+        decisions (np.ndarray): Boolean decisions (residents x packages).
+        pruned (np.ndarray | None): Boolean mask (residents x packages) of the never-adopter
+            pairs whose factors are no longer refreshed (see active_set.py), None if pruning is off.
+    """
+    def __init__(self, environment):
+        """
+        Builds the array state from the agents of an initialized environment.
+
+        Args:
+            environment (Environment): The environment whose agents are copied.
+        """
+        self.environment = environment
+        self.config = environment.config
+        self.packages = environment.sustainability_packages
+        households = environment.households
+        residents = environment.residents
+        package_names = [package.name for package in self.packages]
+
+        self.households = HouseholdArrays(households, self.packages)
+        household_position = {id(hh): h for h, hh in enumerate(households)}
+        self.household_index = np.array([household_position[id(res.household)] for res in residents], dtype=np.int64)
+
+        self.income = np.array([res.income for res in residents], dtype=np.float64)
+        self.income_is_int = np.array([isinstance(res.income, int) for res in residents], dtype=bool)
+        self.attitude = np.array([res.attitude for res in residents], dtype=np.float64)
+        self.attitude_mod = np.array([res.attitude_mod for res in residents], dtype=np.float64)
+        self.subj_norm_mod = np.array([res.subj_norm_mod for res in residents], dtype=np.float64)
+        self.behavioral_mod = np.array([res.behavioral_mod for res in residents], dtype=np.float64)
+        self.decision_threshold = np.array([res.decision_threshold for res in residents], dtype=np.float64)
+
+        shape = (len(residents), len(package_names))
+        self.subj_norm = np.array(
+            [[res.subj_norm[name] for name in package_names] for res in residents], dtype=np.float64
+        ).reshape(shape)
+        self.package_subjective_norms = np.array(
+            [[res.package_subjective_norms.get(name, 0.0) for name in package_names] for res in residents],
+            dtype=np.float64
+        ).reshape(shape)
+        self.behavioral_control = np.array(
+            [[res.behavioral_control[name] for name in package_names] for res in residents], dtype=np.float64
+        ).reshape(shape)
+        self.decisions = np.array(
+            [[res.package_decisions.get(name, False) for name in package_names] for res in residents], dtype=bool
+        ).reshape(shape)
+
+        self.pruned = None
+
+        self._build_street_index(households, environment.streets)
+        self.agents_stale = False
+
+    def _build_street_index(self, households, streets):
+        """
+        Flattens the street lists into per-household street and neighbour indices.
+
+        Households that are not part of any street get -1 and keep their current
+        subjective norm at "Street" level, just like in the object model.
+
+        Args:
+            households (list[Household]): The household agents, in environment order.
+            streets (list[list[Household]]): The streets of the environment.
+        """
+        household_position = {id(hh): h for h, hh in enumerate(households)}
+        nr_households = len(households)
+
+        self.street_index = np.full(nr_households, -1, dtype=np.int64)
+        self.prev_neighbour = np.full(nr_households, -1, dtype=np.int64)
+        self.next_neighbour = np.full(nr_households, -1, dtype=np.int64)
+        self.street_sizes = np.array([len(street) for street in streets], dtype=np.int64)
+
+        for s, street in enumerate(streets):
+            positions = [household_position[id(hh)] for hh in street]
+            for j, h in enumerate(positions):
+                self.street_index[h] = s
+                if j > 0:
+                    self.prev_neighbour[h] = positions[j - 1]
+                if j < len(positions) - 1:
+                    self.next_neighbour[h] = positions[j + 1]
+
+    def calc_decisions(self):
+        """
+        Vectorized `Resident.calc_decision` for all residents and packages.
+
+        Returns:
+            np.ndarray: Number of residents who decided for each package this step.
+        """
+        decided_counts = np.zeros(len(self.packages), dtype=np.int64)
+        for p, package in enumerate(self.packages):
+            undecided = ~self.decisions[:, p]
+            decision_stat = (self.attitude * self.attitude_mod +
+                             self.subj_norm[:, p] * package.subj_norm_mod * self.subj_norm_mod +
+                             self.behavioral_control[:, p] * self.behavioral_mod) / 6
+
+            new_decisions = undecided & (decision_stat > self.decision_threshold)
+            self.decisions[:, p] |= new_decisions
+            decided_counts[p] = np.count_nonzero(new_decisions)
+        return decided_counts
+
+    def raise_incomes(self):
+        """
+        Vectorized income raise of `Resident.step`.
+
+        The raise factors are drawn from the global `random` module in resident
+        order, or from the year's "income_raise" stream with `random_streams`,
+        exactly as the object model does, so both modes stay in sync.
+        """
+        options = self.config['raise_income']
+        streams = self.environment.random_streams
+        if streams is None:
+            factors = np.array([random.choice(options) for _ in range(len(self.income))], dtype=np.float64)
+        else:
+            factors = streams.choices("income_raise", self.environment.steps, options, len(self.income)).astype(np.float64)
+        raised = self.income * factors
+
+        # Incomes that are still NumPy floats are rounded by np.round in the object model
+        self.income = np.where(self.income_is_int, round_half_even(raised, -1), np.round(raised, -1))
+        self.income_is_int[:] = True
+
+    def update_resident_factors(self, pairs=None):
+        """
+        Vectorized `calc_subjective_norm` and `calc_behavioral_control` for
+        residents who have not yet decided on a package (and are not pruned).
+
+        Args:
+            pairs (np.ndarray | None): Boolean mask (residents x packages) of the pairs
+                to update instead, e.g. pairs that are no longer pruned.
+        """
+        for p, package in enumerate(self.packages):
+            if pairs is not None:
+                active = pairs[:, p]
+            else:
+                active = ~self.decisions[:, p]
+                if self.pruned is not None:
+                    active &= ~self.pruned[:, p]
+            undecided = np.flatnonzero(active)
+            if len(undecided) == 0:
+                continue
+
+            self.subj_norm[undecided, p] = self.package_subjective_norms[undecided, p]
+            self.behavioral_control[undecided, p] = package.calculate_behavioral_influence_batch(
+                self.income[undecided], self.households, self.household_index[undecided]
+            )
+
+    def calc_household_decisions(self):
+        """
+        Vectorized `Household.calc_avg_decision` and CO2 bookkeeping.
+
+        Packages are voted on in environment order, so a heat pump vote sees the
+        solar panels installed by the same household earlier in this step. New
+        installations are also registered with the environment's counters.
+        """
+        households = self.households
+        nr_households = len(households.nr_residents)
+        has_residents = households.nr_residents > 0
+        threshold = self.config['household_decision_threshold']
+        new_installs = []
+
+        for p, package in enumerate(self.packages):
+            positive = np.bincount(self.household_index, weights=self.decisions[:, p], minlength=nr_households)
+            avg_score = np.divide(positive, households.nr_residents,
+                                  out=np.zeros(nr_households), where=has_residents)
+
+            installs = has_residents & ~households.installed[:, p] & (avg_score >= threshold)
+            households.installed[:, p] |= installs
+
+            savings = package.calc_co2_savings_batch(households)
+            for h in np.flatnonzero(installs):
+                new_installs.append((h, p, savings[h]))
+                self.environment.register_installation(self.environment.households[h], package)
+            households.co2_saved_yearly += savings
+
+        # Subtract in household order to match the floating point sum of the object model
+        for _, _, saving in sorted(new_installs, key=lambda install: (install[0], install[1])):
+            self.environment.current_co2 -= saving
+
+    def update_subjective_norm(self):
+        """
+        Vectorized `SustainabilityPackage.update_package_subjective_norm` for every package.
+        """
+        subj_norm_level = self.config['subj_norm_level']
+        base_norm = self.config.get('subjective_norm', 0.0)
+        installed = self.households.installed
+        nr_households = len(installed)
+
+        for p, package in enumerate(self.packages):
+            if subj_norm_level == "District":
+                num_installed = np.count_nonzero(installed[:, p])
+                if nr_households == 0:
+                    continue
+                value = num_installed / (nr_households - 1) if nr_households > 1 else num_installed / nr_households
+                self.package_subjective_norms[:, p] = min(max(0.0, value), 1.0)
+
+            elif subj_norm_level == "Street":
+                if len(self.street_sizes) == 0:
+                    continue
+                in_street = self.street_index >= 0
+                street_installed = np.bincount(self.street_index[in_street], weights=installed[in_street, p],
+                                               minlength=len(self.street_sizes))
+                denominator = np.where(self.street_sizes > 1, self.street_sizes - 1, self.street_sizes)
+                street_norm = np.divide(street_installed, denominator,
+                                        out=np.zeros(len(self.street_sizes)), where=denominator > 0)
+                street_norm = np.clip(street_norm, 0.0, 1.0)
+
+                household_norm = np.where(in_street, street_norm[self.street_index], np.nan)
+                resident_norm = household_norm[self.household_index]
+                keep = np.isnan(resident_norm)
+                self.package_subjective_norms[:, p] = np.where(keep, self.package_subjective_norms[:, p], resident_norm)
+
+            elif subj_norm_level == "Direct":
+                household_norm = np.full(nr_households, base_norm, dtype=np.float64)
+                for neighbour in (self.prev_neighbour, self.next_neighbour):
+                    has_neighbour = neighbour >= 0
+                    neighbour_installed = np.zeros(nr_households, dtype=bool)
+                    neighbour_installed[has_neighbour] = installed[neighbour[has_neighbour], p]
+                    household_norm = np.where(neighbour_installed, np.minimum(1.0, household_norm + 0.5), household_norm)
+                self.package_subjective_norms[:, p] = household_norm[self.household_index]
+
+            elif subj_norm_level == "Network":
+                household_norm = self.environment.get_neighbourhood_graph().adoption_fraction(installed[:, p])
+                self.package_subjective_norms[:, p] = household_norm[self.household_index]
+
+            else:
+                self.package_subjective_norms[:, p] = base_norm
+
+    def step(self):
+        """
+        Executes one simulation year on the arrays.
+
+        Mirrors `Environment.step`: resident decisions, income raises, norm and
+        behavioral control refresh, household votes, subjective norm update and
+        finally the package price steps.
+        """
+        metrics = self.environment.metrics
+        with metrics.phase("step_resident_decisions"):
+            decided_counts = self.calc_decisions()
+        with metrics.phase("step_income_raise"):
+            self.raise_incomes()
+        with metrics.phase("step_resident_factors"):
+            self.update_resident_factors()
+        with metrics.phase("step_household_decisions"):
+            self.calc_household_decisions()
+        with metrics.phase("step_subjective_norm"):
+            self.update_subjective_norm()
+
+        with metrics.phase("step_package_prices"):
+            for package in self.packages:
+                package.step()
+
+        for p, package in enumerate(self.packages):
+            self.environment.decided_residents_this_step_per_package[package.name] = int(decided_counts[p])
+        self.agents_stale = True
+
+    def write_back(self):
+        """
+        Copies the array state back onto the Household and Resident agents.
+
+        Called lazily by the environment before anything reads the agents
+        (data collection, exports, the API), so headless runs never pay for it.
+        """
+        if not self.agents_stale:
+            return
+
+        package_names = [package.name for package in self.packages]
+        income = self.income.tolist()
+        subj_norm = self.subj_norm.tolist()
+        package_norms = self.package_subjective_norms.tolist()
+        behavioral_control = self.behavioral_control.tolist()
+        decisions = self.decisions.tolist()
+
+        for r, res in enumerate(self.environment.residents):
+            res.income = int(income[r]) if self.income_is_int[r] else np.float64(income[r])
+            res.set_package_state(subj_norm[r], behavioral_control[r], package_norms[r], decisions[r])
+
+        installed = self.households.installed.tolist()
+        co2_saved_yearly = self.households.co2_saved_yearly.tolist()
+        for h, hh in enumerate(self.environment.households):
+            hh.package_installations = dict(zip(package_names, installed[h]))
+            hh.co2_saved_yearly = co2_saved_yearly[h]
+
+        self.agents_stale = False
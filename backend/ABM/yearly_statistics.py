@@ -0,0 +1,132 @@
+"""
+Aggregated statistics of the simulation state.
+
+The yearly data collection, the environment export and the printed summary
+all need the same per-package counts, CO2 totals and TPB averages. The
+StatisticsCollector builds all of them in a single pass over the agents (or
+straight from the arrays of the vectorized engine) and caches the result
+until the environment changes, so every reader shares one computation.
+"""
+import numpy as np
+
+
+class StatisticsCollector:
+    """
+    Computes and caches the aggregated statistics of an Environment.
+
+    The cache is invalidated by `Environment.step` (via `invalidate`), so the
+    statistics are computed at most once per simulation step.
+
+    Attributes:
+        environment (Environment): The environment to collect statistics from.
+    """
+    def __init__(self, environment):
+        """
+        Args:
+            environment (Environment): The environment to collect statistics from.
+        """
+        self.environment = environment
+        self._current = None
+
+    def invalidate(self):
+        """
+        Marks the cached statistics as outdated after the environment changed.
+        """
+        self._current = None
+
+    def current(self):
+        """
+        Returns the statistics of the current state, computing them if needed.
+
+        Returns:
+            dict: A dictionary with:
+                - total_households (int), total_residents (int)
+                - residents_positive_decision (dict): Residents who decided for each package.
+                - households_with_package (dict): Households with each package installed.
+                - price (dict): Current price of each package.
+                - total_co2_saved_yearly (float): Sum of the yearly CO2 savings of all households.
+                - average_income (float), average_attitude (float)
+                - average_subjective_norm (dict), average_behavioral_control (dict): Per package.
+        """
+        if self._current is None:
+            if self.environment.engine is not None:
+                self._current = self._collect_from_engine()
+            else:
+                self._current = self._collect_from_agents()
+        return self._current
+
+    def _collect_from_agents(self):
+        """
+        Builds the statistics in a single pass over all households and residents.
+        """
+        packages = self.environment.sustainability_packages
+        package_names = [package.name for package in packages]
+
+        residents_positive_decision = dict.fromkeys(package_names, 0)
+        households_with_package = dict.fromkeys(package_names, 0)
+        subj_norms = {name: [] for name in package_names}
+        behavioral_controls = {name: [] for name in package_names}
+        incomes = []
+        attitudes = []
+        total_co2_saved_yearly = 0
+
+        for hh in self.environment.households:
+            total_co2_saved_yearly += hh.co2_saved_yearly
+            for name, installed in zip(package_names, hh.package_installations.values()):
+                if installed:
+                    households_with_package[name] += 1
+
+            for res in hh.residents:
+                incomes.append(res.income)
+                attitudes.append(res.attitude)
+                res_subj_norms, res_behavioral_controls, _, res_decisions = res.get_package_state()
+                for name, decided, subj_norm, behavioral_control in zip(
+                        package_names, res_decisions, res_subj_norms, res_behavioral_controls):
+                    if decided:
+                        residents_positive_decision[name] += 1
+                    subj_norms[name].append(subj_norm)
+                    behavioral_controls[name].append(behavioral_control)
+
+        return {
+            "total_households": len(self.environment.households),
+            "total_residents": len(incomes),
+            "residents_positive_decision": residents_positive_decision,
+            "households_with_package": households_with_package,
+            "price": {package.name: package.price for package in packages},
+            "total_co2_saved_yearly": total_co2_saved_yearly,
+            "average_income": np.mean(incomes),
+            "average_attitude": np.mean(attitudes),
+            "average_subjective_norm": {name: np.mean(subj_norms[name]) for name in package_names},
+            "average_behavioral_control": {name: np.mean(behavioral_controls[name]) for name in package_names},
+        }
+
+    def _collect_from_engine(self):
+        """
+        Builds the statistics from the arrays of the vectorized engine, without
+        writing the state back onto the agents.
+        """
+        engine = self.environment.engine
+        packages = self.environment.sustainability_packages
+
+        return {
+            "total_households": len(engine.households.nr_residents),
+            "total_residents": len(engine.income),
+            "residents_positive_decision": {
+                package.name: int(np.count_nonzero(engine.decisions[:, p])) for p, package in enumerate(packages)
+            },
+            "households_with_package": {
+                package.name: int(np.count_nonzero(engine.households.installed[:, p])) for p, package in enumerate(packages)
+            },
+            "price": {package.name: package.price for package in packages},
+            # Summed in household order, like the agent based pass
+            "total_co2_saved_yearly": sum(engine.households.co2_saved_yearly.tolist()),
+            "average_income": np.mean(engine.income),
+            "average_attitude": np.mean(engine.attitude),
+            "average_subjective_norm": {
+                package.name: np.mean(np.ascontiguousarray(engine.subj_norm[:, p])) for p, package in enumerate(packages)
+            },
+            "average_behavioral_control": {
+                package.name: np.mean(np.ascontiguousarray(engine.behavioral_control[:, p]))
+                for p, package in enumerate(packages)
+            },
+        }
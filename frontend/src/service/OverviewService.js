@@ -25,6 +25,14 @@
  *     - A Promise resolving to the simulation graphic results (JSON format).
  *   - Throws:
  *     - An error if the API call fails (e.g., non-OK HTTP response).
+ *
+ * - `subscribeToSimulation(handlers)`: Opens a server-sent events stream on `/simulation/events`.
+ *   - `handlers.onStart(households)`: Called with all households when the simulation starts.
+ *   - `handlers.onYear(data, changedHouseholds)`: Called after every simulated year with the yearly
+ *     record and only the households whose installations changed.
+ *   - `handlers.onEnd(status)`: Called once the simulation ended; the stream is then closed.
+ *   - Returns:
+ *     - The `EventSource`; call `close()` on it to stop listening.
  */
 
 const API_URL = "http://127.0.0.1:5000";
@@ -58,6 +66,22 @@ class OverviewService {
         return await response.json();
     }
 
+    subscribeToSimulation({ onStart, onYear, onEnd } = {}) {
+        const source = new EventSource(`${API_URL}/simulation/events`);
+        source.addEventListener("start", (event) => {
+            onStart?.(JSON.parse(event.data).households);
+        });
+        source.addEventListener("year", (event) => {
+            const message = JSON.parse(event.data);
+            onYear?.(message.data, message.changed_households);
+        });
+        source.addEventListener("end", (event) => {
+            source.close();
+            onEnd?.(JSON.parse(event.data).status);
+        });
+        return source;
+    }
+
 }
 const overviewService = new OverviewService();
 export default overviewService;
\ No newline at end of file